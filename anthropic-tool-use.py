@@ -5,9 +5,20 @@ import json
 import os
 import sys
 import time
-import requests
+
 import sseclient
 
+from clients import (
+    ANTHROPIC_BASE_URL,
+    DEFAULT_ANTHROPIC_POOL_SIZE,
+    get_anthropic_api_key,
+    get_anthropic_session,
+)
+from delta_timeline import DEFAULT_STALL_THRESHOLD, DeltaTimeline, format_stall_report
+from partial_json import StreamingJsonObjectParser
+from speculative_write import SpeculativeFileWriter
+from stream_log import StreamRecorder
+
 # You'll need to set your Anthropic API key as an environment variable
 # export ANTHROPIC_API_KEY=your_api_key_here
 
@@ -28,7 +39,21 @@ def log(message, timestamp_mode=False, end="\n", flush=False):
         print(message, end=end, flush=flush)        
 
 
-def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
+def _sse_data(event):
+    # Recorded form of an SSE event: its data string (which carries the event type)
+    return event.data or None
+
+
+def invoke_anthropic_messages_stream(
+    prompt,
+    model_id,
+    timestamp_mode=False,
+    speculative_writes=False,
+    session=None,
+    base_url=ANTHROPIC_BASE_URL,
+    recorder=None,
+    stall_threshold=DEFAULT_STALL_THRESHOLD,
+):
     """
     Invokes the Anthropic Messages API with streaming and tool use support.
 
@@ -36,16 +61,26 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
         prompt (str): The user prompt to send to the model
         model_id (str): The model ID to use
         timestamp_mode (bool): Whether to print timestamps for each event
+        speculative_writes (bool): Whether to stream `create` file_text to disk while it is
+            generated
+        session: Pooled HTTP session to send the requests on (default: the shared session)
+        base_url (str): The API base URL, e.g. a local mock_anthropic_server.py
+        recorder (StreamRecorder): Optional recorder for the raw events of every stream
+        stall_threshold (float): Minimum gap in seconds between deltas that is reported as a stall
 
     Returns:
         str: The full response text
     """
     # Get API key from environment
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    api_key = get_anthropic_api_key(base_url)
     if not api_key:
         log("Error: ANTHROPIC_API_KEY environment variable not set")
         sys.exit(1)
 
+    # Every turn reuses the pooled connections of one session
+    if session is None:
+        session = get_anthropic_session()
+
     # Define the input schema for the fs_write tool
     input_schema = {
         "type": "object",
@@ -78,7 +113,7 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
         },
         "required": ["command", "path"],
     }
-    
+
     # Define the fs_write tool
     fs_write_tool = {
         "name": "fs_write",
@@ -89,9 +124,12 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
     # Prepare request body
     messages = [{"role": "user", "content": prompt}]
 
+    # The tool_use block being streamed, with its speculative writer if any
+    tool_use = {}
+
     try:
         # Prepare API call parameters
-        api_url = "https://api.anthropic.com/v1/messages"
+        api_url = f"{base_url}/v1/messages"
         headers = {
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01",
@@ -99,22 +137,22 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
             "anthropic-beta": "fine-grained-tool-streaming-2025-05-14",
             "accept": "text/event-stream"
         }
-        
+
         # # Try with the exact model ID format from Bedrock
         # if model_id == "claude-3-7-sonnet-20250219":
         #     log("Using model ID: claude-3-7-sonnet-20250219-v1:0", timestamp_mode)
         #     model_id = "claude-3-7-sonnet-20250219-v1:0"
-        
+
         # # Try with the standard Anthropic model ID format
         # if ":" in model_id:
         #     log(f"Removing version suffix from model ID: {model_id}", timestamp_mode)
         #     model_id = model_id.split(":")[0]
-            
+
         # # For debugging, try with a known working model ID
         # if model_id.startswith("claude-3-7"):
         #     log("Falling back to claude-3-sonnet-20240229 as a test", timestamp_mode)
         #     model_id = "claude-3-sonnet-20240229"
-        
+
         data = {
             "model": model_id,
             "messages": messages,
@@ -126,63 +164,74 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
         # Call the Messages API with streaming
         log("Streaming response from Claude:")
         log("-" * 50, timestamp_mode)
-        
+
         # Debug: Print request details
         log(f"API URL: {api_url}", timestamp_mode)
         log(f"Headers: {json.dumps({k: v for k, v in headers.items() if k != 'x-api-key'})}", timestamp_mode)
         log(f"Request data: {json.dumps(data)}", timestamp_mode)
-        
+
         # timeout doesn't seem to be working for the stream
-        response = requests.post(api_url, headers=headers, json=data, stream=True, timeout=120)
-        
+        capture = recorder.start_stream() if recorder is not None else None
+        response = session.post(api_url, headers=headers, json=data, stream=True, timeout=120)
+
         # Debug: Print response details if there's an error
         if response.status_code != 200:
             log(f"Error status code: {response.status_code}", timestamp_mode)
             log(f"Error response: {response.text}", timestamp_mode)
-            
+
         response.raise_for_status()
-        
+
         client = sseclient.SSEClient(response)
-        
-        full_response = ""
-        current_text = ""
-        tool_use = {}
-        
+        events = client.events()
+        if capture is not None:
+            events = capture.wrap(events, response.headers.get("request-id"), convert=_sse_data)
+
+        # Response text and the current text block are kept as chunk lists
+        # and joined once, so long outputs are not copied on every delta
+        response_parts = []
+        text_parts = []
+
         # Track the assistant's response to include in the messages array
         assistant_message = {"role": "assistant", "content": []}
         current_content_block = None
 
-        for event in client.events():
+        # Arrival time and size of every delta, across both streams
+        timeline = DeltaTimeline()
+
+        for event in events:
             # Debug: Print raw event data
             # log(f"Raw event: {event.event} - Data: {event.data[:100] if event.data else 'None'}", timestamp_mode)
-            
+
             # Parse the event data
             if not event.data:
                 continue
-                
+
             data = json.loads(event.data)
             event_type = data.get("type")
-            
+
             if event_type == "message_start":
                 log(f"[Message started with role: {data['message']['role']}]", timestamp_mode)
-                
+
             elif event_type == "content_block_start":
                 content_block = data.get("content_block", {})
                 block_type = content_block.get("type")
-                
+
                 # log(f"[Content block start: {block_type}]", timestamp_mode)
                 log(f"[Content block data: {json.dumps(content_block)}]", timestamp_mode)
-                
+
                 if block_type == "tool_use":
                     tool_use = {
                         "toolUseId": content_block["id"],
                         "name": content_block["name"],
-                        "input": {}
+                        "input": {},
+                        "input_parser": StreamingJsonObjectParser(),
                     }
+                    if speculative_writes and content_block["name"] == "fs_write":
+                        tool_use["speculative_writer"] = SpeculativeFileWriter()
                     log(f"[Tool Use Started: {content_block['name']} (ID: {content_block['id']})]", timestamp_mode)
                     # Start timing tool input generation
                     tool_start_time = time.time()
-                    
+
                     # Add the toolUse to the assistant's message
                     current_content_block = {
                         "type": "tool_use",
@@ -190,88 +239,103 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
                         "name": content_block["name"],
                         "input": {}
                     }
-                    
+
             elif event_type == "content_block_delta":
                 delta = data.get("delta", {})
                 delta_type = delta.get("type")
-                
+
                 if delta_type == "text_delta":
                     text_chunk = delta.get("text", "")
+                    timeline.record("text", text_chunk)
                     log(text_chunk, timestamp_mode, flush=True)
-                    current_text += text_chunk
-                    full_response += text_chunk
-                    
-                    # If this is the first text chunk, add a text block to the assistant's message
-                    if not any(block.get("type") == "text" for block in assistant_message["content"]):
-                        assistant_message["content"].append({"type": "text", "text": text_chunk})
-                    else:
-                        # Otherwise, append to the existing text block
-                        for block in assistant_message["content"]:
-                            if block.get("type") == "text":
-                                block["text"] += text_chunk
-                                break
-                                
+                    text_parts.append(text_chunk)
+
                 elif delta_type == "input_json_delta":
                     # Handle incremental JSON for tool use
                     partial_json = delta.get("partial_json", "")
+                    timeline.record("toolUse", partial_json)
                     log(f"[Tool input part: {partial_json}]", timestamp_mode, flush=True)
-                    
-                    # Accumulate the partial JSON
-                    if "input_json" not in tool_use:
-                        tool_use["input_json"] = ""
-                    tool_use["input_json"] += partial_json
-                    
-                    # Try to parse the accumulated JSON if it looks complete
-                    if tool_use["input_json"].startswith("{") and tool_use["input_json"].endswith("}"):
-                        try:
-                            complete_json = json.loads(tool_use["input_json"])
+
+                    # Parse the partial JSON incrementally; each field is
+                    # available as soon as its value closes
+                    try:
+                        json_events = tool_use["input_parser"].feed(partial_json)
+                    except (KeyError, json.JSONDecodeError):
+                        json_events = []
+                    writer = tool_use.get("speculative_writer")
+                    for json_event in json_events:
+                        if json_event.kind == "string_chunk":
+                            if writer is not None:
+                                writer.on_chunk(json_event.key, json_event.value)
+                        elif json_event.kind == "field":
+                            log(
+                                f"[Tool parameter ready: {json_event.key}]",
+                                timestamp_mode,
+                                flush=True,
+                            )
+                            if writer is not None and writer.on_field(
+                                json_event.key, json_event.value
+                            ):
+                                log(
+                                    f"[Speculative write started: {writer.path}]",
+                                    timestamp_mode,
+                                    flush=True,
+                                )
+                        elif json_event.kind == "complete":
+                            complete_json = json_event.value
                             tool_use["input"] = complete_json
                             log(f"[Complete tool input: {json.dumps(complete_json)}]", timestamp_mode, flush=True)
-                            
+
                             # Update the toolUse in the assistant's message
                             if current_content_block and current_content_block["type"] == "tool_use":
                                 current_content_block["input"] = complete_json
-                        except json.JSONDecodeError:
-                            # JSON is not complete yet, continue accumulating
-                            pass
-                                
+
                 elif delta_type == "tool_use_delta":
                     # For Anthropic API, the input is sent as a complete JSON object, not incrementally
                     if "input" in delta:
                         input_delta = json.dumps(delta["input"])
                         log(f"[Tool input: {input_delta}] ", timestamp_mode, flush=True)
                         tool_use["input"] = delta["input"]
-                        
+
                         # Update the toolUse in the assistant's message
                         if current_content_block and current_content_block["type"] == "tool_use":
                             current_content_block["input"] = delta["input"]
-            
+
             elif event_type == "content_block_stop":
                 log(f"[Content block stopped]", timestamp_mode)
+                writer = tool_use.pop("speculative_writer", None) if tool_use else None
                 if tool_use and "input" in tool_use and tool_use["input"]:
                     # Calculate and log tool input generation time
                     tool_end_time = time.time()
                     tool_elapsed_time = tool_end_time - tool_start_time
                     log(f"[Tool input generation time: {tool_elapsed_time:.2f} seconds]", timestamp_mode, flush=True)
-                    
+
                     # Add the complete toolUse block to the assistant's message
                     if current_content_block and current_content_block["type"] == "tool_use":
                         assistant_message["content"].append(current_content_block)
                         current_content_block = None
-                    
+
                     log(f"[Tool parameters: {json.dumps(tool_use['input'])}]", timestamp_mode, flush=True)
-                    
+
                     # Execute the fs_write tool
                     if tool_use["name"] == "fs_write":
-                        tool_success = execute_fs_write(tool_use["input"], timestamp_mode)
-                        
+                        if writer is not None and writer.commit(tool_use["input"]):
+                            path = tool_use["input"]["path"]
+                            log(
+                                f"[Tool Result: File created at {path} "
+                                "(streamed during generation)]"
+                            )
+                            tool_success = True
+                        else:
+                            tool_success = execute_fs_write(tool_use["input"], timestamp_mode)
+
                         # Create tool result message based on success or failure
                         result_text = ""
                         if tool_success:
                             result_text = f"Tool execution completed successfully for {tool_use['input']['command']} operation on {tool_use['input']['path']}"
                         else:
                             result_text = f"Tool execution failed for {tool_use['input']['command']} operation on {tool_use['input']['path']}"
-                            
+
                         # Send tool result back to the model
                         tool_result_message = {
                             "role": "user",
@@ -301,50 +365,77 @@ def invoke_anthropic_messages_stream(prompt, model_id, timestamp_mode=False):
                                 "max_tokens": 4096,
                                 "stream": True
                             }
-                            
-                            continue_response = requests.post(api_url, headers=headers, json=continue_data, stream=True)
+
+                            continue_capture = (
+                                recorder.start_stream() if recorder is not None else None
+                            )
+                            continue_response = session.post(
+                                api_url, headers=headers, json=continue_data, stream=True
+                            )
                             continue_response.raise_for_status()
-                            
+
                             continue_client = sseclient.SSEClient(continue_response)
-                            
+                            continue_events = continue_client.events()
+                            if continue_capture is not None:
+                                continue_events = continue_capture.wrap(
+                                    continue_events,
+                                    continue_response.headers.get("request-id"),
+                                    convert=_sse_data,
+                                )
+
                             # Process the continued response
-                            for continue_event in continue_client.events():
+                            timeline.new_stream()
+                            for continue_event in continue_events:
                                 if continue_event.event == "content_block_delta" and continue_event.data:
                                     continue_data = json.loads(continue_event.data)
                                     if continue_data["type"] == "text_delta":
                                         continue_text = continue_data["delta"]["text"]
+                                        timeline.record("text", continue_text)
                                         log(continue_text, timestamp_mode, flush=True)
-                                        full_response += continue_text
-                                        
+                                        response_parts.append(continue_text)
+
                         except Exception as e:
                             log(f"\nError invoking Anthropic API: {e}")
                             # Continue with the response we have so far
 
                     # Reset tool use
                     tool_use = {}
-                else:
-                    full_response += current_text
-                    current_text = ""
+                elif text_parts:
+                    # Add the completed text block to the assistant's message
+                    current_text = "".join(text_parts)
+                    text_parts = []
+                    assistant_message["content"].append({"type": "text", "text": current_text})
+                    response_parts.append(current_text)
+
+                # Discard a speculative write whose tool input never completed
+                if writer is not None:
+                    writer.rollback()
 
             elif event_type == "message_delta":
                 delta = data.get("delta", {})
                 stop_reason = delta.get("stop_reason")
                 if stop_reason:
                     log(f"[Message delta with stop_reason: {stop_reason}]", timestamp_mode)
-                
+
             elif event_type == "message_stop":
                 log(f"[Message stopped]", timestamp_mode)
                 # Add any remaining text to the full response
-                if current_text:
-                    full_response += current_text
-                    current_text = ""
+                if text_parts:
+                    response_parts.append("".join(text_parts))
+                    text_parts = []
 
         log("-" * 50, timestamp_mode)
-        return full_response
+        log(format_stall_report(timeline, stall_threshold), timestamp_mode)
+        return "".join(response_parts)
 
     except Exception as e:
         log(f"Error invoking Anthropic API: {e}")
         return None
+    finally:
+        # Discard the temporary file of a block the stream broke off in
+        writer = tool_use.get("speculative_writer")
+        if writer is not None:
+            writer.rollback()
 
 
 def execute_fs_write(parameters, timestamp_mode=False):
@@ -468,9 +559,42 @@ def main():
     parser.add_argument("--timestamp", "-t", action="store_true", help="Enable timestamp mode")
     parser.add_argument("--model", "-m", default="claude-3-7-sonnet-20250219", 
                         help="Model ID to use")
-    
+    parser.add_argument(
+        "--speculative-write",
+        action="store_true",
+        help="Stream the file_text of fs_write create calls to disk while it is generated",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_ANTHROPIC_POOL_SIZE,
+        help="Maximum number of pooled connections to the API",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Use HTTP/2 (requires the optional httpx[http2] package)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=ANTHROPIC_BASE_URL,
+        help="API base URL, e.g. a local mock_anthropic_server.py (default: $ANTHROPIC_BASE_URL "
+        "or the public API)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Append every raw stream event with its receive time to a log (see stream_log.py)",
+    )
+    parser.add_argument(
+        "--stall-threshold",
+        type=float,
+        default=DEFAULT_STALL_THRESHOLD,
+        help="Report gaps between deltas longer than this many seconds as stalls",
+    )
+
     args = parser.parse_args()
-    
+
     # Get the prompt
     if args.prompt:
         # If prompt is provided as command line argument
@@ -479,8 +603,25 @@ def main():
         # Otherwise, ask for input
         prompt = input("Enter your prompt for Claude: ")
 
+    session = get_anthropic_session(pool_size=args.pool_size, http2=args.http2)
+
+    recorder = StreamRecorder(args.record, "anthropic") if args.record else None
+
     # Invoke the API with the specified options
-    response = invoke_anthropic_messages_stream(prompt, model_id=args.model, timestamp_mode=args.timestamp)
+    try:
+        response = invoke_anthropic_messages_stream(
+            prompt,
+            model_id=args.model,
+            timestamp_mode=args.timestamp,
+            speculative_writes=args.speculative_write,
+            session=session,
+            base_url=args.base_url.rstrip("/"),
+            recorder=recorder,
+            stall_threshold=args.stall_threshold,
+        )
+    finally:
+        if recorder is not None:
+            recorder.close()
     print(f"Response size: {len(response) if response else 0}")
 
 
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Asyncio client for the Bedrock Runtime converseStream API.
+
+boto3 is blocking, so every concurrent converseStream needs its own thread.
+`AsyncBedrockRuntimeClient` keeps many streams open in one event loop
+instead. Requests are still validated, serialized and signed by a regular
+botocore client (so credentials, endpoint resolution and SigV4 behave exactly
+as in the blocking path): a `before-send` hook captures the signed request
+instead of sending it. The request is then sent over a pooled asyncio
+connection and the AWS event-stream response is decoded incrementally with
+botocore's event-stream decoder and parser.
+
+    client = AsyncBedrockRuntimeClient(region_name="us-east-1")
+    response = await client.converse_stream(modelId=..., messages=...)
+    async for event in response["stream"]:
+        ...
+    await client.close()
+"""
+
+import asyncio
+import socket
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+from botocore import parsers
+from botocore.eventstream import EventStreamBuffer
+from botocore.exceptions import EventStreamError
+
+import transport_timing
+from clients import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_REGION,
+    create_bedrock_runtime_client,
+    get_session,
+)
+
+_OPERATION_NAME = "ConverseStream"
+_READ_SIZE = 65536
+
+# Set while a request is being built for the async path; the before-send hook
+# only intercepts requests on threads that set it
+_capture = threading.local()
+
+
+class _CapturedRequest(Exception):
+    """Raised from the before-send hook to hand the signed request back to the caller."""
+
+    def __init__(self, request):
+        super().__init__("request captured")
+        self.request = request
+
+
+def _capture_request(request, **kwargs):
+    if getattr(_capture, "active", False):
+        raise _CapturedRequest(request)
+    return None
+
+
+class _Connection:
+    """One HTTP/1.1 connection in the pool."""
+
+    def __init__(self, reader, writer, key):
+        self.reader = reader
+        self.writer = writer
+        self.key = key
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConverseStream:
+    """
+    Async iterator over the parsed events of one converseStream response.
+
+    The connection returns to the pool once the stream has been read to the
+    end; closing the stream early closes the connection.
+    """
+
+    def __init__(self, client, connection, body, parser, output_shape):
+        self._client = client
+        self._connection = connection
+        self._body = body
+        self._parser = parser
+        self._output_shape = output_shape
+        self._buffer = EventStreamBuffer()
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        completed = False
+        try:
+            async for chunk in self._body:
+                self._buffer.add_data(chunk)
+                for message in self._buffer:
+                    response_dict = message.to_response_dict()
+                    parsed = self._parser.parse(response_dict, self._output_shape)
+                    if response_dict["status_code"] != 200:
+                        raise EventStreamError(parsed, _OPERATION_NAME)
+                    if parsed:
+                        yield parsed
+            completed = True
+        finally:
+            self._release(reuse=completed)
+
+    async def close(self):
+        """Close the stream (and its connection) without reading the rest."""
+        self._release(reuse=False)
+
+    def _release(self, reuse):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._client._release(connection, reuse and self._body.reusable)
+
+
+class _ResponseBody:
+    """Async iterator over an HTTP/1.1 response body (chunked, sized or until close)."""
+
+    def __init__(self, reader, headers, read_timeout):
+        self._reader = reader
+        self._read_timeout = read_timeout
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self.reusable = headers.get("connection", "").lower() != "close" and (
+            self._chunked or self._remaining is not None
+        )
+
+    async def _read(self, coroutine):
+        return await asyncio.wait_for(coroutine, self._read_timeout)
+
+    def __aiter__(self):
+        if self._chunked:
+            return self._chunks()
+        return self._sized()
+
+    async def _chunks(self):
+        while True:
+            size_line = await self._read(self._reader.readline())
+            if not size_line:
+                raise ConnectionError("Connection closed in the middle of a chunked response")
+            size = int(size_line.split(b";", 1)[0], 16)
+            if size == 0:
+                # Skip trailers up to the terminating empty line
+                while (await self._read(self._reader.readline())) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            data = await self._read(self._reader.readexactly(size))
+            await self._read(self._reader.readline())
+            yield data
+
+    async def _sized(self):
+        while self._remaining is None or self._remaining > 0:
+            size = _READ_SIZE if self._remaining is None else min(_READ_SIZE, self._remaining)
+            data = await self._read(self._reader.read(size))
+            if not data:
+                if self._remaining:
+                    raise ConnectionError("Connection closed before the response was complete")
+                return
+            if self._remaining is not None:
+                self._remaining -= len(data)
+            yield data
+
+    async def read(self):
+        return b"".join([chunk async for chunk in self])
+
+
+class AsyncBedrockRuntimeClient:
+    """
+    converseStream client for asyncio with its own pool of HTTP/1.1 connections.
+
+    Create and use it from a single event loop.
+    """
+
+    def __init__(
+        self,
+        region_name=DEFAULT_REGION,
+        endpoint_url=None,
+        max_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        client=None,
+    ):
+        """
+        Args:
+            region_name (str): The AWS region
+            endpoint_url (str): Optional endpoint override, e.g. a local stand-in server
+            max_connections (int): Maximum number of open connections (and concurrent streams)
+            read_timeout (int): Socket read timeout in seconds
+            client: botocore bedrock-runtime client used to build and sign requests
+                (default: a new client on the shared session); it can be shared
+                by several async clients
+        """
+        if client is None:
+            client = create_bedrock_runtime_client(
+                region_name=region_name,
+                read_timeout=read_timeout,
+                endpoint_url=endpoint_url,
+                session=get_session(),
+            )
+        self._signing_client = client
+        self._read_timeout = read_timeout
+        client.meta.events.register(
+            f"before-send.bedrock-runtime.{_OPERATION_NAME}",
+            _capture_request,
+            unique_id="async-bedrock-capture-request",
+        )
+
+        operation_model = client.meta.service_model.operation_model(_OPERATION_NAME)
+        self._output_shape = operation_model.output_shape
+        self._event_shape = operation_model.output_shape.members["stream"]
+        self._parser = parsers.create_parser(client.meta.service_model.metadata["protocol"])
+        self._event_parser = self._parser.EVENT_STREAM_PARSER_CLS()
+
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._idle = {}
+        self._ssl_context = None
+
+    @property
+    def signing_client(self):
+        """The botocore client that builds and signs the requests."""
+        return self._signing_client
+
+    @property
+    def exceptions(self):
+        """The modeled exception classes of the underlying botocore client."""
+        return self._signing_client.exceptions
+
+    def _sign(self, params):
+        _capture.active = True
+        try:
+            self._signing_client.converse_stream(**params)
+        except _CapturedRequest as captured:
+            return captured.request
+        finally:
+            _capture.active = False
+        raise RuntimeError("converse_stream request was sent instead of captured")
+
+    async def _connect(self, scheme, host, port):
+        key = (scheme, host, port)
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if not connection.reader.at_eof() and not connection.writer.is_closing():
+                connection.reused = True
+                return connection
+            connection.close()
+
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        if transport_timing.current() is None:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl_context), self._read_timeout
+            )
+        else:
+            reader, writer = await asyncio.wait_for(
+                self._open_timed_connection(host, port, ssl_context), self._read_timeout
+            )
+        return _Connection(reader, writer, key)
+
+    async def _open_timed_connection(self, host, port, ssl_context):
+        # Resolve, connect and handshake one after the other, marking each phase
+        loop = asyncio.get_running_loop()
+        addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        transport_timing.mark("dns")
+        error = None
+        for family, type_, proto, _, sockaddr in addresses:
+            sock = socket.socket(family, type_, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, sockaddr)
+            except OSError as e:
+                sock.close()
+                error = e
+                continue
+            transport_timing.mark("connect")
+            reader, writer = await asyncio.open_connection(
+                sock=sock, ssl=ssl_context, server_hostname=host if ssl_context else None
+            )
+            if ssl_context:
+                transport_timing.mark("tls")
+            return reader, writer
+        raise (
+            error if error is not None else OSError(f"getaddrinfo returned no addresses for {host}")
+        )
+
+    def _release(self, connection, reuse):
+        if reuse:
+            self._idle.setdefault(connection.key, []).append(connection)
+        else:
+            connection.close()
+        self._semaphore.release()
+
+    async def prewarm(self, count=1):
+        """
+        Open pooled connections (TCP and TLS handshakes) to the endpoint ahead of time.
+
+        Args:
+            count (int): Number of connections to open
+
+        Returns:
+            int: Number of connections opened
+        """
+        url = urlsplit(self._signing_client.meta.endpoint_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        connections = await asyncio.gather(
+            *[self._connect(url.scheme, url.hostname, port) for _ in range(count)]
+        )
+        idle = self._idle.setdefault((url.scheme, url.hostname, port), [])
+        idle.extend(connections)
+        return len(connections)
+
+    async def converse_stream(self, **params):
+        """
+        Call converseStream and return once the response headers have arrived.
+
+        Args:
+            **params: The converse_stream parameters, as for the boto3 client
+
+        Returns:
+            dict: `stream` (an AsyncConverseStream) and `ResponseMetadata`
+        """
+        request = self._sign(params)
+        url = urlsplit(request.url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        path = url.path + ("?" + url.query if url.query else "")
+
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers = {key: value for key, value in request.headers.items()}
+        headers.setdefault("Host", url.netloc)
+        headers["Content-Length"] = str(len(body))
+        head = (
+            f"{request.method} {path} HTTP/1.1\r\n"
+            + "".join(
+                f"{key}: {value.decode() if isinstance(value, bytes) else value}\r\n"
+                for key, value in headers.items()
+            )
+            + "\r\n"
+        )
+
+        await self._semaphore.acquire()
+        connection = None
+        try:
+            while True:
+                connection = await self._connect(url.scheme, url.hostname, port)
+                try:
+                    connection.writer.write(head.encode("latin-1") + body)
+                    await connection.writer.drain()
+                    transport_timing.mark("request_sent")
+                    status, response_headers = await self._read_head(connection.reader)
+                    transport_timing.mark("headers")
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # A pooled connection the server has closed; retry on a new one
+                    if not connection.reused:
+                        raise
+                    connection.close()
+        except BaseException:
+            if connection is not None:
+                connection.close()
+            self._semaphore.release()
+            raise
+
+        response_body = _ResponseBody(connection.reader, response_headers, self._read_timeout)
+        metadata = {
+            "RequestId": response_headers.get("x-amzn-requestid"),
+            "HTTPStatusCode": status,
+            "HTTPHeaders": response_headers,
+        }
+        if status >= 300:
+            try:
+                raw = await response_body.read()
+            finally:
+                self._release(connection, reuse=False)
+            parsed = self._parser.parse(
+                {"status_code": status, "headers": response_headers, "body": raw},
+                self._output_shape,
+            )
+            parsed.setdefault("ResponseMetadata", {}).update(metadata)
+            error_code = parsed.get("Error", {}).get("Code")
+            raise self._signing_client.exceptions.from_code(error_code)(parsed, _OPERATION_NAME)
+
+        stream = AsyncConverseStream(
+            self, connection, response_body, self._event_parser, self._event_shape
+        )
+        return {"stream": stream, "ResponseMetadata": metadata}
+
+    async def _read_head(self, reader):
+        status_line = await asyncio.wait_for(reader.readline(), self._read_timeout)
+        if not status_line:
+            raise ConnectionError("Connection closed before the response status line")
+        status = int(status_line.split(None, 2)[1])
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self._read_timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def close(self):
+        """Close all idle pooled connections."""
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle = {}
@@ -1,13 +1,46 @@
-"""Analyze and compare benchmark results."""
+"""Analyze and compare benchmark results.
+
+Results are analyzed as NumPy columns: rows are grouped by sorting on the
+group keys once per metric, and every group's statistics (mean, min, max and
+linearly interpolated percentiles) are computed with array operations, so
+millions of rows need no Python loop per row.
+"""
+
 import csv
 import json
+import sys
 from pathlib import Path
-from collections import defaultdict
-import statistics
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmark.benchmark_runner import load_cross_region, transport_file
+from benchmark.columnar_store import RESULT_COLUMNS, load_columns
+from benchmark.significance import DEFAULT_RESAMPLES, compare_samples
+from transport_timing import PHASES
+
+# Metrics summarized per task type, and the stats key of each
+METRICS = {
+    "first_token_ms": "first_token",
+    "total_task_ms": "total_task",
+    "max_turn_ms": "max_turn",
+    "tool_calls_count": "tool_calls",
+}
+
+PERCENTILES = {"median": 50, "p95": 95, "p99": 99}
 
 
 def load_results(csv_file):
-    """Load results from CSV file."""
+    """Load results from the memory-mapped columnar store if it covers the CSV, else the CSV."""
+    columns = load_columns(csv_file)
+    if columns is not None:
+        # One C-level conversion per column instead of parsing every field
+        names = [column for column in RESULT_COLUMNS if column != "csv_row"]
+        values = [columns[column].tolist() for column in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
     results = []
     with open(csv_file, 'r') as f:
         reader = csv.DictReader(f)
@@ -20,156 +53,281 @@ def load_results(csv_file):
             row['tool_calls_count'] = int(row['tool_calls_count'])
             row['total_bedrock_requests'] = int(row.get('total_bedrock_requests', 0))
             row['cross_region_requests'] = int(row.get('cross_region_requests', 0))
+            row.setdefault("execution_id", "")
             results.append(row)
     return results
 
 
-def calculate_stats(values):
-    """Calculate statistics for a list of values."""
-    if not values:
-        return {}
-    
-    sorted_values = sorted(values)
-    n = len(sorted_values)
-    
+def load_result_columns(csv_file):
+    """Load results as a dict of NumPy columns, memory-mapped from the columnar store if possible.
+
+    Cross-region counts from the CSV's sidecar table are applied by execution ID.
+    """
+    columns = load_columns(csv_file)
+    if columns is None:
+        columns = results_to_columns(load_results(csv_file))
+    return apply_cross_region(columns, load_cross_region(csv_file))
+
+
+def apply_cross_region(columns, counts):
+    """Set `cross_region_requests` from sidecar counts keyed by execution ID.
+
+    Executions whose request IDs were not all found in CloudTrail get NaN, so
+    they count neither as same-region nor as cross-region.
+    """
+    if not counts or "execution_id" not in columns:
+        return columns
+    cross_region = np.array(columns["cross_region_requests"], dtype=float)
+    for index, execution_id in enumerate(np.asarray(columns["execution_id"]).tolist()):
+        entry = counts.get(execution_id)
+        if entry is None:
+            continue
+        if entry["attributed_requests"] < entry["total_requests"]:
+            cross_region[index] = np.nan
+        else:
+            cross_region[index] = entry["cross_region_requests"]
+    return {**columns, "cross_region_requests": cross_region}
+
+
+def results_to_columns(results):
+    """Convert result rows (dicts, as from load_results) to a dict of NumPy columns."""
+    if isinstance(results, dict):
+        return results
+    columns = {}
+    for column, kind in RESULT_COLUMNS.items():
+        if column == "csv_row":
+            continue
+        values = [row.get(column, "") for row in results]
+        if kind == "str":
+            columns[column] = np.array(values, dtype=str)
+        else:
+            columns[column] = np.array(
+                [np.nan if value == "" else value for value in values], dtype=float
+            )
+    return columns
+
+
+def _group_stats(values, starts, ends):
+    """Stats of sorted groups: `values` is sorted within each [start, end) range."""
+    counts = ends - starts
+    sums = np.add.reduceat(values, starts) if len(values) else np.zeros(0)
+    percentiles = {}
+    for name, percentile in PERCENTILES.items():
+        # Linear interpolation between the closest ranks (numpy's default method)
+        position = (counts - 1) * (percentile / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        fraction = position - lower
+        low_values = values[starts + lower]
+        percentiles[name] = low_values + (values[starts + upper] - low_values) * fraction
     return {
-        'mean': statistics.mean(values),
-        'median': statistics.median(values),
-        'min': min(values),
-        'max': max(values),
-        'p95': sorted_values[int(n * 0.95)] if n > 0 else 0,
-        'p99': sorted_values[int(n * 0.99)] if n > 0 else 0,
-        'count': n
+        "mean": sums / counts,
+        "median": percentiles["median"],
+        "min": values[starts],
+        "max": values[ends - 1],
+        "p95": percentiles["p95"],
+        "p99": percentiles["p99"],
+        "count": counts,
     }
 
 
+def _stats_of_group(stats, index):
+    return {
+        name: (int(array[index]) if name == "count" else float(array[index]))
+        for name, array in stats.items()
+    }
+
+
+def grouped_stats(columns, metric, by=("task_type",), mask=None):
+    """Statistics of one metric per group, for all groups at once.
+
+    Rows where `mask` is False or the metric is NaN are skipped.
+
+    Args:
+        columns: Dict of NumPy result columns
+        metric: The metric column
+        by: Columns to group by (e.g. ('api_type', 'model_id', 'task_type'))
+        mask: Optional boolean array selecting the rows
+
+    Returns:
+        Dict from group key (the value, or a tuple for several `by` columns)
+        to calculate_stats-style dicts
+    """
+    values = np.asarray(columns[metric], dtype=float)
+    selected = ~np.isnan(values)
+    if mask is not None:
+        selected &= mask
+    rows = np.flatnonzero(selected)
+    if not len(rows):
+        return {}
+    values = values[rows]
+    keys = [np.asarray(columns[column])[rows] for column in by]
+
+    # One sort orders the rows by group and by value within each group
+    order = np.lexsort([values] + keys[::-1])
+    values = values[order]
+    keys = [key[order] for key in keys]
+    changed = np.zeros(len(values), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changed)
+    ends = np.append(starts[1:], len(values))
+
+    stats = _group_stats(values, starts, ends)
+    grouped = {}
+    for index, start in enumerate(starts):
+        group = tuple(key[start].item() for key in keys)
+        grouped[group[0] if len(group) == 1 else group] = _stats_of_group(stats, index)
+    return grouped
+
+
+def calculate_stats(values):
+    """Calculate statistics for a list of values (percentiles linearly interpolated)."""
+    values = np.asarray(values, dtype=float)
+    values = np.sort(values[~np.isnan(values)])
+    if not len(values):
+        return {}
+    return _stats_of_group(_group_stats(values, np.array([0]), np.array([len(values)])), 0)
+
+
+def _success(columns):
+    return np.asarray(columns["status"]) == "success"
+
+
 def analyze_by_task_type(results):
     """Group results by task type and calculate statistics."""
-    grouped = defaultdict(lambda: {
-        'first_token_ms': [],
-        'total_task_ms': [],
-        'max_turn_ms': [],
-        'tool_calls_count': [],
-        'cross_region_pct': []
-    })
-    
-    for row in results:
-        if row['status'] == 'success':
-            task_type = row['task_type']
-            grouped[task_type]['first_token_ms'].append(row['first_token_ms'])
-            grouped[task_type]['total_task_ms'].append(row['total_task_ms'])
-            grouped[task_type]['max_turn_ms'].append(row['max_turn_ms'])
-            grouped[task_type]['tool_calls_count'].append(row['tool_calls_count'])
-            
-            # Calculate cross-region percentage for this task
-            total_requests = row.get('total_bedrock_requests', 0)
-            cross_region = row.get('cross_region_requests', 0)
-            if total_requests > 0:
-                pct = (cross_region / total_requests) * 100
-                grouped[task_type]['cross_region_pct'].append(pct)
-    
+    columns = results_to_columns(results)
+    success = _success(columns)
+
     stats = {}
-    for task_type, metrics in grouped.items():
-        stats[task_type] = {
-            'first_token': calculate_stats(metrics['first_token_ms']),
-            'total_task': calculate_stats(metrics['total_task_ms']),
-            'max_turn': calculate_stats(metrics['max_turn_ms']),
-            'tool_calls': calculate_stats(metrics['tool_calls_count']),
-            'cross_region_pct': calculate_stats(metrics['cross_region_pct']) if metrics['cross_region_pct'] else {}
-        }
-    
+    for metric, name in METRICS.items():
+        for task_type, metric_stats in grouped_stats(columns, metric, mask=success).items():
+            stats.setdefault(task_type, {})[name] = metric_stats
+
+    # Cross-region percentage of the tasks that made requests
+    total_requests = np.asarray(columns["total_bedrock_requests"], dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross_region_pct = (
+            np.asarray(columns["cross_region_requests"], dtype=float) / total_requests * 100
+        )
+    pct_stats = grouped_stats(
+        {**columns, "cross_region_pct": cross_region_pct},
+        "cross_region_pct",
+        mask=success & (total_requests > 0),
+    )
+    for task_type in stats:
+        stats[task_type]["cross_region_pct"] = pct_stats.get(task_type, {})
+
+    return stats
+
+
+def analyze_by_model(results):
+    """Statistics per API, model and task type, keyed 'api_type/model_id/task_type'."""
+    columns = results_to_columns(results)
+    success = _success(columns)
+    stats = {}
+    for metric, name in METRICS.items():
+        grouped = grouped_stats(
+            columns, metric, by=("api_type", "model_id", "task_type"), mask=success
+        )
+        for key, metric_stats in grouped.items():
+            stats.setdefault("/".join(key), {})[name] = metric_stats
     return stats
 
 
 def analyze_cross_region_impact(bedrock_results):
     """Analyze latency impact of cross-region requests.
-    
+
     Args:
-        bedrock_results: List of Bedrock result rows
-        
+        bedrock_results: Bedrock results (rows or columns)
+
     Returns:
         Dict with cross-region vs same-region statistics
     """
-    same_region = defaultdict(list)
-    cross_region = defaultdict(list)
-    
-    for row in bedrock_results:
-        if row['status'] != 'success':
-            continue
-        
-        total_requests = row.get('total_bedrock_requests', 0)
-        cross_requests = row.get('cross_region_requests', 0)
-        
-        if total_requests == 0:
-            continue
-        
-        task_type = row['task_type']
-        
-        # Categorize as same-region or cross-region
-        if cross_requests == 0:
-            # All requests were same-region
-            same_region[task_type].append({
-                'first_token_ms': row['first_token_ms'],
-                'total_task_ms': row['total_task_ms'],
-                'max_turn_ms': row['max_turn_ms']
-            })
-        elif cross_requests == total_requests:
-            # All requests were cross-region
-            cross_region[task_type].append({
-                'first_token_ms': row['first_token_ms'],
-                'total_task_ms': row['total_task_ms'],
-                'max_turn_ms': row['max_turn_ms']
-            })
-        # Skip mixed requests for cleaner comparison
-    
-    # Calculate statistics
+    columns = results_to_columns(bedrock_results)
+    success = _success(columns)
+    total_requests = np.asarray(columns["total_bedrock_requests"])
+    cross_requests = np.asarray(columns["cross_region_requests"])
+    made_requests = success & (total_requests > 0)
+
+    # All requests same-region vs all cross-region; mixed tasks are skipped for a cleaner comparison
+    groups = {
+        "same_region": made_requests & (cross_requests == 0),
+        "cross_region": made_requests & (cross_requests == total_requests),
+    }
+
     stats = {}
-    for task_type in set(list(same_region.keys()) + list(cross_region.keys())):
-        stats[task_type] = {}
-        
-        if task_type in same_region:
-            same_data = same_region[task_type]
-            stats[task_type]['same_region'] = {
-                'first_token': calculate_stats([r['first_token_ms'] for r in same_data]),
-                'total_task': calculate_stats([r['total_task_ms'] for r in same_data]),
-                'max_turn': calculate_stats([r['max_turn_ms'] for r in same_data])
-            }
-        
-        if task_type in cross_region:
-            cross_data = cross_region[task_type]
-            stats[task_type]['cross_region'] = {
-                'first_token': calculate_stats([r['first_token_ms'] for r in cross_data]),
-                'total_task': calculate_stats([r['total_task_ms'] for r in cross_data]),
-                'max_turn': calculate_stats([r['max_turn_ms'] for r in cross_data])
-            }
-    
+    for group, mask in groups.items():
+        for metric in ["first_token_ms", "total_task_ms", "max_turn_ms"]:
+            for task_type, metric_stats in grouped_stats(columns, metric, mask=mask).items():
+                stats.setdefault(task_type, {}).setdefault(group, {})[
+                    METRICS[metric]
+                ] = metric_stats
+
     return stats
 
 
-def compare_apis(bedrock_stats, anthropic_stats):
-    """Compare Bedrock vs Anthropic statistics."""
+def _task_samples(columns, metric, task_type):
+    """Values of a metric for the successful executions of a task type."""
+    values = np.asarray(columns[metric], dtype=float)
+    mask = _success(columns) & (np.asarray(columns["task_type"]) == task_type) & ~np.isnan(values)
+    return values[mask]
+
+
+def compare_apis(
+    bedrock_stats,
+    anthropic_stats,
+    bedrock_results=None,
+    anthropic_results=None,
+    resamples=DEFAULT_RESAMPLES,
+    seed=None,
+):
+    """Compare Bedrock vs Anthropic statistics.
+
+    With the results themselves, each metric also gets bootstrap confidence
+    intervals for the median and p95 differences, a Mann-Whitney p-value and
+    the number of additional runs needed for the difference to become
+    significant (see significance.py).
+    """
     comparison = {}
-    
+    if bedrock_results is not None and anthropic_results is not None:
+        bedrock_columns = results_to_columns(bedrock_results)
+        anthropic_columns = results_to_columns(anthropic_results)
+    else:
+        bedrock_columns = anthropic_columns = None
+
     for task_type in bedrock_stats.keys():
         if task_type not in anthropic_stats:
             continue
-        
+
         comparison[task_type] = {}
-        
+
         for metric in ['first_token', 'max_turn', 'total_task']:
             bedrock_mean = bedrock_stats[task_type][metric]['mean']
             anthropic_mean = anthropic_stats[task_type][metric]['mean']
-            
+
             diff = bedrock_mean - anthropic_mean
             pct_diff = (diff / anthropic_mean * 100) if anthropic_mean > 0 else 0
-            
+
             comparison[task_type][metric] = {
                 'bedrock_mean': bedrock_mean,
                 'anthropic_mean': anthropic_mean,
                 'diff_ms': diff,
                 'pct_diff': pct_diff
             }
-    
+
+            if bedrock_columns is not None:
+                column = f"{metric}_ms"
+                comparison[task_type][metric].update(
+                    compare_samples(
+                        _task_samples(bedrock_columns, column, task_type),
+                        _task_samples(anthropic_columns, column, task_type),
+                        resamples=resamples,
+                        seed=seed,
+                    )
+                )
+
     return comparison
 
 
@@ -177,25 +335,132 @@ def save_comparison_csv(comparison, output_file):
     """Save comparison to CSV."""
     with open(output_file, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow([
-            'task_type',
-            'metric',
-            'bedrock_mean_ms',
-            'anthropic_mean_ms',
-            'diff_ms',
-            'pct_diff'
-        ])
-        
+        writer.writerow(
+            [
+                "task_type",
+                "metric",
+                "bedrock_mean_ms",
+                "anthropic_mean_ms",
+                "diff_ms",
+                "pct_diff",
+                "median_diff_ms",
+                "median_diff_ci_low_ms",
+                "median_diff_ci_high_ms",
+                "p95_diff_ms",
+                "p95_diff_ci_low_ms",
+                "p95_diff_ci_high_ms",
+                "mann_whitney_p",
+                "more_runs_needed",
+            ]
+        )
+
         for task_type, metrics in comparison.items():
             for metric, values in metrics.items():
-                writer.writerow([
-                    task_type,
-                    metric,
-                    f"{values['bedrock_mean']:.2f}",
-                    f"{values['anthropic_mean']:.2f}",
-                    f"{values['diff_ms']:.2f}",
-                    f"{values['pct_diff']:.1f}%"
-                ])
+                writer.writerow(
+                    [
+                        task_type,
+                        metric,
+                        f"{values['bedrock_mean']:.2f}",
+                        f"{values['anthropic_mean']:.2f}",
+                        f"{values['diff_ms']:.2f}",
+                        f"{values['pct_diff']:.1f}%",
+                        *[
+                            f"{values[key]:.2f}" if key in values else ""
+                            for key in (
+                                "median_diff",
+                                "median_ci_low",
+                                "median_ci_high",
+                                "p95_diff",
+                                "p95_ci_low",
+                                "p95_ci_high",
+                            )
+                        ],
+                        f"{values['p_value']:.4f}" if "p_value" in values else "",
+                        (
+                            values.get("more_runs_needed", "")
+                            if values.get("more_runs_needed") is not None
+                            else ""
+                        ),
+                    ]
+                )
+
+
+def analyze_transport(csv_file):
+    """Median duration of each connection phase, for requests on new and on reused connections.
+
+    Reads the per-request transport table next to the results CSV; a phase's
+    duration runs from the end of the previous phase that happened (or the
+    start of the request).
+
+    Returns:
+        Dict from 'new_connection' / 'reused_connection' to {'count': n, phase: median ms}
+        (empty if there is no transport table)
+    """
+    path = transport_file(csv_file)
+    if not path.exists():
+        return {}
+    with open(path, "r", newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return {}
+    offsets = {
+        phase: np.array(
+            [float(row[f"{phase}_ms"]) if row.get(f"{phase}_ms") else np.nan for row in rows]
+        )
+        for phase in PHASES
+    }
+    reused = np.array([row.get("reused_connection") == "1" for row in rows])
+
+    # Duration since the previous phase that happened, per request
+    durations = {}
+    previous = np.zeros(len(rows))
+    for phase in PHASES:
+        durations[phase] = offsets[phase] - previous
+        previous = np.where(np.isnan(offsets[phase]), previous, offsets[phase])
+
+    stats = {}
+    for group, mask in (("new_connection", ~reused), ("reused_connection", reused)):
+        if not mask.any():
+            continue
+        stats[group] = {"count": int(mask.sum())}
+        for phase in PHASES:
+            values = durations[phase][mask]
+            values = values[~np.isnan(values)]
+            stats[group][phase] = float(np.median(values)) if len(values) else None
+    return stats
+
+
+def print_transport_summary(transport_stats):
+    """Print the median phase durations per API and connection type."""
+    if not any(transport_stats.values()):
+        return
+    print("\n" + "=" * 80)
+    print("CONNECTION PHASES (median ms per request)")
+    print("=" * 80)
+    print(f"{'':28s}{'n':>6s}" + "".join(f"{phase:>13s}" for phase in PHASES))
+    for api, groups in transport_stats.items():
+        for group, stats in groups.items():
+            cells = "".join(
+                f"{stats[phase]:13.1f}" if stats[phase] is not None else f"{'-':>13s}"
+                for phase in PHASES
+            )
+            print(f"{api + ' ' + group.replace('_', ' '):28s}{stats['count']:6d}{cells}")
+
+
+def _format_significance(values):
+    if values["significant"]:
+        verdict = "significant"
+    elif values["more_runs_needed"] is None:
+        verdict = "no difference"
+    else:
+        verdict = f"not significant, ~{values['more_runs_needed']} more runs needed"
+    return (
+        f"{'':22s}Median diff {values['median_diff']:+.1f}ms "
+        f"[{values['median_ci_low']:+.1f}, {values['median_ci_high']:+.1f}]  "
+        f"p95 diff {values['p95_diff']:+.1f}ms "
+        f"[{values['p95_ci_low']:+.1f}, {values['p95_ci_high']:+.1f}]  "
+        f"Mann-Whitney p={values['p_value']:.3f} ({verdict})"
+    )
 
 
 def print_summary(bedrock_stats, anthropic_stats, comparison, cross_region_stats=None):
@@ -203,34 +468,36 @@ def print_summary(bedrock_stats, anthropic_stats, comparison, cross_region_stats
     print("\n" + "="*80)
     print("BENCHMARK RESULTS SUMMARY")
     print("="*80)
-    
+
     for task_type in sorted(bedrock_stats.keys()):
         print(f"\n{task_type.upper()}")
         print("-" * 80)
-        
+
         if task_type in anthropic_stats:
             comp = comparison[task_type]
-            
+
             for metric in ['first_token', 'max_turn', 'total_task']:
                 metric_name = metric.replace('_', ' ').title()
                 bedrock = comp[metric]['bedrock_mean']
                 anthropic = comp[metric]['anthropic_mean']
                 diff = comp[metric]['diff_ms']
                 pct = comp[metric]['pct_diff']
-                
+
                 print(f"{metric_name:20s}: Bedrock={bedrock:7.1f}ms  Anthropic={anthropic:7.1f}ms  "
                       f"Diff={diff:+7.1f}ms ({pct:+.1f}%)")
-        
+                if "p_value" in comp[metric]:
+                    print(_format_significance(comp[metric]))
+
         # Print cross-region stats if available
         if cross_region_stats and task_type in cross_region_stats:
             cr_stats = cross_region_stats[task_type]
-            
+
             # Print cross-region percentage
             if 'cross_region_pct' in bedrock_stats[task_type]:
                 pct_stats = bedrock_stats[task_type]['cross_region_pct']
                 if pct_stats:
                     print(f"\nCross-Region Requests: {pct_stats.get('mean', 0):.1f}% (avg)")
-            
+
             # Compare same-region vs cross-region latency
             if 'same_region' in cr_stats and 'cross_region' in cr_stats:
                 print("\nSame-Region vs Cross-Region Latency:")
@@ -239,64 +506,117 @@ def print_summary(bedrock_stats, anthropic_stats, comparison, cross_region_stats
                     cross = cr_stats['cross_region'][metric]['mean']
                     diff = cross - same
                     pct_diff = (diff / same * 100) if same > 0 else 0
-                    
+
                     metric_name = metric.replace('_', ' ').title()
                     print(f"  {metric_name:18s}: Same={same:7.1f}ms  Cross={cross:7.1f}ms  "
                           f"Diff={diff:+7.1f}ms ({pct_diff:+.1f}%)")
 
 
-def main():
+def main(args=None):
     """Main analysis function."""
     results_dir = Path('benchmark/results')
-    
+
     # Check if result files exist
     bedrock_file = results_dir / 'bedrock_raw.csv'
     anthropic_file = results_dir / 'anthropic_raw.csv'
-    
+
+    if args is not None and args.follow:
+        from benchmark.live_analysis import follow
+
+        follow(
+            {"bedrock": bedrock_file, "anthropic": anthropic_file},
+            args.interval,
+            args.tolerance,
+            args.stop_when_converged,
+        )
+        return
+
     if not bedrock_file.exists():
         print(f"Error: {bedrock_file} not found")
         return
-    
+
     if not anthropic_file.exists():
         print(f"Error: {anthropic_file} not found")
         return
-    
+
     # Load results
     print("Loading results...")
-    bedrock_results = load_results(bedrock_file)
-    anthropic_results = load_results(anthropic_file)
-    
-    print(f"Loaded {len(bedrock_results)} Bedrock results")
-    print(f"Loaded {len(anthropic_results)} Anthropic results")
-    
+    bedrock_results = load_result_columns(bedrock_file)
+    anthropic_results = load_result_columns(anthropic_file)
+
+    print(f"Loaded {len(bedrock_results['task_id'])} Bedrock results")
+    print(f"Loaded {len(anthropic_results['task_id'])} Anthropic results")
+
     # Analyze
     print("\nAnalyzing...")
     bedrock_stats = analyze_by_task_type(bedrock_results)
     anthropic_stats = analyze_by_task_type(anthropic_results)
-    comparison = compare_apis(bedrock_stats, anthropic_stats)
-    
+    comparison = compare_apis(bedrock_stats, anthropic_stats, bedrock_results, anthropic_results)
+
     # Analyze cross-region impact
     cross_region_stats = analyze_cross_region_impact(bedrock_results)
-    
+
     # Save comparison
     output_file = results_dir / 'comparison_report.csv'
     save_comparison_csv(comparison, output_file)
     print(f"\n✓ Comparison saved to {output_file}")
-    
+
     # Print summary
     print_summary(bedrock_stats, anthropic_stats, comparison, cross_region_stats)
-    
+
+    transport_stats = {
+        "bedrock": analyze_transport(bedrock_file),
+        "anthropic": analyze_transport(anthropic_file),
+    }
+    print_transport_summary(transport_stats)
+
     # Save detailed JSON
     json_output = results_dir / 'detailed_stats.json'
     with open(json_output, 'w') as f:
-        json.dump({
-            'bedrock': bedrock_stats,
-            'anthropic': anthropic_stats,
-            'comparison': comparison,
-            'cross_region': cross_region_stats
-        }, f, indent=2)
+        json.dump(
+            {
+                "bedrock": bedrock_stats,
+                "anthropic": anthropic_stats,
+                "comparison": comparison,
+                "cross_region": cross_region_stats,
+                "transport": transport_stats,
+                "by_model": {
+                    **analyze_by_model(bedrock_results),
+                    **analyze_by_model(anthropic_results),
+                },
+            },
+            f,
+            indent=2,
+        )
     print(f"\n✓ Detailed stats saved to {json_output}")
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    from benchmark.live_analysis import DEFAULT_POLL_INTERVAL, DEFAULT_TOLERANCE
+
+    parser = argparse.ArgumentParser(description="Analyze and compare benchmark results")
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Follow the results files while the benchmarks run and print a live comparison",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"Seconds between polls in follow mode (default: {DEFAULT_POLL_INTERVAL})",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Relative 95%% CI half-width at which a mean counts as converged "
+        f"(default: {DEFAULT_TOLERANCE})",
+    )
+    parser.add_argument(
+        "--stop-when-converged",
+        action="store_true",
+        help="Exit follow mode once every mean has converged",
+    )
+    main(parser.parse_args())
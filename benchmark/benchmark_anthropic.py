@@ -1,44 +1,72 @@
 """Anthropic API benchmark script."""
 import json
-import os
 import sys
 from pathlib import Path
 
-import requests
 from sseclient import SSEClient
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from benchmark.benchmark_runner import BenchmarkRunner, TaskExecutor
+from benchmark.benchmark_runner import (
+    DEFAULT_OPEN_LOOP_WORKERS,
+    BenchmarkRunner,
+    TaskExecutor,
+    run_open_loop,
+    run_tasks,
+)
 from benchmark.mock_tools import MockToolExecutor
-
+from clients import (
+    ANTHROPIC_BASE_URL,
+    DEFAULT_ANTHROPIC_POOL_SIZE,
+    create_anthropic_session,
+    get_anthropic_api_key,
+    get_anthropic_session,
+)
+from delta_timeline import DEFAULT_STALL_THRESHOLD
+from partial_json import StreamingJsonObjectParser
 
 class AnthropicTaskExecutor(TaskExecutor):
     """Anthropic-specific task executor."""
-    
+
     MODEL_ID = "claude-sonnet-4-5-20250929"
-    
-    def __init__(self, api_key, mock_tool_executor, benchmark_runner):
-        # Create a simple client wrapper
+
+    def __init__(
+        self,
+        api_key,
+        mock_tool_executor,
+        benchmark_runner,
+        session=None,
+        base_url=ANTHROPIC_BASE_URL,
+        owns_session: bool = False,
+    ):
+        # The pooled HTTP session plays the role of the API client (and is closed
+        # with the executor if it owns it)
         self.api_key = api_key
-        super().__init__(None, mock_tool_executor, benchmark_runner, self.MODEL_ID)
+        self.base_url = base_url
+        super().__init__(
+            session or get_anthropic_session(),
+            mock_tool_executor,
+            benchmark_runner,
+            self.MODEL_ID,
+            owns_session,
+        )
         self.current_assistant_content = []
-    
+
     def _execute_api_call(self, task_def: dict):
         """Execute Anthropic API call with streaming."""
         # Reset assistant content for this turn
         self.current_assistant_content = []
-        
-        url = "https://api.anthropic.com/v1/messages"
-        
+
+        url = f"{self.base_url}/v1/messages"
+
         headers = {
             "anthropic-version": "2023-06-01",
             "content-type": "application/json",
             "x-api-key": self.api_key,
             "accept": "text/event-stream"
         }
-        
+
         # Define tools
         tools = [{
             "name": "fs_write",
@@ -62,7 +90,7 @@ class AnthropicTaskExecutor(TaskExecutor):
                 "required": ["path"]
             }
         }]
-        
+
         payload = {
             "model": self.MODEL_ID,
             "messages": self.messages,
@@ -70,86 +98,95 @@ class AnthropicTaskExecutor(TaskExecutor):
             "max_tokens": 4096,
             "stream": True
         }
-        
-        # Make streaming request
-        response = requests.post(url, headers=headers, json=payload, stream=True)
+
+        # Make streaming request on a pooled connection
+        response = self.api_client.post(url, headers=headers, json=payload, stream=True)
+        self.request_timing.request_id = response.headers.get("request-id", "")
         response.raise_for_status()
-        
+
         # Process SSE stream
         client = SSEClient(response)
         for event in client.events():
             if event.data:
                 self._process_event(event.data)
-        
+
         self._mark_stream_end()
-        
+
         # Add assistant message to conversation
         self.messages.append({
             "role": "assistant",
             "content": self.current_assistant_content
         })
-    
+
     def _process_event(self, data: str):
         """Process a single SSE event."""
+        self._mark_stream_event()
         if data == '[DONE]':
             return
-        
+
         try:
             event_data = json.loads(data)
             event_type = event_data.get('type')
-            
+
             if event_type == 'message_start':
                 pass
-            
+
             elif event_type == 'content_block_start':
                 # Check if this is a tool use block
                 block = event_data.get('content_block', {})
                 if block.get('type') == 'tool_use':
                     self.tool_calls_count += 1
                     self._mark_first_token()
-                    
-                    # Track tool use for conversation
+
+                    # Track tool use for conversation; the input dict is filled
+                    # field by field as the parser sees each value close
+                    self.current_tool_parser = StreamingJsonObjectParser()
                     self.current_tool_use = {
                         "type": "tool_use",
-                        "id": block.get('id'),
-                        "name": block.get('name'),
-                        "input": {}
+                        "id": block.get("id"),
+                        "name": block.get("name"),
+                        "input": self.current_tool_parser.fields,
                     }
                 elif block.get('type') == 'text':
                     # Text content block
                     self.current_text_block = {"type": "text", "text": ""}
-            
+                    self.current_text_parts = []
+
             elif event_type == 'content_block_delta':
                 delta = event_data.get('delta', {})
-                
+
                 if delta.get('type') == 'text_delta':
                     self._mark_first_token()
-                    # Accumulate text
+                    self._record_delta("text", delta.get("text", ""))
+                    # Accumulate text chunks, joined once at content_block_stop
                     if hasattr(self, 'current_text_block'):
-                        self.current_text_block["text"] += delta.get('text', '')
-                
+                        self.current_text_parts.append(delta.get("text", ""))
+
                 elif delta.get('type') == 'input_json_delta':
                     self._mark_first_token()
+                    self._record_delta("toolUse", delta.get("partial_json", ""))
                     # Accumulate tool input
                     if hasattr(self, 'current_tool_use'):
                         partial_json = delta.get('partial_json', '')
-                        if partial_json:
-                            # Accumulate JSON string (will parse at end)
-                            if 'input_json' not in self.current_tool_use:
-                                self.current_tool_use['input_json'] = ''
-                            self.current_tool_use['input_json'] += partial_json
-            
+                        if partial_json and self.current_tool_parser is not None:
+                            # Parse the JSON incrementally as fragments arrive
+                            try:
+                                self.current_tool_parser.feed(partial_json)
+                            except json.JSONDecodeError:
+                                self.current_tool_parser = None
+
             elif event_type == 'content_block_stop':
                 # Finalize current content block
                 if hasattr(self, 'current_tool_use'):
-                    # Parse accumulated JSON
-                    if 'input_json' in self.current_tool_use:
+                    # Finish the incrementally parsed JSON
+                    if self.current_tool_parser is not None:
                         try:
-                            self.current_tool_use['input'] = json.loads(self.current_tool_use['input_json'])
-                            del self.current_tool_use['input_json']
-                        except:
+                            self.current_tool_use["input"] = self.current_tool_parser.close()
+                        except json.JSONDecodeError:
+                            # Keep the fields that did complete
                             pass
-                    
+                    self.current_tool_parser = None
+
                     self.current_assistant_content.append(self.current_tool_use)
                     # Add to pending tool uses
                     self.pending_tool_uses.append({
@@ -159,20 +196,22 @@ class AnthropicTaskExecutor(TaskExecutor):
                     })
                     delattr(self, 'current_tool_use')
                 elif hasattr(self, 'current_text_block'):
+                    self.current_text_block["text"] = "".join(self.current_text_parts)
                     self.current_assistant_content.append(self.current_text_block)
                     delattr(self, 'current_text_block')
-            
+                    delattr(self, "current_text_parts")
+
             elif event_type == 'message_delta':
                 delta = event_data.get('delta', {})
                 if 'stop_reason' in delta:
                     self.stop_reason = delta['stop_reason']
-            
+
             elif event_type == 'message_stop':
                 pass
-        
+
         except json.JSONDecodeError:
             pass
-    
+
     def _add_tool_results_to_conversation(self, tool_results):
         """Add tool results to conversation in Anthropic format."""
         # Anthropic expects tool results in user message
@@ -183,55 +222,166 @@ class AnthropicTaskExecutor(TaskExecutor):
                 "tool_use_id": result['tool_use_id'],
                 "content": result['content']
             })
-        
+
         self.messages.append({
             "role": "user",
             "content": content
         })
 
 
-def run_benchmark(num_runs: int = 5):
-    """Run Anthropic benchmark."""
+def run_benchmark(
+    num_runs: int = 5,
+    pool_size: int = DEFAULT_ANTHROPIC_POOL_SIZE,
+    http2: bool = False,
+    cold_connections: bool = False,
+    concurrency: int = None,
+    rate: float = None,
+    arrival: str = "poisson",
+    base_url: str = ANTHROPIC_BASE_URL,
+    stall_threshold: float = DEFAULT_STALL_THRESHOLD,
+):
+    """Run Anthropic benchmark.
+
+    Args:
+        num_runs: Number of runs per task
+        pool_size: Maximum number of pooled connections to the API
+        http2: Whether to use HTTP/2 (requires httpx[http2])
+        cold_connections: Open a new connection for every task, so the TCP+TLS
+            handshake is included in the first-token time
+        concurrency: Number of task executions in flight at once (with `rate`,
+            defaults to DEFAULT_OPEN_LOOP_WORKERS)
+        rate: Open-loop arrival rate in tasks per second; None runs the tasks closed-loop
+        arrival: Open-loop arrival process, 'fixed' or 'poisson'
+        base_url: The API base URL, e.g. a local mock_anthropic_server.py
+        stall_threshold: Minimum gap in seconds between deltas that counts as a stall
+    """
+    if concurrency is None:
+        concurrency = DEFAULT_OPEN_LOOP_WORKERS if rate else 1
+
     print("Starting Anthropic API benchmark...")
-    
+
     # Get API key
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    api_key = get_anthropic_api_key(base_url)
     if not api_key:
         print("Error: ANTHROPIC_API_KEY environment variable not set")
         sys.exit(1)
-    
+
     # Initialize components
-    mock_tools = MockToolExecutor()
-    runner = BenchmarkRunner('anthropic', 'benchmark/results/anthropic_raw.csv')
-    executor = AnthropicTaskExecutor(api_key, mock_tools, runner)
-    
+    runner = BenchmarkRunner(
+        "anthropic", "benchmark/results/anthropic_raw.csv", stall_threshold=stall_threshold
+    )
+    # Connections (one per concurrent task) are opened up front, so handshakes stay out of TTFT
+    pool_size = max(pool_size, concurrency)
+    session = get_anthropic_session(
+        pool_size=pool_size,
+        http2=http2,
+        prewarm=0 if cold_connections else concurrency,
+        base_url=base_url,
+    )
+
+    def make_executor():
+        # Per-task executor and mock tools; the runner and the session are shared,
+        # except that cold tasks get their own session, closed when the task finishes
+        if not cold_connections:
+            return AnthropicTaskExecutor(
+                api_key, MockToolExecutor(), runner, session=session, base_url=base_url
+            )
+        return AnthropicTaskExecutor(
+            api_key,
+            MockToolExecutor(),
+            runner,
+            session=create_anthropic_session(pool_size, http2),
+            base_url=base_url,
+            owns_session=True,
+        )
+
     # Load tasks
     tasks_file = Path('benchmark/tasks/task_definitions.json')
     with open(tasks_file) as f:
         tasks = json.load(f)
-    
-    # Run each task multiple times
-    for run_num in range(1, num_runs + 1):
-        print(f"\n=== Run {run_num}/{num_runs} ===")
-        
-        for task in tasks:
-            task_id = task['task_id']
-            print(f"Executing {task_id}...", end=' ')
-            
-            result = executor.execute_task(task)
-            
-            if result['status'] == 'success':
-                print(f"✓ ({result['total_task_ms']:.0f}ms)")
-            else:
-                print(f"✗ {result.get('message', 'Unknown error')}")
-    
+
+    if rate:
+        # Issue num_runs rounds of tasks at the target rate, independent of completions
+        run_open_loop(
+            make_executor,
+            tasks,
+            runner,
+            rate,
+            num_runs * len(tasks),
+            arrival=arrival,
+            max_workers=concurrency,
+        )
+    else:
+        # Run each task multiple times
+        run_tasks(make_executor, tasks, num_runs, concurrency=concurrency)
+
+    runner.close()
     print(f"\n✓ Benchmark complete. Results saved to {runner.output_file}")
+    print(f"  Latency histograms saved to {runner.histograms_file}")
 
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='Run Anthropic API benchmark')
     parser.add_argument('--runs', type=int, default=5, help='Number of runs per task')
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=DEFAULT_ANTHROPIC_POOL_SIZE,
+        help="Maximum number of pooled connections to the API",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Use HTTP/2 (requires the optional httpx[http2] package)",
+    )
+    parser.add_argument(
+        "--cold-connections",
+        action="store_true",
+        help="Open a new connection per task (handshake counted in TTFT)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Number of task executions to run in parallel (default: 1, or "
+        f"{DEFAULT_OPEN_LOOP_WORKERS} with --rate)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Open-loop mode: issue tasks at this many per second, independent of completions",
+    )
+    parser.add_argument(
+        "--arrival",
+        choices=["fixed", "poisson"],
+        default="poisson",
+        help="Open-loop arrival process (default: poisson)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=ANTHROPIC_BASE_URL,
+        help="API base URL, e.g. a local mock_anthropic_server.py "
+        "(default: $ANTHROPIC_BASE_URL or the public API)",
+    )
+    parser.add_argument(
+        "--stall-threshold",
+        type=float,
+        default=DEFAULT_STALL_THRESHOLD,
+        help="Count gaps between deltas longer than this many seconds as stalls "
+        f"(default: {DEFAULT_STALL_THRESHOLD})",
+    )
     args = parser.parse_args()
-    
-    run_benchmark(args.runs)
+
+    run_benchmark(
+        args.runs,
+        pool_size=args.pool_size,
+        http2=args.http2,
+        cold_connections=args.cold_connections,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        arrival=args.arrival,
+        base_url=args.base_url.rstrip("/"),
+        stall_threshold=args.stall_threshold,
+    )
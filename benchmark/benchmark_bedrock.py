@@ -1,34 +1,78 @@
 """Bedrock API benchmark script."""
-import csv
+import asyncio
 import json
 import sys
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 
-import boto3
-
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from benchmark.benchmark_runner import BenchmarkRunner, TaskExecutor
+from async_bedrock import AsyncBedrockRuntimeClient
+from benchmark.benchmark_runner import (
+    DEFAULT_OPEN_LOOP_WORKERS,
+    BenchmarkRunner,
+    TaskExecutor,
+    append_cross_region,
+    cross_region_file,
+    load_cross_region,
+    load_request_ids,
+    run_open_loop,
+    run_tasks,
+    run_tasks_async,
+)
 from benchmark.mock_tools import MockToolExecutor
 from benchmark.query_cloudtrail import CloudTrailQuerier
-
+from clients import (
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    create_bedrock_runtime_client,
+    get_bedrock_runtime_client,
+    get_session,
+)
+from delta_timeline import DEFAULT_STALL_THRESHOLD
+from partial_json import StreamingJsonObjectParser
 
 class BedrockTaskExecutor(TaskExecutor):
     """Bedrock-specific task executor."""
-    
+
     MODEL_ID = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
-    
-    def __init__(self, api_client, mock_tool_executor, benchmark_runner):
-        super().__init__(api_client, mock_tool_executor, benchmark_runner, self.MODEL_ID)
+
+    def __init__(self, api_client, mock_tool_executor, benchmark_runner, owns_client: bool = False):
+        super().__init__(
+            api_client, mock_tool_executor, benchmark_runner, self.MODEL_ID, owns_client
+        )
         self.current_assistant_content = []
-    
+
     def _execute_api_call(self, task_def: dict):
         """Execute Bedrock API call with streaming."""
+        # Make streaming request
+        response = self.api_client.converse_stream(**self._start_api_call())
+
+        # Process stream
+        stream = self._start_stream(response)
+        if stream:
+            for event in stream:
+                self._process_event(event)
+
+        self._finish_api_call()
+
+    async def _execute_api_call_async(self, task_def: dict):
+        """Execute Bedrock API call with streaming on an AsyncBedrockRuntimeClient."""
+        response = await self.api_client.converse_stream(**self._start_api_call())
+
+        stream = self._start_stream(response)
+        if stream:
+            async for event in stream:
+                self._process_event(event)
+
+        self._finish_api_call()
+
+    def _start_api_call(self) -> dict:
+        """Reset the turn state and return the converse_stream parameters."""
         # Reset assistant content for this turn
         self.current_assistant_content = []
-        
+
         # Convert messages to Bedrock format
         bedrock_messages = []
         for msg in self.messages:
@@ -40,7 +84,7 @@ class BedrockTaskExecutor(TaskExecutor):
             elif isinstance(msg['content'], list):
                 # Already in correct format or contains tool results
                 bedrock_messages.append(msg)
-        
+
         # Define tools
         tools = [{
             "toolSpec": {
@@ -72,39 +116,40 @@ class BedrockTaskExecutor(TaskExecutor):
                 }
             }
         }]
-        
-        # Make streaming request
-        response = self.api_client.converse_stream(
-            modelId=self.MODEL_ID,
-            messages=bedrock_messages,
-            toolConfig={"tools": tools},
-            inferenceConfig={"maxTokens": 4096}
-        )
-        
+
+        return {
+            "modelId": self.MODEL_ID,
+            "messages": bedrock_messages,
+            "toolConfig": {"tools": tools},
+            "inferenceConfig": {"maxTokens": 4096},
+        }
+
+    def _start_stream(self, response: dict):
+        """Record the request ID of a response and return its event stream."""
         # Extract request ID from response metadata
         request_id = response.get('ResponseMetadata', {}).get('RequestId')
         if request_id:
             self.request_ids.append(request_id)
-        
-        # Process stream
-        stream = response.get('stream')
-        if stream:
-            for event in stream:
-                self._process_event(event)
-        
+            self.request_timing.request_id = request_id
+        return response.get("stream")
+
+    def _finish_api_call(self):
+        """Mark the stream end and add the assistant message to the conversation."""
         self._mark_stream_end()
-        
+
         # Add assistant message to conversation
         self.messages.append({
             "role": "assistant",
             "content": self.current_assistant_content
         })
-    
+
     def _process_event(self, event: dict):
         """Process a single stream event."""
+        self._mark_stream_event()
+
         if 'messageStart' in event:
             pass
-        
+
         elif 'contentBlockStart' in event:
             # Check if this is a tool use block
             block = event['contentBlockStart']['start']
@@ -113,45 +158,58 @@ class BedrockTaskExecutor(TaskExecutor):
                 tool_id = block['toolUse'].get('toolUseId', 'unknown')
                 self.tool_calls_count += 1
                 self._mark_first_token()
-                
-                # Track tool use for conversation
+
+                # Track tool use for conversation; the input dict is filled
+                # field by field as the parser sees each value close
+                self.current_tool_parser = StreamingJsonObjectParser()
                 self.current_tool_use = {
                     "toolUse": {
                         "toolUseId": tool_id,
                         "name": tool_name,
-                        "input": {}
+                        "input": self.current_tool_parser.fields,
                     }
                 }
             elif 'text' in block:
                 # Text content block
                 self.current_text_block = {"text": ""}
-        
+                self.current_text_parts = []
+
         elif 'contentBlockDelta' in event:
             delta = event['contentBlockDelta']['delta']
-            
+
             if 'text' in delta:
                 self._mark_first_token()
-                # Accumulate text
-                if hasattr(self, 'current_text_block'):
-                    self.current_text_block["text"] += delta['text']
-            
+                self._record_delta("text", delta["text"])
+                # Text blocks have no contentBlockStart in converseStream
+                if not hasattr(self, "current_text_block"):
+                    self.current_text_block = {"text": ""}
+                    self.current_text_parts = []
+                # Accumulate text chunks, joined once at contentBlockStop
+                self.current_text_parts.append(delta["text"])
+
             elif 'toolUse' in delta:
                 self._mark_first_token()
+                self._record_delta("toolUse", delta["toolUse"].get("input", ""))
                 # Accumulate tool input
                 if hasattr(self, 'current_tool_use'):
                     input_json = delta['toolUse'].get('input', '')
-                    if input_json:
-                        # Parse and merge JSON input
+                    if input_json and self.current_tool_parser is not None:
+                        # Input arrives as arbitrary fragments of one JSON object
                         try:
-                            import json
-                            parsed = json.loads(input_json)
-                            self.current_tool_use['toolUse']['input'].update(parsed)
-                        except:
-                            pass
-        
+                            self.current_tool_parser.feed(input_json)
+                        except json.JSONDecodeError:
+                            self.current_tool_parser = None
+
         elif 'contentBlockStop' in event:
             # Finalize current content block
             if hasattr(self, 'current_tool_use'):
+                if self.current_tool_parser is not None:
+                    try:
+                        self.current_tool_use["toolUse"]["input"] = self.current_tool_parser.close()
+                    except json.JSONDecodeError:
+                        # Keep the fields that did complete
+                        pass
+                self.current_tool_parser = None
                 self.current_assistant_content.append(self.current_tool_use)
                 # Add to pending tool uses
                 self.pending_tool_uses.append({
@@ -161,15 +219,17 @@ class BedrockTaskExecutor(TaskExecutor):
                 })
                 delattr(self, 'current_tool_use')
             elif hasattr(self, 'current_text_block'):
+                self.current_text_block["text"] = "".join(self.current_text_parts)
                 self.current_assistant_content.append(self.current_text_block)
                 delattr(self, 'current_text_block')
-        
+                delattr(self, "current_text_parts")
+
         elif 'messageStop' in event:
             self.stop_reason = event['messageStop'].get('stopReason', 'unknown')
-        
+
         elif 'metadata' in event:
             pass
-    
+
     def _add_tool_results_to_conversation(self, tool_results):
         """Add tool results to conversation in Bedrock format."""
         # Bedrock expects tool results in user message with specific format
@@ -181,48 +241,156 @@ class BedrockTaskExecutor(TaskExecutor):
                     "content": [{"text": result['content']}]
                 }
             })
-        
+
         self.messages.append({
             "role": "user",
             "content": content
         })
 
 
-def run_benchmark(num_runs: int = 5, query_cloudtrail: bool = True):
-    """Run Bedrock benchmark."""
+def run_benchmark(
+    num_runs: int = 5,
+    query_cloudtrail: bool = True,
+    cold_connections: bool = False,
+    concurrency: int = None,
+    rate: float = None,
+    arrival: str = "poisson",
+    use_asyncio: bool = False,
+    endpoint_url: str = None,
+    stall_threshold: float = DEFAULT_STALL_THRESHOLD,
+):
+    """Run Bedrock benchmark.
+
+    Args:
+        num_runs: Number of runs per task
+        query_cloudtrail: Whether to query CloudTrail for cross-region information
+        cold_connections: Open a new connection for every task, so the TCP+TLS
+            handshake is included in the first-token time
+        concurrency: Number of task executions in flight at once (with `rate`,
+            defaults to DEFAULT_OPEN_LOOP_WORKERS)
+        rate: Open-loop arrival rate in tasks per second; None runs the tasks closed-loop
+        arrival: Open-loop arrival process, 'fixed' or 'poisson'
+        use_asyncio: Run all task executions in one event loop with an
+            AsyncBedrockRuntimeClient instead of one thread per stream
+        endpoint_url: Bedrock Runtime endpoint override, e.g. a local
+            mock_bedrock_server.py (CloudTrail is not queried)
+        stall_threshold: Minimum gap in seconds between deltas that counts as a stall
+    """
+    if concurrency is None:
+        concurrency = DEFAULT_OPEN_LOOP_WORKERS if rate else 1
+
+    if endpoint_url:
+        # Requests to a stand-in endpoint never reach CloudTrail
+        query_cloudtrail = False
+
     print("Starting Bedrock API benchmark...")
-    
-    # Initialize components
-    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-    mock_tools = MockToolExecutor()
-    runner = BenchmarkRunner('bedrock', 'benchmark/results/bedrock_raw.csv')
-    executor = BedrockTaskExecutor(bedrock, mock_tools, runner)
-    
+
+    runner = BenchmarkRunner(
+        "bedrock", "benchmark/results/bedrock_raw.csv", stall_threshold=stall_threshold
+    )
+    max_pool_connections = max(DEFAULT_MAX_POOL_CONNECTIONS, concurrency)
+
     # Load tasks
     tasks_file = Path('benchmark/tasks/task_definitions.json')
     with open(tasks_file) as f:
         tasks = json.load(f)
-    
+
     # Track benchmark start time for CloudTrail query
     benchmark_start_time = datetime.now(timezone.utc)
-    
-    # Run each task multiple times
-    for run_num in range(1, num_runs + 1):
-        print(f"\n=== Run {run_num}/{num_runs} ===")
-        
-        for task in tasks:
-            task_id = task['task_id']
-            print(f"Executing {task_id}...", end=' ')
-            
-            result = executor.execute_task(task)
-            
-            if result['status'] == 'success':
-                print(f"✓ ({result['total_task_ms']:.0f}ms)")
-            else:
-                print(f"✗ {result.get('message', 'Unknown error')}")
-    
+
+    if use_asyncio:
+        asyncio.run(
+            _run_tasks_asyncio(
+                runner,
+                tasks,
+                num_runs,
+                concurrency,
+                max_pool_connections,
+                cold_connections,
+                endpoint_url,
+            )
+        )
+        _finish_benchmark(runner, benchmark_start_time, query_cloudtrail)
+        return
+
+    # Initialize the client; connections (one per concurrent task) are opened
+    # up front, so handshakes stay out of TTFT
+    bedrock = get_bedrock_runtime_client(
+        region_name="us-east-1",
+        max_pool_connections=max_pool_connections,
+        endpoint_url=endpoint_url,
+        prewarm=0 if cold_connections else concurrency,
+    )
+    # boto3 sessions are not thread-safe, so cold clients are created one at a time
+    client_lock = threading.Lock()
+
+    def make_executor():
+        # Per-task executor and mock tools; the runner and the client are shared,
+        # except that cold tasks get their own client, closed when the task finishes
+        if not cold_connections:
+            return BedrockTaskExecutor(bedrock, MockToolExecutor(), runner)
+        with client_lock:
+            client = create_bedrock_runtime_client(
+                region_name="us-east-1", endpoint_url=endpoint_url, session=get_session()
+            )
+        return BedrockTaskExecutor(client, MockToolExecutor(), runner, owns_client=True)
+
+    if rate:
+        # Issue num_runs rounds of tasks at the target rate, independent of completions
+        run_open_loop(
+            make_executor,
+            tasks,
+            runner,
+            rate,
+            num_runs * len(tasks),
+            arrival=arrival,
+            max_workers=concurrency,
+        )
+    else:
+        # Run each task multiple times
+        run_tasks(make_executor, tasks, num_runs, concurrency=concurrency)
+
+    _finish_benchmark(runner, benchmark_start_time, query_cloudtrail)
+
+
+async def _run_tasks_asyncio(
+    runner: BenchmarkRunner,
+    tasks: list,
+    num_runs: int,
+    concurrency: int,
+    max_connections: int,
+    cold_connections: bool,
+    endpoint_url: str = None,
+):
+    """Run the tasks in one event loop on a shared AsyncBedrockRuntimeClient."""
+    bedrock = AsyncBedrockRuntimeClient(
+        region_name="us-east-1", endpoint_url=endpoint_url, max_connections=max_connections
+    )
+    if not cold_connections:
+        await bedrock.prewarm(concurrency)
+
+    def make_executor():
+        # Per-task executor and mock tools; cold tasks get their own connection pool,
+        # closed when the task finishes
+        if not cold_connections:
+            return BedrockTaskExecutor(bedrock, MockToolExecutor(), runner)
+        client = AsyncBedrockRuntimeClient(client=bedrock.signing_client)
+        return BedrockTaskExecutor(client, MockToolExecutor(), runner, owns_client=True)
+
+    try:
+        await run_tasks_async(make_executor, tasks, num_runs, concurrency=concurrency)
+    finally:
+        await bedrock.close()
+
+
+def _finish_benchmark(
+    runner: BenchmarkRunner, benchmark_start_time: datetime, query_cloudtrail: bool
+):
+    """Report completion and update cross-region information from CloudTrail."""
+    runner.close()
     print(f"\n✓ Benchmark complete. Results saved to {runner.output_file}")
-    
+    print(f"  Latency histograms saved to {runner.histograms_file}")
+
     # Query CloudTrail to update cross-region information after all runs
     if query_cloudtrail:
         print("\n=== Querying CloudTrail for cross-region information ===")
@@ -233,66 +401,78 @@ def run_benchmark(num_runs: int = 5, query_cloudtrail: bool = True):
 
 
 def _update_cross_region_info(csv_file: Path, start_time: datetime):
-    """Update CSV with cross-region information from CloudTrail.
-    
+    """Record cross-region information from CloudTrail in the CSV's sidecar table.
+
+    Request IDs are joined to CSV rows by execution ID, and the counts are
+    appended to `<csv>.cross_region.csv` (see append_cross_region) instead of
+    rewriting the CSV. Executions whose request IDs were not all found in
+    CloudTrail are recorded as incomplete, so analysis leaves them out of the
+    same-region vs cross-region comparison.
+
     Args:
-        csv_file: Path to CSV file to update
+        csv_file: Path to the results CSV
         start_time: Benchmark start time for CloudTrail query
     """
     # Load request IDs from separate file
-    request_ids_file = csv_file.with_suffix('.request_ids.json')
+    request_ids_file = csv_file.with_suffix(".request_ids.jsonl")
     if not request_ids_file.exists():
         print("No request IDs file found")
         return
-    
-    with open(request_ids_file, 'r') as f:
-        request_ids_data = json.load(f)
-    
+
+    # Executions of this run that are not fully attributed yet; entries from
+    # before execution IDs existed cannot be joined to their rows
+    existing = load_cross_region(csv_file)
+    entries = []
+    for entry in load_request_ids(request_ids_file):
+        execution_id = entry.get("execution_id")
+        if not execution_id or not entry["request_ids"]:
+            continue
+        if datetime.fromisoformat(entry["timestamp"]).astimezone(timezone.utc) < start_time:
+            continue
+        previous = existing.get(execution_id)
+        if previous and previous["attributed_requests"] == previous["total_requests"]:
+            continue
+        entries.append(entry)
+
     # Collect all unique request IDs
     all_request_ids = set()
-    for entry in request_ids_data:
+    for entry in entries:
         all_request_ids.update(entry['request_ids'])
-    
+
     if not all_request_ids:
         print("No request IDs found")
         return
-    
+
     print(f"Found {len(all_request_ids)} unique request IDs")
-    
-    # Query CloudTrail
+
+    # Query CloudTrail; request IDs not found are left out rather than counted as same-region
     querier = CloudTrailQuerier(region='us-east-1')
     cross_region_map = querier.query_request_ids(
         request_ids=list(all_request_ids),
         start_time=start_time,
         max_retries=3,
-        retry_delay=60
+        retry_delay=60,
+        include_missing=False,
+    )
+
+    counts = {}
+    incomplete = 0
+    for entry in entries:
+        request_ids = entry["request_ids"]
+        attributed = sum(1 for rid in request_ids if rid in cross_region_map)
+        previous = existing.get(entry["execution_id"])
+        if previous and previous["attributed_requests"] >= attributed:
+            continue
+        cross_region_count = sum(1 for rid in request_ids if cross_region_map.get(rid, False))
+        counts[entry["execution_id"]] = (len(request_ids), attributed, cross_region_count)
+        if attributed < len(request_ids):
+            incomplete += 1
+
+    append_cross_region(csv_file, counts)
+    print(
+        f"✓ Recorded cross-region information for {len(counts)} task executions in "
+        f"{cross_region_file(csv_file)} ({incomplete} incomplete)"
     )
-    
-    # Read CSV and update cross-region information by matching with request_ids_data
-    rows = []
-    with open(csv_file, 'r') as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader):
-            # Match this CSV row with corresponding request IDs entry
-            if i < len(request_ids_data):
-                request_ids = request_ids_data[i]['request_ids']
-                cross_region_count = sum(
-                    1 for rid in request_ids 
-                    if cross_region_map.get(rid, False)
-                )
-                row['cross_region_requests'] = str(cross_region_count)
-            
-            rows.append(row)
-    
-    # Write updated CSV
-    if rows:
-        fieldnames = list(rows[0].keys())
-        with open(csv_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-        
-        print(f"✓ Updated {csv_file} with cross-region information")
 
 
 if __name__ == '__main__':
@@ -301,6 +481,60 @@ if __name__ == '__main__':
     parser.add_argument('--runs', type=int, default=5, help='Number of runs per task')
     parser.add_argument('--no-cloudtrail', action='store_true', 
                        help='Skip CloudTrail query for cross-region detection')
+    parser.add_argument(
+        "--cold-connections",
+        action="store_true",
+        help="Open a new connection per task (handshake counted in TTFT)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Number of task executions to run in parallel (default: 1, or "
+        f"{DEFAULT_OPEN_LOOP_WORKERS} with --rate)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Open-loop mode: issue tasks at this many per second, independent of completions",
+    )
+    parser.add_argument(
+        "--arrival",
+        choices=["fixed", "poisson"],
+        default="poisson",
+        help="Open-loop arrival process (default: poisson)",
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Run all streams in one event loop instead of one thread per stream",
+    )
+    parser.add_argument(
+        "--endpoint-url",
+        default=None,
+        help="Bedrock Runtime endpoint override, e.g. a local mock_bedrock_server.py "
+        "(skips CloudTrail)",
+    )
+    parser.add_argument(
+        "--stall-threshold",
+        type=float,
+        default=DEFAULT_STALL_THRESHOLD,
+        help="Count gaps between deltas longer than this many seconds as stalls "
+        f"(default: {DEFAULT_STALL_THRESHOLD})",
+    )
     args = parser.parse_args()
-    
-    run_benchmark(args.runs, query_cloudtrail=not args.no_cloudtrail)
+    if args.asyncio and args.rate:
+        parser.error("--asyncio does not support open-loop mode (--rate)")
+
+    run_benchmark(
+        args.runs,
+        query_cloudtrail=not args.no_cloudtrail,
+        cold_connections=args.cold_connections,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        arrival=args.arrival,
+        use_asyncio=args.asyncio,
+        endpoint_url=args.endpoint_url,
+        stall_threshold=args.stall_threshold,
+    )
@@ -1,182 +1,667 @@
 """Core benchmark runner for measuring API latency."""
+import asyncio
+import atexit
 import csv
 import json
+import os
+import random
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Any, Callable, Dict, List, Optional
+
+import transport_timing
+from benchmark.buffered_writer import (
+    DEFAULT_FLUSH_BATCH,
+    DEFAULT_FLUSH_INTERVAL,
+    BufferedAppendWriter,
+)
+from benchmark.columnar_store import (
+    DELTA_COLUMNS,
+    RESULT_COLUMNS,
+    available_backend,
+    count_csv_rows,
+    import_csv,
+    store_row_count,
+    write_run,
+)
+from benchmark.latency_histogram import HistogramSet
+from delta_timeline import DEFAULT_STALL_THRESHOLD, DeltaTimeline, StallDetector
+from transport_timing import PHASES, RequestTiming
+
+# Default number of worker threads for open-loop runs
+DEFAULT_OPEN_LOOP_WORKERS = 64
+
+# Columns of the results CSV
+CSV_COLUMNS = [
+    "timestamp",
+    "api_type",
+    "model_id",
+    "task_id",
+    "execution_id",
+    "task_type",
+    "first_token_ms",
+    "stream_complete_ms",
+    "total_task_ms",
+    "max_turn_ms",
+    "tool_calls_count",
+    "turns_count",
+    "total_bedrock_requests",
+    "cross_region_requests",
+    "max_text_gap_ms",
+    "max_tool_gap_ms",
+    "text_stalls",
+    "tool_stalls",
+    "status",
+]
+
+
+def load_request_ids(request_ids_file: Path) -> List[Dict[str, Any]]:
+    """Load the request ID entries (one JSON object per line) written by BenchmarkRunner.
+
+    A partial last line, left by a run that was killed mid-write, is skipped.
+    """
+    entries = []
+    if not Path(request_ids_file).exists():
+        return entries
+    with open(request_ids_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Warning: skipping incomplete entry in {request_ids_file}")
+    return entries
+
+
+# Columns of the per-request transport timing table; phases are milliseconds since the request
+# started
+TRANSPORT_COLUMNS = ["execution_id", "task_id", "turn", "request_id", "reused_connection"] + [
+    f"{phase}_ms" for phase in PHASES
+]
+
+
+def transport_file(csv_file: Path) -> Path:
+    """The per-request transport timing table of a results CSV."""
+    return Path(csv_file).with_suffix(".transport.csv")
+
+
+# Columns of the cross-region sidecar table
+CROSS_REGION_COLUMNS = [
+    "execution_id",
+    "total_requests",
+    "attributed_requests",
+    "cross_region_requests",
+    "updated",
+]
+
+
+def cross_region_file(csv_file: Path) -> Path:
+    """The cross-region sidecar table of a results CSV."""
+    return Path(csv_file).with_suffix(".cross_region.csv")
+
+
+def append_cross_region(csv_file: Path, counts: Dict[str, tuple]):
+    """Append cross-region counts to the sidecar table of a results CSV.
+
+    The results CSV is never rewritten: CloudTrail attributions are keyed by
+    execution ID in the sidecar, and a later entry for an execution replaces
+    earlier ones when loaded.
+
+    Args:
+        csv_file: The results CSV
+        counts: execution_id -> (total_requests, attributed_requests, cross_region_requests);
+            attributed_requests is the number of request IDs found in CloudTrail
+    """
+    sidecar = cross_region_file(csv_file)
+    new_file = not sidecar.exists()
+    updated = datetime.now().isoformat()
+    with open(sidecar, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(CROSS_REGION_COLUMNS)
+        for execution_id, (total, attributed, cross_region) in counts.items():
+            writer.writerow([execution_id, total, attributed, cross_region, updated])
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_cross_region(csv_file: Path) -> Dict[str, Dict[str, int]]:
+    """Latest cross-region counts per execution ID from the sidecar table (empty if none)."""
+    sidecar = cross_region_file(csv_file)
+    counts = {}
+    if not sidecar.exists():
+        return counts
+    with open(sidecar, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                counts[row["execution_id"]] = {
+                    "total_requests": int(row["total_requests"]),
+                    "attributed_requests": int(row["attributed_requests"]),
+                    "cross_region_requests": int(row["cross_region_requests"]),
+                }
+            except (TypeError, ValueError):
+                # Partial last line of an interrupted update
+                continue
+    return counts
 
 
 class BenchmarkRunner:
-    """Measures and records API latency metrics."""
-    
-    def __init__(self, api_type: str, output_file: str):
+    """Measures and records API latency metrics.
+
+    One runner is shared by all executors of a benchmark, so writes are
+    serialized with `lock`. Hold it across `store_request_ids` and
+    `record_result` to keep CSV rows and request ID entries in the same order.
+    Gaps between deltas longer than `stall_threshold` seconds are counted as
+    stalls.
+
+    Every task execution gets a random `execution_id`, written to its CSV
+    row and request ID entry, so CloudTrail attributions can be joined to
+    rows by key (see `append_cross_region`) instead of by position.
+
+    Successful tasks are also counted in log-bucketed latency histograms per
+    task type (`histograms`), which accumulate across runs in
+    `histograms_file` and merge across hosts.
+
+    The connection phases of every request (DNS, connect, TLS, request
+    sent, response headers, first event, first delta; see
+    transport_timing.py) go to `transport_file`, one row per request.
+
+    CSV rows, request ID entries (JSON Lines), transport rows and open-loop
+    schedule rows are appended through buffered writers that flush every
+    `flush_batch` results, and a background thread flushes them every
+    `flush_interval` seconds; `close` (also run at interpreter exit) flushes
+    and fsyncs them and saves the histograms.
+
+    With NumPy or pyarrow installed, `close` also writes the run's results and
+    per-delta timelines to the columnar store next to the CSV (see
+    columnar_store.py), which analyze_results.py memory-maps instead of
+    parsing the CSV. Rows are numbered from the CSV's row count at startup,
+    so only one runner may append to a CSV at a time.
+    """
+
+    def __init__(
+        self,
+        api_type: str,
+        output_file: str,
+        stall_threshold: float = DEFAULT_STALL_THRESHOLD,
+        flush_batch: int = DEFAULT_FLUSH_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
         self.api_type = api_type
         self.output_file = Path(output_file)
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
-        
+        self.lock = threading.RLock()
+        self.stall_threshold = stall_threshold
+
         # Request ID storage for CloudTrail queries
-        self.request_ids_file = self.output_file.with_suffix('.request_ids.json')
-        
-        # Load existing request IDs data if file exists
-        if self.request_ids_file.exists():
-            with open(self.request_ids_file, 'r') as f:
-                self.request_ids_data = json.load(f)
+        self.request_ids_file = self.output_file.with_suffix(".request_ids.jsonl")
+
+        # Arrival schedule of open-loop runs (writer opened by the first record_schedule)
+        self.schedule_file = self.output_file.with_suffix(".open_loop.csv")
+        self._schedule_writer = None
+
+        # Connection phases of every request
+        self.transport_file = transport_file(self.output_file)
+        if not self.transport_file.exists():
+            with open(self.transport_file, "w", newline="") as f:
+                csv.writer(f).writerow(TRANSPORT_COLUMNS)
+
+        # Latency histograms of all runs recorded to this CSV
+        self.histograms_file = self.output_file.with_suffix(".histograms.json")
+        if self.histograms_file.exists():
+            self.histograms = HistogramSet.load(self.histograms_file)
         else:
-            self.request_ids_data = []
-        
+            self.histograms = HistogramSet()
+
+        # Load existing request IDs data if file exists
+        self._convert_legacy_request_ids()
+        self.request_ids_data = load_request_ids(self.request_ids_file)
+
         # Initialize CSV if it doesn't exist
         if not self.output_file.exists():
             self._init_csv()
-    
+        else:
+            self._upgrade_csv()
+
+        # Columns of this run for the columnar store; rows already in the
+        # CSV but not in the store (older versions, killed runs) are imported first
+        self._columns = None
+        self._deltas = None
+        if available_backend() is not None:
+            self._next_csv_row = count_csv_rows(self.output_file)
+            if store_row_count(self.output_file) < self._next_csv_row:
+                import_csv(self.output_file)
+            self._columns = {column: [] for column in RESULT_COLUMNS}
+            self._deltas = {column: [] for column in DELTA_COLUMNS}
+
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        self._csv_writer = BufferedAppendWriter(self.output_file, flush_batch, flush_interval)
+        self._request_ids_writer = BufferedAppendWriter(
+            self.request_ids_file, flush_batch, flush_interval
+        )
+        self._transport_writer = BufferedAppendWriter(
+            self.transport_file, flush_batch, flush_interval
+        )
+        atexit.register(self.close)
+
+        # Rows of a slow or stalled run still reach the files within flush_interval
+        self._closing = threading.Event()
+        if flush_interval and flush_interval > 0:
+            threading.Thread(
+                target=self._flush_periodically, name=f"{api_type}-result-flush", daemon=True
+            ).start()
+
+    def _flush_periodically(self):
+        while not self._closing.wait(self.flush_interval):
+            with self.lock:
+                if self._csv_writer.closed:
+                    return
+                self.flush()
+
+    def _convert_legacy_request_ids(self):
+        """Convert a `.request_ids.json` array from an older version to JSON Lines."""
+        legacy_file = self.output_file.with_suffix(".request_ids.json")
+        if not legacy_file.exists():
+            return
+        with open(legacy_file, "r") as f:
+            entries = json.load(f)
+        with open(self.request_ids_file, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        legacy_file.unlink()
+
     def _init_csv(self):
         """Initialize CSV with headers."""
         with open(self.output_file, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'timestamp',
-                'api_type',
-                'model_id',
-                'task_id',
-                'task_type',
-                'first_token_ms',
-                'stream_complete_ms',
-                'total_task_ms',
-                'max_turn_ms',
-                'tool_calls_count',
-                'turns_count',
-                'total_bedrock_requests',
-                'cross_region_requests',
-                'status'
-            ])
-    
-    def store_request_ids(self, task_id: str, request_ids: List[str]):
+            writer.writerow(CSV_COLUMNS)
+
+    def _upgrade_csv(self):
+        """Rewrite a CSV from an older version with the current columns (new ones left blank)."""
+        with open(self.output_file, "r", newline="") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames == CSV_COLUMNS:
+                return
+            rows = list(reader)
+        with open(self.output_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, restval="", extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def store_request_ids(self, task_id: str, request_ids: List[str], execution_id: str = ""):
         """Store request IDs for a task separately from CSV."""
-        self.request_ids_data.append({
-            'task_id': task_id,
-            'timestamp': datetime.now().isoformat(),
-            'request_ids': request_ids
-        })
-        
-        # Save to JSON file
-        with open(self.request_ids_file, 'w') as f:
-            json.dump(self.request_ids_data, f, indent=2)
-    
+        with self.lock:
+            entry = {
+                "task_id": task_id,
+                "execution_id": execution_id,
+                "timestamp": datetime.now().isoformat(),
+                "request_ids": list(request_ids),
+            }
+            self.request_ids_data.append(entry)
+            self._request_ids_writer.write(json.dumps(entry) + "\n")
+
+    def record_transport(self, task_id: str, execution_id: str, timings: List[RequestTiming]):
+        """Record the connection phases of each request (turn) of a task execution."""
+        with self.lock:
+            writer = csv.writer(self._transport_writer)
+            for turn, timing in enumerate(timings, 1):
+                offsets = timing.offsets_ms()
+                writer.writerow(
+                    [
+                        execution_id,
+                        task_id,
+                        turn,
+                        timing.request_id,
+                        int(timing.reused_connection),
+                        *(
+                            "" if offsets[phase] is None else f"{offsets[phase]:.2f}"
+                            for phase in PHASES
+                        ),
+                    ]
+                )
+
     def get_all_request_ids(self) -> List[str]:
         """Get all request IDs from stored data."""
         all_ids = []
         for entry in self.request_ids_data:
             all_ids.extend(entry['request_ids'])
         return all_ids
-    
-    def record_result(self, task_id: str, task_type: str, 
-                     first_token_ms: float, stream_complete_ms: float,
-                     total_task_ms: float, max_turn_ms: float,
-                     tool_calls_count: int,                     turns_count: int = 1,
-                     model_id: str = "unknown",
-                     total_bedrock_requests: int = 0,
-                     cross_region_requests: int = 0,
-                     status: str = "success"):
-        """Record a benchmark result to CSV."""
-        with open(self.output_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().isoformat(),
-                self.api_type,
-                model_id,
-                task_id,
-                task_type,
-                f"{first_token_ms:.2f}",
-                f"{stream_complete_ms:.2f}",
-                f"{total_task_ms:.2f}",
-                f"{max_turn_ms:.2f}",
-                tool_calls_count,
-                turns_count,
-                total_bedrock_requests,
-                cross_region_requests,
-                status
-            ])
+
+    def record_result(
+        self,
+        task_id: str,
+        task_type: str,
+        first_token_ms: float,
+        stream_complete_ms: float,
+        total_task_ms: float,
+        max_turn_ms: float,
+        tool_calls_count: int,
+        turns_count: int = 1,
+        execution_id: str = "",
+        model_id: str = "unknown",
+        total_bedrock_requests: int = 0,
+        cross_region_requests: int = 0,
+        max_text_gap_ms: float = 0.0,
+        max_tool_gap_ms: float = 0.0,
+        text_stalls: int = 0,
+        tool_stalls: int = 0,
+        status: str = "success",
+        delta_timeline: Optional[DeltaTimeline] = None,
+    ):
+        """Record a result to CSV and the columnar store, and to the histograms if it succeeded."""
+        timestamp = datetime.now().isoformat()
+        with self.lock:
+            if status == "success":
+                self._record_histograms(
+                    task_type, first_token_ms, max_turn_ms, total_task_ms, delta_timeline
+                )
+            if self._columns is not None:
+                self._record_columns(
+                    delta_timeline,
+                    timestamp=timestamp,
+                    api_type=self.api_type,
+                    model_id=model_id,
+                    task_id=task_id,
+                    execution_id=execution_id,
+                    task_type=task_type,
+                    first_token_ms=first_token_ms,
+                    stream_complete_ms=stream_complete_ms,
+                    total_task_ms=total_task_ms,
+                    max_turn_ms=max_turn_ms,
+                    tool_calls_count=tool_calls_count,
+                    turns_count=turns_count,
+                    total_bedrock_requests=total_bedrock_requests,
+                    cross_region_requests=cross_region_requests,
+                    max_text_gap_ms=max_text_gap_ms,
+                    max_tool_gap_ms=max_tool_gap_ms,
+                    text_stalls=text_stalls,
+                    tool_stalls=tool_stalls,
+                    status=status,
+                )
+            writer = csv.writer(self._csv_writer)
+            writer.writerow(
+                [
+                    timestamp,
+                    self.api_type,
+                    model_id,
+                    task_id,
+                    execution_id,
+                    task_type,
+                    f"{first_token_ms:.2f}",
+                    f"{stream_complete_ms:.2f}",
+                    f"{total_task_ms:.2f}",
+                    f"{max_turn_ms:.2f}",
+                    tool_calls_count,
+                    turns_count,
+                    total_bedrock_requests,
+                    cross_region_requests,
+                    f"{max_text_gap_ms:.2f}",
+                    f"{max_tool_gap_ms:.2f}",
+                    text_stalls,
+                    tool_stalls,
+                    status,
+                ]
+            )
+
+    def _record_histograms(
+        self,
+        task_type: str,
+        first_token_ms: float,
+        max_turn_ms: float,
+        total_task_ms: float,
+        delta_timeline: Optional[DeltaTimeline],
+    ):
+        self.histograms.get(task_type, "first_token_ms").record(first_token_ms)
+        self.histograms.get(task_type, "max_turn_ms").record(max_turn_ms)
+        self.histograms.get(task_type, "total_task_ms").record(total_task_ms)
+        if delta_timeline is not None:
+            # The first delta of each stream has no gap (recorded as 0)
+            self.histograms.get(task_type, "inter_token_gap_ms").record_all(
+                gap * 1000 for gap in delta_timeline.gaps if gap > 0
+            )
+
+    def _record_columns(self, delta_timeline: Optional[DeltaTimeline], **values):
+        row = len(self._columns["csv_row"])
+        for column, value in values.items():
+            self._columns[column].append(value)
+        self._columns["csv_row"].append(self._next_csv_row)
+        self._next_csv_row += 1
+        if delta_timeline is not None and len(delta_timeline):
+            first = delta_timeline.times[0]
+            self._deltas["row"].extend([row] * len(delta_timeline))
+            self._deltas["offset_s"].extend(t - first for t in delta_timeline.times)
+            self._deltas["gap_s"].extend(delta_timeline.gaps)
+            self._deltas["size"].extend(delta_timeline.sizes)
+            self._deltas["kind"].extend(delta_timeline.kinds)
+
+    def save_histograms(self):
+        """Persist the latency histograms next to the CSV."""
+        with self.lock:
+            self.histograms.save(self.histograms_file)
+
+    def flush(self):
+        """Append all buffered rows and request ID entries to their files."""
+        with self.lock:
+            self._csv_writer.flush()
+            self._request_ids_writer.flush()
+            self._transport_writer.flush()
+            if self._schedule_writer is not None:
+                self._schedule_writer.flush()
+
+    def close(self):
+        """Flush and fsync the result files and save the histograms; later calls do nothing."""
+        self._closing.set()
+        with self.lock:
+            if self._csv_writer.closed:
+                return
+            self._csv_writer.close()
+            self._request_ids_writer.close()
+            self._transport_writer.close()
+            if self._schedule_writer is not None:
+                self._schedule_writer.close()
+            self.save_histograms()
+            if self._columns and self._columns["csv_row"]:
+                write_run(self.output_file, self._columns, self._deltas)
+        atexit.unregister(self.close)
+
+    def record_schedule(
+        self,
+        task_id: str,
+        intended_start: str,
+        queue_delay_ms: float,
+        service_ms: float,
+        response_ms: float,
+        status: str,
+    ):
+        """Record the queueing and service time of one open-loop task execution."""
+        with self.lock:
+            if self._schedule_writer is None:
+                if not self.schedule_file.exists():
+                    with open(self.schedule_file, "w", newline="") as f:
+                        csv.writer(f).writerow(
+                            [
+                                "intended_start",
+                                "api_type",
+                                "task_id",
+                                "queue_delay_ms",
+                                "service_ms",
+                                "response_ms",
+                                "status",
+                            ]
+                        )
+                self._schedule_writer = BufferedAppendWriter(
+                    self.schedule_file, self.flush_batch, self.flush_interval
+                )
+            csv.writer(self._schedule_writer).writerow(
+                [
+                    intended_start,
+                    self.api_type,
+                    task_id,
+                    f"{queue_delay_ms:.2f}",
+                    f"{service_ms:.2f}",
+                    f"{response_ms:.2f}",
+                    status,
+                ]
+            )
 
 
 class TaskExecutor:
     """Executes benchmark tasks and measures timing."""
-    
-    def __init__(self, api_client, mock_tool_executor, benchmark_runner, model_id: str = "unknown"):
+
+    def __init__(
+        self,
+        api_client,
+        mock_tool_executor,
+        benchmark_runner,
+        model_id: str = "unknown",
+        owns_client: bool = False,
+    ):
         self.api_client = api_client
+        self.owns_client = owns_client  # Closed with the executor (cold connections)
         self.mock_tools = mock_tool_executor
         self.runner = benchmark_runner
         self.model_id = model_id
-        
+
         # Timing state
         self.start_time = None
         self.first_token_time = None
         self.stream_end_time = None
         self.tool_calls_count = 0
         self.turns_count = 0
-        
+        self.delta_timeline = DeltaTimeline()
+
         # Conversation state
         self.messages = []
         self.pending_tool_uses = []
         self.stop_reason = None
-        
+
         # Request tracking
         self.request_ids = []
-    
+        self.execution_id = None
+        self.request_timings = []
+        self.request_timing = None
+        transport_timing.install()
+
+    MAX_TURNS = 10  # Safety limit
+
     def execute_task(self, task_def: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a single task and record metrics."""
-        self.mock_tools.reset()
-        self._reset_timing()
-        
-        task_id = task_def['task_id']
-        task_type = task_def['task_type']
-        prompt = task_def['prompt']
-        
+        self._start_task(task_def)
+
         try:
-            # Start timing
-            self.start_time = time.time()
-            
-            # Initialize conversation with user message
-            self.messages = [{"role": "user", "content": prompt}]
-            
             # Conversation loop - continue until end_turn or max_tokens
-            max_turns = 10  # Safety limit
-            while self.turns_count < max_turns:
-                self.turns_count += 1
-                self.pending_tool_uses = []
-                self.stop_reason = None
-                self.turn_start_time = time.time()  # Mark turn start
-                
+            while self._start_turn():
                 # Execute API call (implemented by subclass)
                 self._execute_api_call(task_def)
-                
-                # Calculate turn duration
-                turn_duration = (time.time() - self.turn_start_time) * 1000
-                self.turn_durations.append(turn_duration)
-                
-                # Check stop reason
-                if self.stop_reason == "tool_use":
-                    # Process tool calls and continue conversation
-                    if not self._process_tool_calls():
-                        break
-                elif self.stop_reason in ["end_turn", "max_tokens", "stop_sequence"]:
-                    # Conversation complete
+
+                if not self._end_turn():
                     break
-                else:
-                    # Unknown stop reason, exit
+
+            return self._record_success(task_def)
+
+        except Exception as e:
+            return self._record_error(task_def, e)
+
+    async def execute_task_async(self, task_def: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a single task on the asyncio path and record metrics."""
+        self._start_task(task_def)
+
+        try:
+            while self._start_turn():
+                # Execute API call (implemented by subclass)
+                await self._execute_api_call_async(task_def)
+
+                if not self._end_turn():
                     break
-            
-            # Calculate metrics
-            first_token_ms = (self.first_token_time - self.start_time) * 1000 if self.first_token_time else 0
-            stream_complete_ms = (self.stream_end_time - self.start_time) * 1000 if self.stream_end_time else 0
-            total_task_ms = (time.time() - self.start_time) * 1000
-            max_turn_ms = max(self.turn_durations) if self.turn_durations else 0
-            
-            # Store request IDs separately
-            self.runner.store_request_ids(task_id, self.request_ids)
-            
+
+            return self._record_success(task_def)
+
+        except Exception as e:
+            return self._record_error(task_def, e)
+
+    def close(self):
+        """Close the API client if this executor owns it."""
+        if self.owns_client:
+            self.api_client.close()
+
+    async def close_async(self):
+        """Close the asyncio API client if this executor owns it."""
+        if self.owns_client:
+            await self.api_client.close()
+
+    def _start_task(self, task_def: Dict[str, Any]):
+        """Reset state, start timing and initialize the conversation."""
+        self.mock_tools.reset()
+        self._reset_timing()
+
+        # Start timing
+        self.start_time = time.time()
+
+        # Initialize conversation with user message
+        self.messages = [{"role": "user", "content": task_def["prompt"]}]
+
+    def _start_turn(self) -> bool:
+        """Start the next conversation turn; returns False once the turn limit is reached."""
+        if self.turns_count >= self.MAX_TURNS:
+            return False
+        self.turns_count += 1
+        self.pending_tool_uses = []
+        self.stop_reason = None
+        self.turn_start_time = time.time()  # Mark turn start
+        self.delta_timeline.new_stream()
+        # Each turn is one request; the transport hooks mark its phases
+        self.request_timing = transport_timing.begin()
+        self.request_timings.append(self.request_timing)
+        return True
+
+    def _end_turn(self) -> bool:
+        """Finish the current turn; returns True if the conversation continues."""
+        # Calculate turn duration
+        turn_duration = (time.time() - self.turn_start_time) * 1000
+        self.turn_durations.append(turn_duration)
+
+        # Check stop reason
+        if self.stop_reason == "tool_use":
+            # Process tool calls and continue conversation
+            return self._process_tool_calls()
+        # end_turn, max_tokens, stop_sequence or an unknown stop reason
+        return False
+
+    def _record_success(self, task_def: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the metrics of a completed task."""
+        task_id = task_def['task_id']
+        task_type = task_def['task_type']
+
+        # Calculate metrics
+        first_token_ms = (
+            (self.first_token_time - self.start_time) * 1000 if self.first_token_time else 0
+        )
+        stream_complete_ms = (
+            (self.stream_end_time - self.start_time) * 1000 if self.stream_end_time else 0
+        )
+        total_task_ms = (time.time() - self.start_time) * 1000
+        max_turn_ms = max(self.turn_durations) if self.turn_durations else 0
+        stalls = self._stall_metrics()
+
+        # Store request IDs separately, in the same order as the CSV rows
+        transport_timing.end()
+        with self.runner.lock:
+            self.runner.store_request_ids(task_id, self.request_ids, self.execution_id)
+            self.runner.record_transport(task_id, self.execution_id, self.request_timings)
+
             # Record result
             self.runner.record_result(
                 task_id=task_id,
+                execution_id=self.execution_id,
                 task_type=task_type,
                 first_token_ms=first_token_ms,
                 stream_complete_ms=stream_complete_ms,
@@ -187,25 +672,36 @@ class TaskExecutor:
                 model_id=self.model_id,
                 total_bedrock_requests=len(self.request_ids),
                 cross_region_requests=0,  # Will be updated by CloudTrail query
-                status="success"
+                status="success",
+                delta_timeline=self.delta_timeline,
+                **stalls,
+            )
+
+        return {
+            "status": "success",
+            "first_token_ms": first_token_ms,
+            "stream_complete_ms": stream_complete_ms,
+            "total_task_ms": total_task_ms,
+            "max_turn_ms": max_turn_ms,
+            "turns_count": self.turns_count,
+            **stalls,
+        }
+
+    def _record_error(self, task_def: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+        """Record a failed task."""
+        total_task_ms = (time.time() - self.start_time) * 1000
+        max_turn_ms = max(self.turn_durations) if self.turn_durations else 0
+        stalls = self._stall_metrics()
+        transport_timing.end()
+        with self.runner.lock:
+            self.runner.store_request_ids(task_def["task_id"], self.request_ids, self.execution_id)
+            self.runner.record_transport(
+                task_def["task_id"], self.execution_id, self.request_timings
             )
-            
-            return {
-                "status": "success",
-                "first_token_ms": first_token_ms,
-                "stream_complete_ms": stream_complete_ms,
-                "total_task_ms": total_task_ms,
-                "max_turn_ms": max_turn_ms,
-                "turns_count": self.turns_count
-            }
-            
-        except Exception as e:
-            # Record error
-            total_task_ms = (time.time() - self.start_time) * 1000
-            max_turn_ms = max(self.turn_durations) if self.turn_durations else 0
             self.runner.record_result(
-                task_id=task_id,
-                task_type=task_type,
+                task_id=task_def["task_id"],
+                execution_id=self.execution_id,
+                task_type=task_def["task_type"],
                 first_token_ms=0,
                 stream_complete_ms=0,
                 total_task_ms=total_task_ms,
@@ -215,10 +711,12 @@ class TaskExecutor:
                 model_id=self.model_id,
                 total_bedrock_requests=len(self.request_ids),
                 cross_region_requests=0,
-                status=f"error: {str(e)}"
+                status=f"error: {str(e)}",
+                delta_timeline=self.delta_timeline,
+                **stalls,
             )
-            return {"status": "error", "message": str(e)}
-    
+        return {"status": "error", "message": str(e)}
+
     def _reset_timing(self):
         """Reset timing state."""
         self.start_time = None
@@ -232,11 +730,32 @@ class TaskExecutor:
         self.turn_durations = []  # Track duration of each turn
         self.turn_start_time = None
         self.request_ids = []
-    
+        # Joins the CSV row, request IDs and CloudTrail attributions
+        self.execution_id = uuid.uuid4().hex
+        self.request_timings = []  # Connection phases of each request
+        self.request_timing = None
+        self.delta_timeline = DeltaTimeline()  # Arrival time of every delta
+
+    def _stall_metrics(self) -> Dict[str, Any]:
+        """Largest gap between deltas and stall count, for text and for tool input."""
+        report = StallDetector(self.runner.stall_threshold).report(self.delta_timeline)
+        text = report.get("text", {})
+        tool = report.get("toolUse", {})
+        return {
+            "max_text_gap_ms": text.get("max_gap", 0.0) * 1000,
+            "max_tool_gap_ms": tool.get("max_gap", 0.0) * 1000,
+            "text_stalls": text.get("stalls", 0),
+            "tool_stalls": tool.get("stalls", 0),
+        }
+
     def _execute_api_call(self, task_def: Dict[str, Any]):
         """Execute API call - to be implemented by subclass."""
         raise NotImplementedError("Subclass must implement _execute_api_call")
-    
+
+    async def _execute_api_call_async(self, task_def: Dict[str, Any]):
+        """Execute API call on the asyncio path - implemented by subclasses that support it."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the asyncio path")
+
     def _process_tool_calls(self) -> bool:
         """Process pending tool calls and add results to conversation.
         
@@ -245,42 +764,303 @@ class TaskExecutor:
         """
         if not self.pending_tool_uses:
             return False
-        
+
         # Execute each tool call with mock executor
         tool_results = []
         for tool_use in self.pending_tool_uses:
             tool_name = tool_use.get('name')
             tool_input = tool_use.get('input', {})
             tool_id = tool_use.get('id')
-            
+
             # Execute mock tool
             result = self.mock_tools.execute(tool_name, tool_input)
-            
+
             tool_results.append({
                 "type": "tool_result",
                 "tool_use_id": tool_id,
                 "content": result.get('content', '')
             })
-        
+
         # Add tool results to conversation (format depends on API)
         self._add_tool_results_to_conversation(tool_results)
-        
+
         return True
-    
+
     def _add_tool_results_to_conversation(self, tool_results):
         """Add tool results to conversation - to be implemented by subclass."""
         raise NotImplementedError("Subclass must implement _add_tool_results_to_conversation")
-    
+
     def _mark_first_token(self):
         """Mark when first token is received."""
         if self.first_token_time is None:
             self.first_token_time = time.time()
-    
+
     def _mark_stream_end(self):
         """Mark when stream completes."""
         self.stream_end_time = time.time()
-    
+
+    def _mark_stream_event(self):
+        """Mark the arrival of a stream event (the first one of each request is kept)."""
+        if self.request_timing is not None:  # None when replaying a stream log
+            self.request_timing.mark("first_event")
+
+    def _record_delta(self, kind: str, text: str):
+        """Record the arrival of a text ('text') or tool input ('toolUse') delta."""
+        self.delta_timeline.record(kind, text)
+        if self.request_timing is not None:
+            self.request_timing.mark("first_delta")
+
     def _handle_tool_call(self, tool_name: str, tool_input: Dict[str, Any]):
         """Handle a tool call using mock executor."""
         self.tool_calls_count += 1
         return self.mock_tools.execute(tool_name, tool_input)
+
+
+def _print_result(result: Dict[str, Any]):
+    if result["status"] == "success":
+        stalls = result.get("text_stalls", 0) + result.get("tool_stalls", 0)
+        if stalls:
+            print(
+                f"✓ ({result['total_task_ms']:.0f}ms, {stalls} stalls, "
+                f"max tool input gap {result['max_tool_gap_ms']:.0f}ms)"
+            )
+        else:
+            print(f"✓ ({result['total_task_ms']:.0f}ms)")
+    else:
+        print(f"✗ {result.get('message', 'Unknown error')}")
+
+
+def _execute(executor_factory: Callable[[], TaskExecutor], task: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a task on a new executor, then close the executor."""
+    executor = executor_factory()
+    try:
+        return executor.execute_task(task)
+    finally:
+        executor.close()
+
+
+def run_tasks(
+    executor_factory: Callable[[], TaskExecutor],
+    tasks: List[Dict[str, Any]],
+    num_runs: int,
+    concurrency: int = 1,
+) -> List[Dict[str, Any]]:
+    """Run every task `num_runs` times.
+
+    Each task execution gets a fresh executor from `executor_factory`, so its
+    timing, conversation and request ID state is never shared; the executor
+    is closed when its task finishes. With `concurrency` > 1 the executions
+    run on a thread pool of that size.
+
+    Args:
+        executor_factory: Returns a new TaskExecutor (sharing the runner and API client)
+        tasks: Task definitions
+        num_runs: Number of runs per task
+        concurrency: Number of task executions in flight at once
+
+    Returns:
+        List of execution results, in completion order
+    """
+    results = []
+
+    if concurrency <= 1:
+        for run_num in range(1, num_runs + 1):
+            print(f"\n=== Run {run_num}/{num_runs} ===")
+
+            for task in tasks:
+                print(f"Executing {task['task_id']}...", end=" ")
+                result = _execute(executor_factory, task)
+                _print_result(result)
+                results.append(result)
+        return results
+
+    jobs = [(run_num, task) for run_num in range(1, num_runs + 1) for task in tasks]
+    print(f"\n=== {len(jobs)} task executions ({num_runs} runs), concurrency {concurrency} ===")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(_execute, executor_factory, task): (run_num, task) for run_num, task in jobs
+        }
+        for future in as_completed(futures):
+            run_num, task = futures[future]
+            result = future.result()
+            print(f"[run {run_num}] {task['task_id']}...", end=" ")
+            _print_result(result)
+            results.append(result)
+
+    return results
+
+
+async def run_tasks_async(
+    executor_factory: Callable[[], TaskExecutor],
+    tasks: List[Dict[str, Any]],
+    num_runs: int,
+    concurrency: int = 1,
+) -> List[Dict[str, Any]]:
+    """Run every task `num_runs` times on the asyncio path.
+
+    All executions share one event loop; at most `concurrency` of them are in
+    flight at once. Each gets a fresh executor from `executor_factory`, closed
+    when its task finishes.
+
+    Args:
+        executor_factory: Returns a new TaskExecutor with an asyncio API client
+        tasks: Task definitions
+        num_runs: Number of runs per task
+        concurrency: Number of task executions in flight at once
+
+    Returns:
+        List of execution results, in completion order
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def execute(run_num, task):
+        async with semaphore:
+            executor = executor_factory()
+            try:
+                return run_num, task, await executor.execute_task_async(task)
+            finally:
+                await executor.close_async()
+
+    jobs = [execute(run_num, task) for run_num in range(1, num_runs + 1) for task in tasks]
+    print(
+        f"\n=== {len(jobs)} task executions ({num_runs} runs), asyncio, "
+        f"concurrency {concurrency} ==="
+    )
+
+    results = []
+    for next_done in asyncio.as_completed(jobs):
+        run_num, task, result = await next_done
+        print(f"[run {run_num}] {task['task_id']}...", end=" ")
+        _print_result(result)
+        results.append(result)
+    return results
+
+
+def arrival_offsets(
+    rate: float, count: int, arrival: str = "poisson", seed: Optional[int] = None
+) -> List[float]:
+    """Return the intended start offsets (seconds) of `count` arrivals at `rate` per second.
+
+    Args:
+        rate: Target arrival rate in tasks per second
+        count: Number of arrivals
+        arrival: 'fixed' for evenly spaced arrivals, 'poisson' for exponential inter-arrival times
+        seed: Random seed for reproducible Poisson schedules
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if arrival == "fixed":
+        return [i / rate for i in range(count)]
+    if arrival != "poisson":
+        raise ValueError(f"Unknown arrival process: {arrival}")
+
+    rng = random.Random(seed)
+    offsets = []
+    offset = 0.0
+    for _ in range(count):
+        offsets.append(offset)
+        offset += rng.expovariate(rate)
+    return offsets
+
+
+def run_open_loop(
+    executor_factory: Callable[[], TaskExecutor],
+    tasks: List[Dict[str, Any]],
+    runner: BenchmarkRunner,
+    rate: float,
+    num_requests: int,
+    arrival: str = "poisson",
+    max_workers: int = DEFAULT_OPEN_LOOP_WORKERS,
+    seed: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Issue tasks at a target arrival rate, independent of completions.
+
+    Tasks are taken from `tasks` round-robin and submitted at their scheduled
+    time whether or not earlier tasks have finished. Each execution records
+    its queueing delay (scheduled start to actual start, e.g. waiting for a
+    free worker) separately from its service time, and the response time is
+    measured from the scheduled start, so slow tasks cannot hide the latency
+    of the ones queued behind them (coordinated omission).
+
+    Args:
+        executor_factory: Returns a new TaskExecutor (sharing the runner and API client)
+        tasks: Task definitions
+        runner: The benchmark runner that records the schedule
+        rate: Target arrival rate in tasks per second
+        num_requests: Total number of task executions to issue
+        arrival: 'fixed' or 'poisson'
+        max_workers: Maximum number of task executions in flight at once
+        seed: Random seed for reproducible Poisson schedules
+
+    Returns:
+        List of execution results (with queue_delay_ms, service_ms and response_ms), in
+        completion order
+    """
+    offsets = arrival_offsets(rate, num_requests, arrival, seed)
+    print(
+        f"\n=== Open loop: {num_requests} task executions at {rate:g}/s ({arrival}), "
+        f"up to {max_workers} in flight ==="
+    )
+
+    def timed_execute(task, intended):
+        executor = executor_factory()
+        try:
+            started = time.perf_counter()
+            result = executor.execute_task(task)
+            finished = time.perf_counter()
+        finally:
+            executor.close()
+        result["queue_delay_ms"] = (started - intended) * 1000
+        result["service_ms"] = (finished - started) * 1000
+        result["response_ms"] = (finished - intended) * 1000
+        runner.record_schedule(
+            task_id=task["task_id"],
+            intended_start=datetime.fromtimestamp(wall_start + intended - start).isoformat(),
+            queue_delay_ms=result["queue_delay_ms"],
+            service_ms=result["service_ms"],
+            response_ms=result["response_ms"],
+            status=result["status"],
+        )
+        return result
+
+    results = []
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        wall_start = time.time()
+        start = time.perf_counter()
+        for i, offset in enumerate(offsets):
+            intended = start + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            task = tasks[i % len(tasks)]
+            futures[pool.submit(timed_execute, task, intended)] = task
+        issue_time = time.perf_counter() - start
+
+        for future in as_completed(futures):
+            task = futures[future]
+            result = future.result()
+            print(f"{task['task_id']}...", end=" ")
+            _print_result(result)
+            results.append(result)
+
+    elapsed = time.perf_counter() - start
+    if results:
+        queue_delays = [r["queue_delay_ms"] for r in results]
+        responses = [r["response_ms"] for r in results]
+        achieved = (len(offsets) - 1) / issue_time if len(offsets) > 1 and issue_time > 0 else 0
+        print(
+            f"\nAchieved arrival rate: {achieved:.2f}/s (target {rate:g}/s), "
+            f"wall time {elapsed:.1f}s"
+        )
+        print(
+            f"Queue delay: mean {sum(queue_delays) / len(queue_delays):.0f}ms, "
+            f"max {max(queue_delays):.0f}ms"
+        )
+        print(
+            f"Response:    mean {sum(responses) / len(responses):.0f}ms, max {max(responses):.0f}ms"
+        )
+        print(f"Schedule saved to {runner.schedule_file}")
+
+    return results
@@ -0,0 +1,78 @@
+"""Buffered append-only writer for benchmark result files."""
+
+import os
+import time
+from pathlib import Path
+from typing import List
+
+# Flush after this many buffered writes...
+DEFAULT_FLUSH_BATCH = 50
+# ...or once the oldest buffered write is this many seconds old
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+class BufferedAppendWriter:
+    """Appends text to a file in batches.
+
+    Writes are buffered in memory and appended to the file (kept open) once
+    `batch_size` writes are pending or the oldest is `flush_interval` seconds
+    old, checked on each write; when no more writes come, the owner calls
+    `flush` (BenchmarkRunner does every `flush_interval` seconds). `close`
+    flushes and fsyncs, so a run that stops early keeps everything but the
+    last unflushed batch, and a clean shutdown keeps everything. It has a
+    `write` method, so it can back a `csv.writer`.
+
+    Not thread-safe: BenchmarkRunner serializes access with its lock.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        batch_size: int = DEFAULT_FLUSH_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._pending: List[str] = []
+        self._pending_since = None
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def write(self, text: str):
+        """Buffer `text`; flush if the batch is full or the interval has passed."""
+        if self._file.closed:
+            raise ValueError(f"Write to closed writer for {self.path}")
+        now = time.monotonic()
+        if not self._pending:
+            self._pending_since = now
+        self._pending.append(text)
+        if (
+            len(self._pending) >= self.batch_size
+            or now - self._pending_since >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Append the buffered writes to the file (without fsync)."""
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._pending = []
+        self._file.flush()
+
+    def sync(self):
+        """Flush and fsync, so the data survives a crash of the machine."""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Flush, fsync and close; later calls do nothing."""
+        if self._file.closed:
+            return
+        try:
+            self.sync()
+        finally:
+            self._file.close()
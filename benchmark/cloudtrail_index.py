@@ -0,0 +1,147 @@
+"""Local index of CloudTrail ConverseStream events.
+
+CloudTrailQuerier records every ConverseStream event it reads, through
+LookupEvents or from log files, in a SQLite database, keyed by request ID,
+with the fields `_is_cross_region` looks at (inferenceRegion, awsRegion, the
+inference profile ARN and the resource ARNs), together with the time ranges
+it has fully scanned. Later queries look
+request IDs up in the index first and only call LookupEvents for the parts
+of their time range that are not covered yet.
+
+Events are from one account; use a separate index file per account.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_INDEX_PATH = Path("benchmark/results/cloudtrail_index.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    request_id TEXT PRIMARY KEY,
+    event_time TEXT,
+    aws_region TEXT,
+    inference_region TEXT,
+    inference_profile_arn TEXT,
+    resource_arns TEXT
+);
+CREATE TABLE IF NOT EXISTS scanned (
+    lookup_region TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scanned_region ON scanned (lookup_region, start_time);
+"""
+
+
+def _format_time(value: datetime) -> str:
+    # Fixed width, so times compare correctly as text
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def event_row(event: dict) -> Optional[Tuple]:
+    """The index row of a parsed CloudTrail event, or None if it has no request ID."""
+    request_id = event.get("requestID")
+    if not request_id:
+        return None
+    resource_arns = [resource.get("ARN", "") for resource in event.get("resources", []) or []]
+    return (
+        request_id,
+        event.get("eventTime", ""),
+        event.get("awsRegion", ""),
+        (event.get("additionalEventData") or {}).get("inferenceRegion", ""),
+        (event.get("requestParameters") or {}).get("inferenceProfileArn", ""),
+        json.dumps([arn for arn in resource_arns if arn]),
+    )
+
+
+def row_event(row: Tuple) -> dict:
+    """A minimal CloudTrail event with the fields of an index row, for `_is_cross_region`."""
+    request_id, event_time, aws_region, inference_region, profile_arn, resource_arns = row
+    return {
+        "requestID": request_id,
+        "eventTime": event_time,
+        "awsRegion": aws_region,
+        "additionalEventData": {"inferenceRegion": inference_region},
+        "requestParameters": {"inferenceProfileArn": profile_arn},
+        "resources": [{"ARN": arn} for arn in json.loads(resource_arns)],
+    }
+
+
+class CloudTrailIndex:
+    """SQLite index of ConverseStream events and of the time ranges scanned.
+
+    Safe to share between the threads of one querier.
+    """
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def add_events(self, events: Iterable[dict]):
+        """Index parsed CloudTrail events (later copies of a request ID replace earlier ones)."""
+        self.add_rows([row for row in map(event_row, events) if row is not None])
+
+    def add_rows(self, rows: List[Tuple]):
+        """Index rows made by `event_row`."""
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def lookup(self, request_ids: Iterable[str]) -> Dict[str, dict]:
+        """Indexed events of the given request IDs, as minimal CloudTrail events (`row_event`)."""
+        request_ids = list(request_ids)
+        found = {}
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for start in range(0, len(request_ids), 500):
+                batch = request_ids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._connection.execute(
+                    f"SELECT * FROM events WHERE request_id IN ({placeholders})", batch
+                )
+                for row in cursor:
+                    found[row[0]] = row_event(row)
+        return found
+
+    def covered(self, lookup_region: str) -> List[Tuple[datetime, datetime]]:
+        """Time ranges (naive UTC, sorted) fully scanned through LookupEvents in `lookup_region`."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT start_time, end_time FROM scanned WHERE lookup_region = ? "
+                "ORDER BY start_time",
+                (lookup_region,),
+            )
+            return [
+                (datetime.fromisoformat(start), datetime.fromisoformat(end))
+                for start, end in cursor
+            ]
+
+    def set_covered(self, lookup_region: str, intervals: List[Tuple[datetime, datetime]]):
+        """Replace the scanned time ranges of `lookup_region`."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM scanned WHERE lookup_region = ?", (lookup_region,)
+            )
+            self._connection.executemany(
+                "INSERT INTO scanned VALUES (?, ?, ?)",
+                [
+                    (lookup_region, _format_time(start), _format_time(end))
+                    for start, end in intervals
+                ],
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
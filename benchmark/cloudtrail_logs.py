@@ -0,0 +1,102 @@
+"""Read CloudTrail log files from disk.
+
+A trail delivers its events to S3 as gzipped JSON files, `{"Records": [...]}`,
+each holding up to a few thousand events. Synced to a local directory (e.g.
+`aws s3 sync s3://bucket/AWSLogs/... logs/`), they can attribute any number of
+request IDs without LookupEvents and its rate limit.
+
+Files are decompressed and parsed as a stream, one record at a time, so
+memory stays at the read chunk plus the largest record whatever the file
+size. Only ConverseStream records are kept, as cloudtrail_index rows.
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import IO, Iterator, List, Tuple
+
+from benchmark.cloudtrail_index import event_row
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def find_log_files(directory: Path) -> List[Path]:
+    """CloudTrail log files (*.json.gz and *.json) under `directory`, sorted."""
+    directory = Path(directory)
+    return sorted(path for pattern in ("*.json.gz", "*.json") for path in directory.rglob(pattern))
+
+
+def _open(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_records(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the records of one log file, decompressing and parsing it incrementally."""
+    path = Path(path)
+    with _open(path) as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            # Drop what has been parsed, so the buffer holds at most one record and a chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        # Find the start of the Records array
+        while True:
+            key = buffer.find('"Records"')
+            start = buffer.find("[", key) if key >= 0 else -1
+            if start >= 0:
+                position = start + 1
+                break
+            if eof:
+                return
+            fill()
+
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise ValueError(f"{path}: truncated Records array")
+                fill()
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record continues in the next chunk
+                if eof:
+                    raise ValueError(f"{path}: truncated record at offset {position}")
+                fill()
+                continue
+            position = end
+            yield record
+
+
+def read_converse_stream_rows(path: Path) -> Tuple[List[Tuple], int]:
+    """Index rows of the ConverseStream records of one log file, and the number of records read.
+
+    Module-level, so it can run in a process pool.
+    """
+    rows = []
+    records = 0
+    for record in iter_records(path):
+        records += 1
+        if record.get("eventName") != "ConverseStream":
+            continue
+        row = event_row(record)
+        if row is not None:
+            rows.append(row)
+    return rows, records
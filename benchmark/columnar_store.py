@@ -0,0 +1,347 @@
+"""Columnar binary store of benchmark results and per-delta timelines.
+
+Each results CSV gets a store directory next to it (`bedrock_raw.columns/`)
+with one subdirectory per benchmark run. A run holds two tables:
+
+- results: the CSV columns, unrounded, plus `csv_row` (the row's index in the CSV)
+- deltas: one row per content delta: `row` (index into the run's results),
+  `offset_s` (since the task's first delta), `gap_s`, `size` (UTF-8 bytes)
+  and `kind` (index into delta_timeline.BLOCK_KINDS)
+
+With pyarrow installed the tables are Arrow IPC files (`results.arrow`,
+`deltas.arrow`); otherwise one NumPy `.npy` file per column. Both are read
+with memory mapping, so loading weeks of runs does not parse any text. (An
+`.npz` archive cannot be memory-mapped, hence one `.npy` per column.)
+
+A run numbers its rows from the CSV's row count when it starts, so only one
+BenchmarkRunner may append to a CSV at a time; a store whose row numbers
+clash (two runs on the same CSV at once) is ignored in favour of the CSV.
+
+Rows recorded before the store existed can be imported from the CSV:
+
+    python benchmark/columnar_store.py benchmark/results/bedrock_raw.csv
+"""
+
+import csv
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+STORE_SUFFIX = ".columns"
+
+# Result columns and their types; the CSV columns plus `csv_row`
+RESULT_COLUMNS = {
+    "timestamp": "str",
+    "api_type": "str",
+    "model_id": "str",
+    "task_id": "str",
+    "execution_id": "str",
+    "task_type": "str",
+    "first_token_ms": "float",
+    "stream_complete_ms": "float",
+    "total_task_ms": "float",
+    "max_turn_ms": "float",
+    "tool_calls_count": "int",
+    "turns_count": "int",
+    "total_bedrock_requests": "int",
+    "cross_region_requests": "int",
+    "max_text_gap_ms": "float",
+    "max_tool_gap_ms": "float",
+    "text_stalls": "int",
+    "tool_stalls": "int",
+    "status": "str",
+    "csv_row": "int",
+}
+
+DELTA_COLUMNS = {"row": "int", "offset_s": "float", "gap_s": "float", "size": "int", "kind": "int"}
+
+_NUMPY_DTYPES = {"float": "float64", "int": "int64"}
+
+
+def available_backend() -> Optional[str]:
+    """'arrow' or 'numpy', whichever is installed (Arrow preferred), or None."""
+    if pa is not None and np is not None:
+        return "arrow"
+    if np is not None:
+        return "numpy"
+    return None
+
+
+def store_dir(csv_file: Path) -> Path:
+    """The store directory of a results CSV."""
+    csv_file = Path(csv_file)
+    return csv_file.with_name(csv_file.stem + STORE_SUFFIX)
+
+
+def count_csv_rows(csv_file: Path) -> int:
+    """Number of data rows of a results CSV (records: a quoted field may span lines)."""
+    if not Path(csv_file).exists():
+        return 0
+    with open(csv_file, "r", newline="", encoding="utf-8") as f:
+        records = sum(1 for values in csv.reader(f) if values)
+    return max(records - 1, 0)
+
+
+def _run_dirs(csv_file: Path) -> List[Path]:
+    directory = store_dir(csv_file)
+    if not directory.is_dir():
+        return []
+    return sorted(
+        path for path in directory.iterdir() if path.is_dir() and not path.name.endswith(".tmp")
+    )
+
+
+def store_row_count(csv_file: Path) -> int:
+    """Number of result rows in the store of a results CSV."""
+    if np is None:
+        return 0
+    count = 0
+    for run_dir in _run_dirs(csv_file):
+        count += len(_read_table(run_dir, "results", {"csv_row": "int"})["csv_row"])
+    return count
+
+
+def _to_array(values: List[Any], kind: str):
+    if kind == "str":
+        return np.array(values, dtype=str) if values else np.array([], dtype="<U1")
+    return np.array(values, dtype=_NUMPY_DTYPES[kind])
+
+
+def _write_table(
+    directory: Path, name: str, columns: Dict[str, List[Any]], types: Dict[str, str], backend: str
+):
+    arrays = {column: _to_array(columns[column], types[column]) for column in types}
+    if backend == "arrow":
+        table = pa.table({column: pa.array(array) for column, array in arrays.items()})
+        with pa.OSFile(str(directory / f"{name}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        table_dir = directory / name
+        table_dir.mkdir()
+        for column, array in arrays.items():
+            np.save(table_dir / f"{column}.npy", array)
+
+
+def write_run(
+    csv_file: Path,
+    results: Dict[str, List[Any]],
+    deltas: Dict[str, List[Any]],
+    backend: Optional[str] = None,
+    name: Optional[str] = None,
+) -> Optional[Path]:
+    """Write one run's results and deltas (columns as lists) to the store.
+
+    The run appears atomically: it is written to a temporary directory and renamed.
+
+    Returns:
+        The run directory, or None if no columnar backend is installed
+    """
+    backend = backend or available_backend()
+    if backend is None:
+        return None
+    name = name or f"run-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    run_dir = store_dir(csv_file) / name
+    tmp_dir = run_dir.with_name(run_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True)
+    try:
+        _write_table(tmp_dir, "results", results, RESULT_COLUMNS, backend)
+        _write_table(tmp_dir, "deltas", deltas, DELTA_COLUMNS, backend)
+        os.replace(tmp_dir, run_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return run_dir
+
+
+def _missing_column(kind: str, length: int):
+    """A column added after a run was written: blank strings or zeros."""
+    if kind == "str":
+        return np.full(length, "", dtype="<U1")
+    return np.zeros(length, dtype=_NUMPY_DTYPES[kind])
+
+
+def _read_table(run_dir: Path, name: str, types: Dict[str, str]) -> Dict[str, Any]:
+    arrow_file = run_dir / f"{name}.arrow"
+    if arrow_file.exists():
+        if pa is None:
+            raise ImportError(f"{arrow_file} requires the optional dependency: pip install pyarrow")
+        table = pa.ipc.open_file(pa.memory_map(str(arrow_file), "r")).read_all()
+        columns = {}
+        for column, kind in types.items():
+            if column not in table.column_names:
+                columns[column] = _missing_column(kind, table.num_rows)
+            elif kind == "str":
+                columns[column] = np.array(table.column(column).to_pylist(), dtype=str)
+            else:
+                # Zero-copy view of the memory-mapped buffer
+                columns[column] = table.column(column).to_numpy()
+        return columns
+    if np is None:
+        raise ImportError(f"{run_dir} requires the optional dependency: pip install numpy")
+    table_dir = run_dir / name
+    columns = {
+        column: np.load(table_dir / f"{column}.npy", mmap_mode="r")
+        for column in types
+        if (table_dir / f"{column}.npy").exists()
+    }
+    if not columns:
+        raise ValueError(f"{table_dir} has no columns")
+    length = len(next(iter(columns.values())))
+    return {
+        column: columns[column] if column in columns else _missing_column(kind, length)
+        for column, kind in types.items()
+    }
+
+
+def _concatenate(tables: List[Dict[str, Any]], types: Dict[str, str]) -> Dict[str, Any]:
+    if len(tables) == 1:
+        return tables[0]
+    return {column: np.concatenate([table[column] for table in tables]) for column in types}
+
+
+def load_columns(csv_file: Path, with_deltas: bool = False):
+    """Load the store of a results CSV as columns (NumPy arrays, memory-mapped where possible).
+
+    Returns None if there is no store, it cannot be read, it does not cover
+    every CSV row (e.g. a run killed before it wrote its columns) or its row
+    numbers clash (runs that appended to the CSV at the same time), so
+    callers fall back to the CSV.
+
+    Args:
+        csv_file: The results CSV
+        with_deltas: Also load the deltas; their `row` then indexes the combined results
+
+    Returns:
+        Dict of result columns, ordered by `csv_row` (with `with_deltas`, a
+        (results, deltas) tuple), or None
+    """
+    run_dirs = _run_dirs(csv_file)
+    if not run_dirs or np is None:
+        return None
+    try:
+        results = [_read_table(run_dir, "results", RESULT_COLUMNS) for run_dir in run_dirs]
+        deltas = (
+            [_read_table(run_dir, "deltas", DELTA_COLUMNS) for run_dir in run_dirs]
+            if with_deltas
+            else []
+        )
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Warning: cannot read {store_dir(csv_file)}: {e}")
+        return None
+
+    row_count = sum(len(table["csv_row"]) for table in results)
+    csv_row_count = count_csv_rows(csv_file)
+    rebuild = (
+        f"reading the CSV (rebuild with: python benchmark/columnar_store.py --rebuild {csv_file})"
+    )
+    if row_count != csv_row_count:
+        print(
+            f"Warning: {store_dir(csv_file)} has {row_count} rows but {csv_file} has "
+            f"{csv_row_count}; {rebuild}"
+        )
+        return None
+
+    if with_deltas:
+        offset = 0
+        for table, delta_table in zip(results, deltas):
+            if offset:
+                delta_table["row"] = delta_table["row"] + offset
+            offset += len(table["csv_row"])
+        deltas = _concatenate(deltas, DELTA_COLUMNS)
+    columns = _concatenate(results, RESULT_COLUMNS)
+    if len(np.unique(columns["csv_row"])) != row_count:
+        print(
+            f"Warning: {store_dir(csv_file)} numbers some rows twice (runs appended to {csv_file} "
+            f"at the same time); {rebuild}"
+        )
+        return None
+
+    # Runs are stored in start order; rows imported from the CSV come after the runs that
+    # followed them
+    order = np.argsort(columns["csv_row"], kind="stable")
+    if np.any(order != np.arange(len(order))):
+        columns = {column: values[order] for column, values in columns.items()}
+        if with_deltas:
+            deltas["row"] = np.argsort(order)[deltas["row"]]
+    return (columns, deltas) if with_deltas else columns
+
+
+def _parse(value: str, kind: str):
+    if kind == "str":
+        return value
+    if value == "":
+        return float("nan") if kind == "float" else 0
+    return float(value) if kind == "float" else int(value)
+
+
+def import_csv(csv_file: Path, rebuild: bool = False) -> Optional[Path]:
+    """Import the CSV rows not yet in the store as one run (all rows with `rebuild`).
+
+    Imported rows have no deltas. Returns the new run directory, or None if
+    there was nothing to import.
+    """
+    if available_backend() is None:
+        raise ImportError(
+            "The columnar store requires the optional dependency: pip install numpy " "(or pyarrow)"
+        )
+    if rebuild and store_dir(csv_file).exists():
+        shutil.rmtree(store_dir(csv_file))
+    covered = set()
+    for run_dir in _run_dirs(csv_file):
+        covered.update(_read_table(run_dir, "results", RESULT_COLUMNS)["csv_row"].tolist())
+
+    results = {column: [] for column in RESULT_COLUMNS}
+    with open(csv_file, "r", newline="") as f:
+        for csv_row, row in enumerate(csv.DictReader(f)):
+            if csv_row in covered:
+                continue
+            row["csv_row"] = str(csv_row)
+            for column, kind in RESULT_COLUMNS.items():
+                results[column].append(_parse(row.get(column) or "", kind))
+    if not results["csv_row"]:
+        return None
+    deltas = {column: [] for column in DELTA_COLUMNS}
+    return write_run(
+        csv_file, results, deltas, name=f"run-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-imported"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Import benchmark results CSVs into the columnar store"
+    )
+    parser.add_argument(
+        "csv_files",
+        nargs="+",
+        type=Path,
+        help="Results CSVs, e.g. benchmark/results/bedrock_raw.csv",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Discard the store (including per-delta timelines) and import the whole CSV",
+    )
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        run_dir = import_csv(csv_file, rebuild=args.rebuild)
+        if run_dir is None:
+            print(f"{csv_file}: store is up to date")
+        else:
+            print(f"{csv_file}: imported into {run_dir}")
@@ -0,0 +1,257 @@
+"""Mergeable log-bucketed latency histograms.
+
+Latencies are counted in buckets whose bounds grow geometrically, so every
+quantile is known to within a fixed relative error (1% by default) however
+many samples are recorded, and memory grows with the spread of the values
+(a few hundred buckets from 1ms to 10 minutes), not with the sample count.
+Histograms with the same relative error merge by adding bucket counts, so
+percentiles across runs or hosts are O(buckets) instead of a re-sort of
+every sample. Merge the files of one API only, e.g. the Bedrock histograms
+of two hosts:
+
+    python benchmark/latency_histogram.py \
+        host-a/bedrock_raw.histograms.json host-b/bedrock_raw.histograms.json
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_RELATIVE_ERROR = 0.01
+
+# Values at or below this many milliseconds are counted as zero
+MIN_TRACKABLE_MS = 0.001
+
+# Metrics recorded by BenchmarkRunner for each task type
+HISTOGRAM_METRICS = ["first_token_ms", "inter_token_gap_ms", "max_turn_ms", "total_task_ms"]
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of non-negative values (milliseconds).
+
+    A value v lands in bucket i with gamma^(i-1) < v / MIN_TRACKABLE_MS <= gamma^i,
+    where gamma = (1 + e) / (1 - e) for relative error e; the bucket's
+    representative value is within e of every value in it. Count, sum, min
+    and max are exact.
+    """
+
+    def __init__(self, relative_error: float = DEFAULT_RELATIVE_ERROR):
+        if not 0 < relative_error < 1:
+            raise ValueError("relative_error must be between 0 and 1")
+        self.relative_error = relative_error
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value: float, count: int = 1):
+        """Record `count` occurrences of `value`."""
+        if value < 0:
+            raise ValueError(f"Negative value: {value}")
+        if value <= MIN_TRACKABLE_MS:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value / MIN_TRACKABLE_MS) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_all(self, values: Iterable[float]):
+        """Record every value of `values`."""
+        for value in values:
+            self.record(value)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the counts of `other` (which must have the same relative error) to this histogram."""
+        if other.relative_error != self.relative_error:
+            raise ValueError(
+                f"Cannot merge histograms with relative errors {self.relative_error} "
+                f"and {other.relative_error}"
+            )
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bucket_value(self, index: int) -> float:
+        return MIN_TRACKABLE_MS * 2 * self._gamma**index / (self._gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile `q` (0 to 1), within the relative error; None if empty."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+        # The extremes are exact
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Never outside the exact extremes
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def stats(self) -> Dict[str, float]:
+        """Summary in the format of analyze_results.calculate_stats (empty if no values)."""
+        if self.count == 0:
+            return {}
+        return {
+            "mean": self.mean(),
+            "median": self.quantile(0.5),
+            "min": self.min,
+            "max": self.max,
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "count": self.count,
+        }
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form; buckets as sorted [index, count] pairs."""
+        return {
+            "relative_error": self.relative_error,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self.zero_count,
+            "buckets": [[index, self.buckets[index]] for index in sorted(self.buckets)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        histogram = cls(data["relative_error"])
+        histogram.buckets = {index: count for index, count in data["buckets"]}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
+
+
+class HistogramSet:
+    """Latency histograms per task type and metric, persisted as one JSON file."""
+
+    def __init__(self, relative_error: float = DEFAULT_RELATIVE_ERROR):
+        self.relative_error = relative_error
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    def get(self, task_type: str, metric: str) -> LatencyHistogram:
+        """The histogram of `metric` for `task_type`, created empty if needed."""
+        metrics = self.histograms.setdefault(task_type, {})
+        histogram = metrics.get(metric)
+        if histogram is None:
+            histogram = metrics[metric] = LatencyHistogram(self.relative_error)
+        return histogram
+
+    def merge(self, other: "HistogramSet"):
+        """Add every histogram of `other` to this set."""
+        for task_type, metrics in other.histograms.items():
+            for metric, histogram in metrics.items():
+                self.get(task_type, metric).merge(histogram)
+
+    def combined(self, metric: str) -> LatencyHistogram:
+        """`metric` merged over all task types."""
+        histogram = LatencyHistogram(self.relative_error)
+        for metrics in self.histograms.values():
+            if metric in metrics:
+                histogram.merge(metrics[metric])
+        return histogram
+
+    def save(self, path: Path):
+        """Write the set to `path`, replacing it atomically."""
+        path = Path(path)
+        data = {
+            "relative_error": self.relative_error,
+            "histograms": {
+                task_type: {metric: histogram.to_dict() for metric, histogram in metrics.items()}
+                for task_type, metrics in self.histograms.items()
+            },
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "HistogramSet":
+        with open(path, "r") as f:
+            data = json.load(f)
+        histogram_set = cls(data["relative_error"])
+        for task_type, metrics in data["histograms"].items():
+            for metric, histogram in metrics.items():
+                histogram_set.histograms.setdefault(task_type, {})[metric] = (
+                    LatencyHistogram.from_dict(histogram)
+                )
+        return histogram_set
+
+
+def merge_files(paths: List[Path]) -> HistogramSet:
+    """Load and merge the histogram files of several runs or hosts."""
+    merged = None
+    for path in paths:
+        histogram_set = HistogramSet.load(path)
+        if merged is None:
+            merged = histogram_set
+        else:
+            merged.merge(histogram_set)
+    return merged if merged is not None else HistogramSet()
+
+
+def print_percentiles(histogram_set: HistogramSet):
+    """Print count, mean and percentiles of every metric, per task type and overall."""
+    task_types = sorted(histogram_set.histograms)
+    for task_type in task_types + ["all"]:
+        print(f"\n{task_type.upper()}")
+        print("-" * 80)
+        for metric in HISTOGRAM_METRICS:
+            if task_type == "all":
+                histogram = histogram_set.combined(metric)
+            else:
+                histogram = histogram_set.histograms[task_type].get(metric)
+            if histogram is None or histogram.count == 0:
+                continue
+            stats = histogram.stats()
+            print(
+                f"{metric:20s}: n={stats['count']:<8d} mean={stats['mean']:9.1f}ms  "
+                f"p50={stats['median']:9.1f}ms  p95={stats['p95']:9.1f}ms  "
+                f"p99={stats['p99']:9.1f}ms  max={stats['max']:9.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Merge latency histogram files and print percentiles"
+    )
+    parser.add_argument(
+        "files", nargs="+", type=Path, help="*.histograms.json files written by the benchmarks"
+    )
+    args = parser.parse_args()
+
+    print_percentiles(merge_files(args.files))
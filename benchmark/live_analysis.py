@@ -0,0 +1,285 @@
+"""Live comparison of benchmark results while the benchmarks run.
+
+`analyze_results.py --follow` tails the results CSVs as BenchmarkRunner
+appends to them and keeps running aggregates per API, task type and metric:
+the mean and variance are updated online (Welford), and the median and p95
+come from the mergeable log-bucketed histograms of latency_histogram.py, so
+each new row costs O(1) and nothing is re-read. The comparison table is
+reprinted whenever rows arrive; once every mean is known to within the
+tolerance (95% confidence interval half-width relative to the mean), the
+numbers have converged and the runs can be stopped.
+
+Rows show up as the runner flushes its buffered writer (every 50 results or
+5 seconds, see buffered_writer.py).
+"""
+
+import codecs
+import csv
+import io
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmark.latency_histogram import LatencyHistogram
+
+# Metrics compared live, and their names in the comparison
+LIVE_METRICS = {
+    "first_token_ms": "first_token",
+    "max_turn_ms": "max_turn",
+    "total_task_ms": "total_task",
+}
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Relative half-width of the 95% confidence interval of a mean that counts as converged
+DEFAULT_TOLERANCE = 0.05
+
+# Samples needed before convergence is judged at all
+MIN_CONVERGENCE_SAMPLES = 10
+
+_Z_95 = 1.96
+
+
+class RunningStats:
+    """Online mean and variance (Welford) plus a quantile sketch of one metric."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.histogram = LatencyHistogram()
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.histogram.record(max(value, 0.0))
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 with fewer than two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def ci_half_width(self) -> float:
+        """Half-width of the normal 95% confidence interval of the mean."""
+        if self.count < 2:
+            return math.inf
+        return _Z_95 * math.sqrt(self.variance / self.count)
+
+    def converged(self, tolerance: float = DEFAULT_TOLERANCE) -> bool:
+        """Whether the mean is known to within `tolerance` of itself."""
+        if self.count < MIN_CONVERGENCE_SAMPLES:
+            return False
+        return self.ci_half_width() <= tolerance * abs(self.mean)
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.histogram.quantile(q)
+
+
+class CsvFollower:
+    """Yields the rows appended to a CSV since the last poll.
+
+    Only complete records are returned; a partial last line (or a quoted
+    field still being written) waits for the next poll. A file that shrinks
+    or is replaced (the runner rewrites CSVs from older versions) is read
+    again from the start, and `poll` reports the reset.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.fieldnames: Optional[List[str]] = None
+        self._offset = 0
+        self._inode = None
+        self._pending = ""
+        # Keeps a multi-byte character split across reads until its last byte arrives
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _reset(self):
+        self.fieldnames = None
+        self._offset = 0
+        self._pending = ""
+        self._decoder.reset()
+
+    def poll(self) -> Tuple[List[Dict[str, str]], bool]:
+        """Read new complete rows.
+
+        Returns:
+            (rows as dicts, whether the file was reset and earlier rows must be discarded)
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        reset = False
+        if (self._inode is not None and stat.st_ino != self._inode) or stat.st_size < self._offset:
+            self._reset()
+            reset = True
+        self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return [], reset
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        self._offset += len(data)
+        text = self._pending + self._decoder.decode(data)
+
+        # Split off complete records: a newline ends one only outside quotes
+        records = []
+        start = 0
+        quotes = 0
+        for index, char in enumerate(text):
+            if char == '"':
+                quotes += 1
+            elif char == "\n" and quotes % 2 == 0:
+                records.append(text[start : index + 1])
+                start = index + 1
+                quotes = 0
+        self._pending = text[start:]
+
+        rows = []
+        for values in csv.reader(io.StringIO("".join(records))):
+            if not values:
+                continue
+            if self.fieldnames is None:
+                self.fieldnames = values
+                continue
+            rows.append(dict(zip(self.fieldnames, values)))
+        return rows, reset
+
+
+class LiveComparison:
+    """Running aggregates of successful results per API, task type and metric."""
+
+    def __init__(self, apis: List[str]):
+        self.apis = apis
+        self.stats: Dict[str, Dict[str, Dict[str, RunningStats]]] = {api: {} for api in apis}
+        self.errors = {api: 0 for api in apis}
+
+    def reset(self, api: str):
+        self.stats[api] = {}
+        self.errors[api] = 0
+
+    def add_row(self, api: str, row: Dict[str, str]):
+        if row.get("status") != "success":
+            self.errors[api] += 1
+            return
+        metrics = self.stats[api].setdefault(row["task_type"], {})
+        for column, metric in LIVE_METRICS.items():
+            try:
+                value = float(row.get(column, ""))
+            except ValueError:
+                continue
+            if math.isnan(value):
+                continue
+            stats = metrics.get(metric)
+            if stats is None:
+                stats = metrics[metric] = RunningStats()
+            stats.add(value)
+
+    def task_types(self) -> List[str]:
+        return sorted({task_type for metrics in self.stats.values() for task_type in metrics})
+
+    def all_converged(self, tolerance: float = DEFAULT_TOLERANCE) -> bool:
+        """Whether every metric of every task type has converged for every API."""
+        task_types = self.task_types()
+        if not task_types:
+            return False
+        for api in self.apis:
+            for task_type in task_types:
+                for metric in LIVE_METRICS.values():
+                    stats = self.stats[api].get(task_type, {}).get(metric)
+                    if stats is None or not stats.converged(tolerance):
+                        return False
+        return True
+
+    def format_table(self, tolerance: float = DEFAULT_TOLERANCE) -> str:
+        """The comparison table.
+
+        Per task type and metric: n, mean ± CI, p50 and p95 of each API, and the diff.
+        """
+        lines = []
+        header = f"{'task / metric':28s}"
+        for api in self.apis:
+            header += f"  {api:>46s}"
+        header += f"  {'diff':>16s}"
+        lines.append(header)
+        lines.append("-" * len(header))
+        for task_type in self.task_types():
+            for metric in LIVE_METRICS.values():
+                line = f"{task_type + ' / ' + metric:28s}"
+                means = []
+                for api in self.apis:
+                    stats = self.stats[api].get(task_type, {}).get(metric)
+                    if stats is None or not stats.count:
+                        line += f"  {'-':>46s}"
+                        means.append(None)
+                        continue
+                    half_width = stats.ci_half_width()
+                    ci = f"±{half_width:.1f}" if math.isfinite(half_width) else "±?"
+                    mark = "*" if stats.converged(tolerance) else " "
+                    cell = (
+                        f"n={stats.count:<5d}{stats.mean:8.1f}{ci:>8s}{mark} "
+                        f"p50={stats.quantile(0.5):7.1f} p95={stats.quantile(0.95):7.1f}"
+                    )
+                    line += f"  {cell:>46s}"
+                    means.append(stats.mean)
+                if len(means) == 2 and None not in means:
+                    diff = means[0] - means[1]
+                    pct = diff / means[1] * 100 if means[1] > 0 else 0
+                    line += f"  {diff:+8.1f} ({pct:+.0f}%)"
+                lines.append(line)
+        errors = ", ".join(f"{api} {count}" for api, count in self.errors.items())
+        lines.append(
+            f"\nErrors: {errors}    * = mean within ±{tolerance:.0%} (95% CI); times in ms"
+        )
+        return "\n".join(lines)
+
+
+def follow(
+    files: Dict[str, Path],
+    interval: float = DEFAULT_POLL_INTERVAL,
+    tolerance: float = DEFAULT_TOLERANCE,
+    stop_when_converged: bool = False,
+):
+    """Tail the results CSVs and reprint the live comparison table as rows arrive (until Ctrl-C).
+
+    Args:
+        files: Results CSV per API, e.g. {'bedrock': ..., 'anthropic': ...}
+        interval: Seconds between polls
+        tolerance: Relative CI half-width of a mean that counts as converged
+        stop_when_converged: Return once every mean has converged
+    """
+    followers = {api: CsvFollower(path) for api, path in files.items()}
+    comparison = LiveComparison(list(files))
+    clear = sys.stdout.isatty()
+    try:
+        while True:
+            changed = False
+            for api, follower in followers.items():
+                rows, reset = follower.poll()
+                if reset:
+                    comparison.reset(api)
+                for row in rows:
+                    comparison.add_row(api, row)
+                changed = changed or reset or bool(rows)
+            if changed:
+                if clear:
+                    print("\033[H\033[J", end="")
+                print(f"Live comparison at {datetime.now():%H:%M:%S} (Ctrl-C to stop)\n")
+                print(comparison.format_table(tolerance))
+                converged = comparison.all_converged(tolerance)
+                if converged:
+                    print("\n✓ All means have converged; the runs can be stopped.")
+                sys.stdout.flush()
+                if converged and stop_when_converged:
+                    return comparison
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+    return comparison
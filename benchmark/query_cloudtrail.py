@@ -1,114 +1,361 @@
 """Query CloudTrail to determine if Bedrock requests were cross-region."""
 import argparse
 import json
+import sys
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Set
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
 import boto3
+from botocore.config import Config
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmark.cloudtrail_index import DEFAULT_INDEX_PATH, CloudTrailIndex, row_event
+from benchmark.cloudtrail_logs import find_log_files, read_converse_stream_rows
+
+# LookupEvents is limited to 2 requests per second per account and region
+DEFAULT_LOOKUP_RATE = 2.0
+
+# Length of the sub-intervals scanned in parallel
+DEFAULT_WINDOW = timedelta(minutes=5)
+
+DEFAULT_WORKERS = 4
+
+# CloudTrail delivers most events within about 5 minutes; events newer than
+# this when a window was scanned may still arrive, so that part is rescanned
+DEFAULT_SETTLE_DELAY = timedelta(minutes=5)
+
+
+class RateLimiter:
+    """Spaces calls from any number of threads at most `rate` per second apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for this caller's turn."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _utc(value: datetime) -> datetime:
+    """A naive UTC datetime (botocore sends naive datetimes as UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _uncovered(
+    start: datetime, end: datetime, covered: List[Tuple[datetime, datetime]]
+) -> List[Tuple[datetime, datetime]]:
+    """Parts of [start, end) not in `covered` (sorted, non-overlapping intervals)."""
+    gaps = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > start:
+            gaps.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+def _add_covered(covered: List[Tuple[datetime, datetime]], start: datetime, end: datetime):
+    """Add [start, end) to `covered`, keeping it sorted, with overlapping and adjacent intervals
+    merged."""
+    merged = []
+    for interval in sorted(covered + [(start, end)]):
+        if merged and interval[0] <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], interval[1]))
+        else:
+            merged.append(interval)
+    covered[:] = merged
+
+
+def _split(start: datetime, end: datetime, window: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into consecutive intervals of at most `window`."""
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+    return windows
 
 
 class CloudTrailQuerier:
-    """Query CloudTrail for Bedrock InvokeModel events."""
-    
-    def __init__(self, region: str = 'us-east-1'):
-        self.cloudtrail = boto3.client('cloudtrail', region_name=region)
+    """Query CloudTrail for Bedrock InvokeModel events.
+
+    The query window is split into sub-intervals that are scanned in
+    parallel, with all LookupEvents calls of the querier sharing one rate
+    limiter. Matched request IDs and the intervals scanned are kept across
+    retries, so a retry only scans what may have changed: the part of the
+    window too recent to have settled (see DEFAULT_SETTLE_DELAY) and any
+    extension of the end time.
+
+    With an index (see cloudtrail_index.py), every event read and every
+    settled interval is recorded on disk, so request IDs seen by earlier
+    queries are answered locally and only time ranges never scanned are
+    queried.
+
+    `ingest_log_files` reads the same events from CloudTrail log files on
+    disk instead, without the LookupEvents rate limit.
+    """
+
+    def __init__(
+        self,
+        region: str = "us-east-1",
+        rate: float = DEFAULT_LOOKUP_RATE,
+        index_path: Optional[Path] = DEFAULT_INDEX_PATH,
+    ):
+        config = Config(retries={"mode": "standard", "max_attempts": 10})
+        self.cloudtrail = boto3.client("cloudtrail", region_name=region, config=config)
         self.home_region = region
-    
-    def query_request_ids(self, request_ids: List[str], 
-                         start_time: datetime = None,
-                         end_time: datetime = None,
-                         max_retries: int = 3,
-                         retry_delay: int = 60) -> Dict[str, bool]:
+        self.rate_limiter = RateLimiter(rate)
+        self.index = CloudTrailIndex(index_path) if index_path is not None else None
+
+    def query_request_ids(
+        self,
+        request_ids: List[str],
+        start_time: datetime = None,
+        end_time: datetime = None,
+        max_retries: int = 3,
+        retry_delay: int = 60,
+        window: timedelta = DEFAULT_WINDOW,
+        workers: int = DEFAULT_WORKERS,
+        settle_delay: timedelta = DEFAULT_SETTLE_DELAY,
+        include_missing: bool = True,
+    ) -> Dict[str, bool]:
         """Query CloudTrail for request IDs and determine if cross-region.
-        
+
         Args:
             request_ids: List of Bedrock request IDs to query
             start_time: Start time for CloudTrail query (default: 15 min ago)
             end_time: End time for CloudTrail query (default: now)
             max_retries: Maximum number of retry attempts (default: 3)
             retry_delay: Delay between retries in seconds (default: 60)
-            
+            window: Length of the sub-intervals scanned in parallel
+            workers: Number of sub-intervals scanned at once
+            settle_delay: Age after which a scanned interval is not rescanned on retry
+            include_missing: Map request IDs not found to False (otherwise they are left out)
+
         Returns:
             Dict mapping request_id -> is_cross_region (True if cross-region)
         """
         if not request_ids:
             return {}
-        
+
         # Default time range: last 15 minutes
         if end_time is None:
             end_time = datetime.utcnow()
         if start_time is None:
             start_time = end_time - timedelta(minutes=15)
-        
+        start_time = _utc(start_time)
+        end_time = _utc(end_time)
+
+        # Convert request IDs to set for faster lookup
+        request_id_set = set(request_ids)
         results = {}
-        
+        # Settled intervals already scanned, kept across retries
+        scanned = []
+
+        if self.index is not None:
+            for request_id, event in self.index.lookup(request_id_set).items():
+                results[request_id] = self._is_cross_region(event)
+            scanned = self.index.covered(self.home_region)
+            print(f"Found {len(results)}/{len(request_id_set)} request IDs in {self.index.path}")
+
         for attempt in range(max_retries + 1):
+            if len(results) == len(request_id_set):
+                break
+
+            windows = [
+                interval
+                for gap_start, gap_end in _uncovered(start_time, end_time, scanned)
+                for interval in _split(gap_start, gap_end, window)
+            ]
             print(f"Querying CloudTrail (attempt {attempt + 1}/{max_retries + 1}) from {start_time} to {end_time}")
-            print(f"Looking for {len(request_ids)} request IDs...")
-            
-            # Convert request IDs to set for faster lookup
-            request_id_set = set(request_ids)
-            
-            # Query CloudTrail events
-            paginator = self.cloudtrail.get_paginator('lookup_events')
-            page_iterator = paginator.paginate(
-                LookupAttributes=[
-                    {
-                        'AttributeKey': 'EventName',
-                        'AttributeValue': 'ConverseStream'
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time
+            print(
+                f"Looking for {len(request_id_set) - len(results)} request IDs "
+                f"in {len(windows)} windows..."
             )
-            
-            events_checked = 0
-            for page in page_iterator:
-                for event in page.get('Events', []):
-                    events_checked += 1
-                    
-                    # Parse CloudTrail event
-                    cloud_trail_event = json.loads(event.get('CloudTrailEvent', '{}'))
-                    request_id = cloud_trail_event.get('requestID')  # Note: requestID not x-amzn-requestid
-                    
-                    if request_id in request_id_set:
-                        # Check if cross-region
-                        is_cross_region = self._is_cross_region(cloud_trail_event)
-                        results[request_id] = is_cross_region
-                        print(f"  Found {request_id}: cross_region={is_cross_region}")
-                        
-                        # Stop if we found all request IDs
-                        if len(results) == len(request_ids):
-                            break
-                
-                if len(results) == len(request_ids):
-                    break
-            
+
+            events_checked = self._scan_windows(
+                windows, request_id_set, results, scanned, workers, settle_delay
+            )
+
             print(f"Checked {events_checked} CloudTrail events")
-            print(f"Found {len(results)}/{len(request_ids)} request IDs")
-            
+            print(f"Found {len(results)}/{len(request_id_set)} request IDs")
+
             # If we found all request IDs, we're done
-            if len(results) == len(request_ids):
+            if len(results) == len(request_id_set):
                 break
-            
+
             # If this isn't the last attempt, wait and retry
             if attempt < max_retries:
-                missing_count = len(request_ids) - len(results)
+                missing_count = len(request_id_set) - len(results)
                 print(f"Still missing {missing_count} request IDs. Waiting {retry_delay} seconds before retry...")
-                import time
                 time.sleep(retry_delay)
                 # Extend end time for next attempt
                 end_time = datetime.utcnow()
-        
+
         # Mark unfound requests as unknown (False)
         for request_id in request_ids:
             if request_id not in results:
-                results[request_id] = False
+                if include_missing:
+                    results[request_id] = False
                 print(f"  Warning: Request ID {request_id} not found in CloudTrail after {max_retries + 1} attempts")
-        
+
+        return results
+
+    def ingest_log_files(
+        self,
+        log_dir: Path,
+        request_ids: Optional[List[str]] = None,
+        processes: Optional[int] = None,
+    ) -> Dict[str, bool]:
+        """Read CloudTrail log files (*.json.gz, *.json) under a directory, e.g. a synced S3 export.
+
+        Files are parsed in a process pool, each streamed with bounded memory
+        (see cloudtrail_logs.py); their ConverseStream events are added to the
+        index, if any.
+
+        Args:
+            log_dir: Directory searched recursively for log files
+            request_ids: Request IDs to classify (default: every ConverseStream event read)
+            processes: Number of worker processes (default: one per CPU)
+
+        Returns:
+            Dict mapping request_id -> is_cross_region for the request IDs found
+        """
+        files = find_log_files(log_dir)
+        print(f"Reading {len(files)} CloudTrail log files from {log_dir}...")
+        request_id_set = set(request_ids) if request_ids is not None else None
+        results = {}
+        records_read = 0
+        events_read = 0
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for rows, records in executor.map(read_converse_stream_rows, files, chunksize=4):
+                records_read += records
+                events_read += len(rows)
+                if self.index is not None:
+                    self.index.add_rows(rows)
+                for row in rows:
+                    if request_id_set is None or row[0] in request_id_set:
+                        results[row[0]] = self._is_cross_region(row_event(row))
+
+        print(f"Read {records_read} records, {events_read} ConverseStream events")
+        if request_id_set is not None:
+            print(f"Found {len(results)}/{len(request_id_set)} request IDs")
         return results
-    
+
+    def _scan_windows(
+        self,
+        windows: List[Tuple[datetime, datetime]],
+        request_id_set: Set[str],
+        results: Dict[str, bool],
+        scanned: List[Tuple[datetime, datetime]],
+        workers: int,
+        settle_delay: timedelta,
+    ) -> int:
+        """Scan windows in parallel, adding matches to `results` and settled windows to `scanned`.
+
+        Returns:
+            Number of events checked
+        """
+        lock = threading.Lock()
+        all_found = threading.Event()
+
+        def scan(interval):
+            scan_start = datetime.utcnow()
+            events_checked, complete = self._scan_window(
+                interval, request_id_set, results, lock, all_found
+            )
+            if complete:
+                # Only the part old enough to have all its events delivered is done
+                settled_end = min(interval[1], scan_start - settle_delay)
+                if settled_end > interval[0]:
+                    with lock:
+                        _add_covered(scanned, interval[0], settled_end)
+                        if self.index is not None:
+                            self.index.set_covered(self.home_region, scanned)
+            return events_checked
+
+        if not windows:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as executor:
+            return sum(executor.map(scan, windows))
+
+    def _scan_window(
+        self,
+        interval: Tuple[datetime, datetime],
+        request_id_set: Set[str],
+        results: Dict[str, bool],
+        lock: threading.Lock,
+        all_found: threading.Event,
+    ) -> Tuple[int, bool]:
+        """Read every page of ConverseStream events in one window.
+
+        Returns:
+            (events checked, whether every page was read)
+        """
+        events_checked = 0
+        next_token: Optional[str] = None
+        while True:
+            if all_found.is_set():
+                return events_checked, False
+            kwargs = {
+                "LookupAttributes": [
+                    {"AttributeKey": "EventName", "AttributeValue": "ConverseStream"}
+                ],
+                "StartTime": interval[0],
+                "EndTime": interval[1],
+            }
+            if next_token:
+                kwargs["NextToken"] = next_token
+            self.rate_limiter.acquire()
+            page = self.cloudtrail.lookup_events(**kwargs)
+
+            parsed_events = []
+            for event in page.get("Events", []):
+                events_checked += 1
+
+                # Parse CloudTrail event
+                cloud_trail_event = json.loads(event.get("CloudTrailEvent", "{}"))
+                parsed_events.append(cloud_trail_event)
+                # Note: requestID not x-amzn-requestid
+                request_id = cloud_trail_event.get("requestID")
+
+                if request_id in request_id_set:
+                    # Check if cross-region
+                    is_cross_region = self._is_cross_region(cloud_trail_event)
+                    with lock:
+                        results[request_id] = is_cross_region
+                        print(f"  Found {request_id}: cross_region={is_cross_region}")
+
+                        # Stop every window once all request IDs are found
+                        if len(results) == len(request_id_set):
+                            all_found.set()
+
+            if self.index is not None:
+                self.index.add_events(parsed_events)
+
+            next_token = page.get("NextToken")
+            if not next_token:
+                return events_checked, True
+
     def _is_cross_region(self, event: dict) -> bool:
         """Determine if a CloudTrail event represents a cross-region request.
         
@@ -121,14 +368,14 @@ class CloudTrailQuerier:
         # Check for inference region in additionalEventData (ConverseStream specific)
         additional_data = event.get('additionalEventData', {})
         inference_region = additional_data.get('inferenceRegion', '')
-        
+
         if inference_region and inference_region != self.home_region:
             return True
-        
+
         # Check for inference profile ARN in request parameters
         request_params = event.get('requestParameters', {})
         inference_profile_arn = request_params.get('inferenceProfileArn', '')
-        
+
         if inference_profile_arn:
             # Parse region from ARN: arn:aws:bedrock:REGION:...
             parts = inference_profile_arn.split(':')
@@ -136,12 +383,12 @@ class CloudTrailQuerier:
                 request_region = parts[3]
                 if request_region != self.home_region:
                     return True
-        
+
         # Check event region vs home region
         event_region = event.get('awsRegion', '')
         if event_region and event_region != self.home_region:
             return True
-        
+
         # Check for cross-region indicators in resources
         resources = event.get('resources', [])
         for resource in resources:
@@ -152,7 +399,7 @@ class CloudTrailQuerier:
                     resource_region = parts[3]
                     if resource_region != self.home_region:
                         return True
-        
+
         return False
 
 
@@ -160,11 +407,13 @@ def main():
     parser = argparse.ArgumentParser(
         description='Query CloudTrail for Bedrock request cross-region status'
     )
-    parser.add_argument(
-        '--request-ids',
-        nargs='+',
-        required=True,
-        help='Bedrock request IDs to query'
+    request_ids_group = parser.add_mutually_exclusive_group(required=True)
+    request_ids_group.add_argument("--request-ids", nargs="+", help="Bedrock request IDs to query")
+    request_ids_group.add_argument(
+        "--request-ids-file",
+        type=Path,
+        help="Request IDs file written by the benchmark "
+        "(e.g. benchmark/results/bedrock_raw.request_ids.jsonl)",
     )
     parser.add_argument(
         '--region',
@@ -192,12 +441,54 @@ def main():
         help='Delay between retries in seconds (default: 60)'
     )
     parser.add_argument(
-        '--output',
-        help='Output JSON file path'
+        "--window-minutes",
+        type=float,
+        default=DEFAULT_WINDOW.total_seconds() / 60,
+        help="Length of the windows scanned in parallel "
+        f"(default: {DEFAULT_WINDOW.total_seconds() / 60:g})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of windows scanned at once (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_LOOKUP_RATE,
+        help=f"Maximum LookupEvents calls per second (default: {DEFAULT_LOOKUP_RATE:g})",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=DEFAULT_INDEX_PATH,
+        help="Local index of CloudTrail events, checked before querying "
+        f"(default: {DEFAULT_INDEX_PATH})",
+    )
+    parser.add_argument(
+        "--no-index", action="store_true", help="Query CloudTrail without the local index"
+    )
+    parser.add_argument(
+        "--log-dir",
+        type=Path,
+        help="Directory of CloudTrail log files (*.json.gz) to read before querying CloudTrail",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use the log files and the index, without querying CloudTrail",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Worker processes for reading log files (default: one per CPU)",
     )
-    
+    parser.add_argument("--output", help="Output JSON file path")
+
     args = parser.parse_args()
-    
+
     # Parse times
     start_time = None
     end_time = None
@@ -205,24 +496,65 @@ def main():
         start_time = datetime.fromisoformat(args.start_time)
     if args.end_time:
         end_time = datetime.fromisoformat(args.end_time)
-    
+
+    if args.request_ids_file:
+        from benchmark.benchmark_runner import load_request_ids
+
+        request_ids = list(
+            dict.fromkeys(
+                request_id
+                for entry in load_request_ids(args.request_ids_file)
+                for request_id in entry["request_ids"]
+            )
+        )
+    else:
+        request_ids = args.request_ids
+
+    querier = CloudTrailQuerier(
+        region=args.region, rate=args.rate, index_path=None if args.no_index else args.index
+    )
+
+    # Read log files first; CloudTrail is only queried for what they don't have
+    results = {}
+    if args.log_dir:
+        results = querier.ingest_log_files(args.log_dir, request_ids, processes=args.processes)
+    missing = [request_id for request_id in request_ids if request_id not in results]
+
+    if args.offline:
+        if querier.index is not None:
+            for request_id, event in querier.index.lookup(missing).items():
+                results[request_id] = querier._is_cross_region(event)
+        for request_id in missing:
+            if request_id not in results:
+                print(f"  Warning: Request ID {request_id} not found offline")
+        missing = []
+
     # Query CloudTrail
-    querier = CloudTrailQuerier(region=args.region)
-    results = querier.query_request_ids(
-        request_ids=args.request_ids,
-        start_time=start_time,
-        end_time=end_time,
-        max_retries=args.max_retries,
-        retry_delay=args.retry_delay
-    )
-    
+    results.update(
+        querier.query_request_ids(
+            request_ids=missing,
+            start_time=start_time,
+            end_time=end_time,
+            max_retries=args.max_retries,
+            retry_delay=args.retry_delay,
+            window=timedelta(minutes=args.window_minutes),
+            workers=args.workers,
+            include_missing=False,
+        )
+    )
+
+    # Request IDs not found are unknown (null in the output), not same-region
+    not_found = [request_id for request_id in request_ids if request_id not in results]
+
     # Print results
     print("\nResults:")
     cross_region_count = sum(1 for is_cross in results.values() if is_cross)
-    print(f"  Total requests: {len(results)}")
+    print(f"  Total requests: {len(request_ids)}")
     print(f"  Cross-region: {cross_region_count}")
     print(f"  Same-region: {len(results) - cross_region_count}")
-    
+    print(f"  Not found: {len(not_found)}")
+    results.update(dict.fromkeys(not_found))
+
     # Save to file if requested
     if args.output:
         with open(args.output, 'w') as f:
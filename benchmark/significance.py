@@ -0,0 +1,184 @@
+"""Significance of latency differences between two APIs.
+
+Latencies are skewed and the samples small, so differences are judged with
+distribution-free methods:
+
+- bootstrap confidence intervals for the difference of medians and of p95s,
+  with all resamples drawn and reduced as one array (10k resamples of a few
+  hundred samples take milliseconds)
+- the Mann-Whitney U test (normal approximation with tie and continuity
+  correction), which asks whether one API's latencies tend to be larger
+- Noether's sample size formula for the Mann-Whitney test, to estimate how
+  many runs per API the observed effect needs before it is significant
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 10000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_ALPHA = 0.05
+DEFAULT_POWER = 0.8
+
+# Upper bound on resampled values held in memory at once
+_MAX_BATCH_VALUES = 20_000_000
+
+
+def _resampled_percentiles(
+    values: np.ndarray, percentiles: Sequence[float], resamples: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Percentiles of `resamples` bootstrap resamples of `values`.
+
+    Shape (len(percentiles), resamples).
+    """
+    n = len(values)
+    batch = max(1, min(resamples, _MAX_BATCH_VALUES // n))
+    results = []
+    for start in range(0, resamples, batch):
+        size = min(batch, resamples - start)
+        samples = values[rng.integers(0, n, size=(size, n))]
+        results.append(np.percentile(samples, percentiles, axis=1))
+    return np.concatenate(results, axis=1)
+
+
+def bootstrap_percentile_diffs(
+    a: Sequence[float],
+    b: Sequence[float],
+    percentiles: Sequence[float] = (50, 95),
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None,
+) -> Dict[float, Dict[str, float]]:
+    """Bootstrap confidence intervals for percentile(a) - percentile(b).
+
+    Args:
+        a, b: The two samples
+        percentiles: Percentiles to compare (50 is the median)
+        resamples: Number of bootstrap resamples
+        confidence: Confidence level of the (percentile method) intervals
+        seed: Random seed for reproducible intervals
+
+    Returns:
+        For each percentile: `diff` (observed), `ci_low` and `ci_high`
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if not len(a) or not len(b):
+        return {}
+    rng = np.random.default_rng(seed)
+    diffs = _resampled_percentiles(a, percentiles, resamples, rng) - _resampled_percentiles(
+        b, percentiles, resamples, rng
+    )
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(diffs, [tail, 100 - tail], axis=1)
+    observed = np.percentile(a, percentiles) - np.percentile(b, percentiles)
+    return {
+        percentile: {"diff": float(observed[i]), "ci_low": float(low[i]), "ci_high": float(high[i])}
+        for i, percentile in enumerate(percentiles)
+    }
+
+
+def _average_ranks(values: np.ndarray):
+    """Ranks (1-based, ties get their average rank) and the sizes of the tie groups."""
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    average = ends - (counts - 1) / 2
+    return average[inverse], counts
+
+
+def mann_whitney(a: Sequence[float], b: Sequence[float]) -> Dict[str, float]:
+    """Two-sided Mann-Whitney U test.
+
+    Returns:
+        `u` (U statistic of `a`), `p_value`, and `prob_greater`: the estimated
+        probability that a value from `a` exceeds one from `b` (ties count
+        half; 0.5 means no difference)
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n_a, n_b = len(a), len(b)
+    if not n_a or not n_b:
+        return {}
+    ranks, tie_counts = _average_ranks(np.concatenate([a, b]))
+    u = ranks[:n_a].sum() - n_a * (n_a + 1) / 2
+    n = n_a + n_b
+    mean = n_a * n_b / 2
+    tie_term = float((tie_counts**3 - tie_counts).sum()) / (n * (n - 1)) if n > 1 else 0.0
+    variance = n_a * n_b / 12 * ((n + 1) - tie_term)
+    if variance <= 0:
+        # Every value is the same
+        p_value = 1.0
+    else:
+        z = max(abs(u - mean) - 0.5, 0) / math.sqrt(variance)
+        p_value = math.erfc(z / math.sqrt(2))
+    return {"u": float(u), "p_value": min(p_value, 1.0), "prob_greater": float(u / (n_a * n_b))}
+
+
+def runs_needed(
+    prob_greater: float, alpha: float = DEFAULT_ALPHA, power: float = DEFAULT_POWER
+) -> Optional[int]:
+    """Samples per API for a Mann-Whitney test to detect an effect with the given power (Noether).
+
+    Args:
+        prob_greater: Probability that a value from one API exceeds one from the other
+        alpha: Significance level (two-sided)
+        power: Probability of detecting the effect
+
+    Returns:
+        Samples per API, or None if there is no effect to detect
+    """
+    effect = prob_greater - 0.5
+    if abs(effect) < 1e-9:
+        return None
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - alpha / 2) + normal.inv_cdf(power)
+    # Total N = z^2 / (12 c (1 - c) effect^2) with equal group sizes (c = 1/2)
+    total = z * z / (3 * effect * effect)
+    return math.ceil(total / 2)
+
+
+def compare_samples(
+    a: Sequence[float],
+    b: Sequence[float],
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    alpha: float = DEFAULT_ALPHA,
+    power: float = DEFAULT_POWER,
+    seed: Optional[int] = None,
+) -> Dict[str, Optional[float]]:
+    """Bootstrap intervals for the median and p95 differences, Mann-Whitney test and runs needed.
+
+    Returns:
+        `median_diff`, `median_ci_low`, `median_ci_high`, `p95_diff`,
+        `p95_ci_low`, `p95_ci_high`, `p_value`, `prob_greater`, `significant`
+        and `more_runs_needed` (additional runs per API for the observed effect
+        to reach significance at `alpha` with `power`; 0 once significant,
+        None if there is no effect); empty if either sample is empty
+    """
+    if not len(a) or not len(b):
+        return {}
+    intervals = bootstrap_percentile_diffs(a, b, (50, 95), resamples, confidence, seed)
+    test = mann_whitney(a, b)
+    significant = test["p_value"] < alpha
+    needed = runs_needed(test["prob_greater"], alpha, power)
+    if significant:
+        more_runs = 0
+    elif needed is None:
+        more_runs = None
+    else:
+        more_runs = max(needed - min(len(a), len(b)), 1)
+    return {
+        "median_diff": intervals[50]["diff"],
+        "median_ci_low": intervals[50]["ci_low"],
+        "median_ci_high": intervals[50]["ci_high"],
+        "p95_diff": intervals[95]["diff"],
+        "p95_ci_low": intervals[95]["ci_low"],
+        "p95_ci_high": intervals[95]["ci_high"],
+        "p_value": test["p_value"],
+        "prob_greater": test["prob_greater"],
+        "significant": significant,
+        "more_runs_needed": more_runs,
+    }
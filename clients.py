@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Shared, pooled API client factory.
+
+Creating a `bedrock-runtime` client resolves credentials and the endpoint,
+and its first request pays for a new TCP+TLS handshake. The scripts and the
+benchmark used to pay that for every invocation (test_latency.py even counted
+it inside the measured first-token time). `get_bedrock_runtime_client` caches
+one client per configuration on a shared boto3 session, so credential and
+endpoint resolution happen once and the urllib3 connection pool (with TCP
+keepalive) is reused across requests. Connections can be opened ahead of time
+with `prewarm_connections`.
+
+The Anthropic Messages API paths get the same treatment from
+`get_anthropic_session`: one pooled `requests.Session` (or, optionally, an
+HTTP/2 client) shared across turns and tasks. Its base URL can be overridden
+with the ANTHROPIC_BASE_URL environment variable, e.g. to point at a local
+mock_anthropic_server.py.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+
+DEFAULT_REGION = "us-east-1"
+DEFAULT_READ_TIMEOUT = 300
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+DEFAULT_ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+ANTHROPIC_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL", DEFAULT_ANTHROPIC_BASE_URL).rstrip("/")
+DEFAULT_ANTHROPIC_POOL_SIZE = 10
+
+_session = None
+_clients = {}
+_anthropic_sessions = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide boto3 session shared by all cached clients.
+
+    Returns:
+        boto3.session.Session: The shared session
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+
+def create_bedrock_runtime_client(
+    region_name=DEFAULT_REGION,
+    read_timeout=DEFAULT_READ_TIMEOUT,
+    max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    endpoint_url=None,
+    session=None,
+):
+    """
+    Create a new, uncached Bedrock Runtime client.
+
+    Use this to measure cold-start cost; everything else should call
+    `get_bedrock_runtime_client`.
+
+    Args:
+        region_name (str): The AWS region
+        read_timeout (int): Socket read timeout in seconds
+        max_pool_connections (int): Maximum number of pooled connections
+        tcp_keepalive (bool): Whether to enable TCP keepalive on pooled connections
+        endpoint_url (str): Optional endpoint override, e.g. a local stand-in server
+        session (boto3.session.Session): Session to create the client from (default: a new session)
+
+    Returns:
+        botocore.client.BaseClient: The Bedrock Runtime client
+    """
+    config = Config(
+        read_timeout=read_timeout,
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+    )
+    session = session or boto3.session.Session()
+    return session.client(
+        "bedrock-runtime", region_name=region_name, config=config, endpoint_url=endpoint_url
+    )
+
+
+def get_bedrock_runtime_client(
+    region_name=DEFAULT_REGION,
+    read_timeout=DEFAULT_READ_TIMEOUT,
+    max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    endpoint_url=None,
+    prewarm=0,
+):
+    """
+    Return the shared Bedrock Runtime client for a configuration, creating it once.
+
+    boto3 clients are thread-safe, so the returned client can be shared by
+    concurrent tasks.
+
+    Args:
+        region_name (str): The AWS region
+        read_timeout (int): Socket read timeout in seconds
+        max_pool_connections (int): Maximum number of pooled connections
+        tcp_keepalive (bool): Whether to enable TCP keepalive on pooled connections
+        endpoint_url (str): Optional endpoint override, e.g. a local stand-in server
+        prewarm (int): Number of pooled connections to open before returning
+
+    Returns:
+        botocore.client.BaseClient: The Bedrock Runtime client
+    """
+    key = (region_name, read_timeout, max_pool_connections, tcp_keepalive, endpoint_url)
+    session = get_session()
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = create_bedrock_runtime_client(
+                region_name,
+                read_timeout,
+                max_pool_connections,
+                tcp_keepalive,
+                endpoint_url,
+                session=session,
+            )
+            _clients[key] = client
+    if prewarm:
+        prewarm_connections(client, prewarm)
+    return client
+
+
+def prewarm_connections(client, count=1):
+    """
+    Open pooled connections (TCP and TLS handshakes) for a client ahead of time.
+
+    This goes through the client's urllib3 pool the same way botocore sends a
+    request, so the opened connections are the ones later requests reuse. It
+    relies on botocore internals; if those are unavailable nothing is opened.
+
+    Args:
+        client: A botocore client
+        count (int): Number of connections to open (capped at the pool size)
+
+    Returns:
+        int: Number of connections opened
+    """
+    try:
+        endpoint = client._endpoint
+        url = endpoint.host
+        http_session = endpoint.http_session
+        proxy_url = http_session._proxy_config.proxy_url_for(url)
+        manager = http_session._get_connection_manager(url, proxy_url)
+        pool = manager.connection_from_url(url)
+        http_session._setup_ssl_cert(pool, url, http_session._verify)
+    except AttributeError:
+        return 0
+
+    count = min(count, client.meta.config.max_pool_connections)
+    return _open_pool_connections(pool, count)
+
+
+def _open_pool_connections(pool, count):
+    connections = [pool._get_conn() for _ in range(max(0, count))]
+    opened = 0
+    try:
+        idle = [conn for conn in connections if getattr(conn, "sock", None) is None]
+        if idle:
+            with ThreadPoolExecutor(max_workers=len(idle)) as executor:
+                for _ in executor.map(lambda conn: conn.connect(), idle):
+                    opened += 1
+    finally:
+        for conn in connections:
+            pool._put_conn(conn)
+    return opened
+
+
+class _Http2Response:
+    """
+    Minimal requests.Response look-alike around a streamed httpx response.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def __iter__(self):
+        return self._response.iter_bytes()
+
+    def iter_lines(self):
+        for line in self._response.iter_lines():
+            yield line.encode("utf-8")
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self._response.read()
+            raise requests.HTTPError(
+                f"{self.status_code} Error: {self._response.text}", response=self
+            )
+
+    def close(self):
+        self._response.close()
+
+
+class Http2Session:
+    """
+    A pooled HTTP/2 session with the subset of the requests.Session API used here.
+
+    Requires the optional `httpx[http2]` dependency.
+    """
+
+    def __init__(self, pool_size=DEFAULT_ANTHROPIC_POOL_SIZE):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError(
+                "HTTP/2 support requires the optional dependency: pip install 'httpx[http2]'"
+            )
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._client = httpx.Client(http2=True, limits=limits, timeout=None)
+
+    def post(self, url, headers=None, json=None, stream=False, timeout=None):
+        request = self._client.build_request(
+            "POST", url, headers=headers, json=json, timeout=timeout
+        )
+        return _Http2Response(self._client.send(request, stream=stream))
+
+    def head(self, url, timeout=None):
+        return self._client.head(url, timeout=timeout)
+
+    def close(self):
+        self._client.close()
+
+
+def create_anthropic_session(pool_size=DEFAULT_ANTHROPIC_POOL_SIZE, http2=False):
+    """
+    Create a new, uncached session for the Anthropic Messages API.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        http2 (bool): Whether to use HTTP/2 (requires `httpx[http2]`)
+
+    Returns:
+        requests.Session or Http2Session: The session
+    """
+    if http2:
+        return Http2Session(pool_size)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_anthropic_session(
+    pool_size=DEFAULT_ANTHROPIC_POOL_SIZE, http2=False, prewarm=0, base_url=ANTHROPIC_BASE_URL
+):
+    """
+    Return the shared Anthropic Messages API session for a configuration, creating it once.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        http2 (bool): Whether to use HTTP/2 (requires `httpx[http2]`)
+        prewarm (int): Number of connections to `base_url` to open before returning
+        base_url (str): The API base URL, used for pre-warming
+
+    Returns:
+        requests.Session or Http2Session: The session
+    """
+    key = (pool_size, http2)
+    with _lock:
+        session = _anthropic_sessions.get(key)
+        if session is None:
+            session = create_anthropic_session(pool_size, http2)
+            _anthropic_sessions[key] = session
+    if prewarm:
+        prewarm_session(session, base_url, prewarm)
+    return session
+
+
+def prewarm_session(session, base_url=ANTHROPIC_BASE_URL, count=1):
+    """
+    Open pooled connections (TCP and TLS handshakes) to `base_url` ahead of time.
+
+    Args:
+        session (requests.Session or Http2Session): The session to warm up
+        base_url (str): The API base URL
+        count (int): Number of connections to open (HTTP/2 multiplexes over one)
+
+    Returns:
+        int: Number of connections opened
+    """
+    if isinstance(session, Http2Session):
+        session.head(base_url, timeout=30)
+        return 1
+
+    # Resolve proxies and CA bundle the way Session.request does, so the warmed
+    # pool is the one the real requests are sent on
+    settings = session.merge_environment_settings(base_url, {}, None, None, None)
+    adapter = session.get_adapter(base_url)
+    request = requests.Request("POST", base_url).prepare()
+    if hasattr(adapter, "get_connection_with_tls_context"):
+        pool = adapter.get_connection_with_tls_context(
+            request, settings["verify"], settings["proxies"], settings["cert"]
+        )
+    else:
+        pool = adapter.get_connection(base_url, settings["proxies"])
+    adapter.cert_verify(pool, base_url, settings["verify"], settings["cert"])
+    return _open_pool_connections(pool, min(count, adapter._pool_maxsize))
+
+
+def get_anthropic_api_key(base_url=ANTHROPIC_BASE_URL):
+    """
+    Return the Anthropic API key from the ANTHROPIC_API_KEY environment variable.
+
+    Local stand-ins (any base URL other than the public API) do not check the
+    key, so a placeholder is returned for them when the variable is not set.
+
+    Args:
+        base_url (str): The API base URL the key is for
+
+    Returns:
+        str: The API key, or None if it is required and not set
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key and base_url.rstrip("/") != DEFAULT_ANTHROPIC_BASE_URL:
+        return "unused"
+    return api_key
+
+
+def reset_clients():
+    """
+    Drop all cached clients, sessions and the shared boto3 session.
+    """
+    global _session
+    with _lock:
+        _clients.clear()
+        _anthropic_sessions.clear()
+        _session = None
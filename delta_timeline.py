@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Per-delta arrival times and a stall detector for streamed responses.
+
+`log()` can print wall-clock timestamps, but the gap between consecutive
+deltas was never recorded, so tool input stalling only showed up as one
+aggregate "Tool input generation time". A `DeltaTimeline` keeps, for every
+content delta, its arrival time, the gap since the previous delta of the same
+stream, its size in UTF-8 bytes and its block type, in compact typed arrays
+(25 bytes per delta). `StallDetector` flags the gaps above a threshold and
+reports them per block type, so a stall before or inside a tool input is told
+apart from a pause in the text.
+
+A gap is attributed to the block type of the delta that ends it: the wait
+between the last text delta and the first tool input delta is a toolUse
+stall.
+"""
+
+import time
+from array import array
+from collections import namedtuple
+
+DEFAULT_STALL_THRESHOLD = 1.0
+
+# Block types, as named in converseStream; Messages API text_delta,
+# input_json_delta and thinking_delta map to them
+BLOCK_KINDS = ("text", "toolUse", "reasoning")
+_KIND_CODES = {kind: code for code, kind in enumerate(BLOCK_KINDS)}
+
+# One detected stall: block type, index of the delta that ended it, gap
+# length in seconds and its end, in seconds since the first delta
+Stall = namedtuple("Stall", ["kind", "index", "gap", "offset"])
+
+
+class DeltaTimeline:
+    """
+    Arrival time, gap, size and block type of every delta of one or more streams.
+
+    Call `new_stream` before each stream, so the wait for the first delta
+    of a stream (the time to first token) is not counted as a gap.
+    """
+
+    def __init__(self):
+        self.times = array("d")
+        self.gaps = array("d")
+        self.sizes = array("L")
+        self.kinds = array("B")
+        self._last = None
+
+    def __len__(self):
+        return len(self.times)
+
+    def new_stream(self):
+        """Start a new stream; the next delta has no gap."""
+        self._last = None
+
+    def record(self, kind, text):
+        """
+        Record a delta arriving now.
+
+        Args:
+            kind (str): The block type, one of BLOCK_KINDS
+            text (str): The delta text or JSON fragment
+        """
+        now = time.perf_counter()
+        last, self._last = self._last, now
+        self.times.append(now)
+        self.gaps.append(now - last if last is not None else 0.0)
+        self.sizes.append(len(text) if text.isascii() else len(text.encode("utf-8")))
+        self.kinds.append(_KIND_CODES[kind])
+
+    def summary(self):
+        """
+        Summarize the deltas per block type.
+
+        Returns:
+            dict: For each block type present, `deltas`, `bytes` and `max_gap` (seconds)
+        """
+        summary = {}
+        for kind_code, gap, size in zip(self.kinds, self.gaps, self.sizes):
+            kind = BLOCK_KINDS[kind_code]
+            entry = summary.get(kind)
+            if entry is None:
+                entry = summary[kind] = {"deltas": 0, "bytes": 0, "max_gap": 0.0}
+            entry["deltas"] += 1
+            entry["bytes"] += size
+            if gap > entry["max_gap"]:
+                entry["max_gap"] = gap
+        return summary
+
+
+class StallDetector:
+    """
+    Flags the gaps between deltas that exceed a threshold.
+    """
+
+    def __init__(self, threshold=DEFAULT_STALL_THRESHOLD):
+        """
+        Args:
+            threshold (float): Minimum gap in seconds that counts as a stall
+        """
+        self.threshold = threshold
+
+    def detect(self, timeline):
+        """
+        Find the stalls of a timeline.
+
+        Args:
+            timeline (DeltaTimeline): The timeline to check
+
+        Returns:
+            list: Stall tuples, in arrival order
+        """
+        if not len(timeline):
+            return []
+        first = timeline.times[0]
+        threshold = self.threshold
+        return [
+            Stall(BLOCK_KINDS[timeline.kinds[index]], index, gap, timeline.times[index] - first)
+            for index, gap in enumerate(timeline.gaps)
+            if gap > threshold
+        ]
+
+    def report(self, timeline):
+        """
+        Report the stalls of a timeline per block type.
+
+        Args:
+            timeline (DeltaTimeline): The timeline to check
+
+        Returns:
+            dict: For each block type present, `deltas`, `bytes`, `max_gap`,
+                `stalls` (count) and `stall_time` (seconds spent in stalls)
+        """
+        report = timeline.summary()
+        for entry in report.values():
+            entry["stalls"] = 0
+            entry["stall_time"] = 0.0
+        for stall in self.detect(timeline):
+            report[stall.kind]["stalls"] += 1
+            report[stall.kind]["stall_time"] += stall.gap
+        return report
+
+
+def format_stall_report(timeline, threshold=DEFAULT_STALL_THRESHOLD):
+    """
+    Describe the deltas and stalls of a timeline, one line per block type.
+
+    Args:
+        timeline (DeltaTimeline): The timeline to describe
+        threshold (float): Minimum gap in seconds that counts as a stall
+
+    Returns:
+        str: The report
+    """
+    detector = StallDetector(threshold)
+    lines = [f"Delta timing (stall threshold {threshold:.2f}s):"]
+    for kind, entry in detector.report(timeline).items():
+        lines.append(
+            f"  {kind}: {entry['deltas']} deltas, {entry['bytes']} bytes, "
+            f"max gap {entry['max_gap']:.3f}s, "
+            f"{entry['stalls']} stalls ({entry['stall_time']:.3f}s)"
+        )
+    for stall in detector.detect(timeline):
+        lines.append(
+            f"  stall: {stall.gap:.3f}s before {stall.kind} delta #{stall.index} "
+            f"(+{stall.offset:.3f}s)"
+        )
+    return "\n".join(lines)
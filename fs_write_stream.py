@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+The fs_write tool use loop shared by the converseStream scripts.
+
+bedrock-tool-use-stalling.py, gpt-oss-tool-use-stalling.py and
+nova-tool-use-thinking.py send the same fs_write tool, execute its calls the
+same way and send the tool result back in a second stream. They differ only
+in how the deltas are logged (`StreamLogFormat`), in the model-specific
+request parameters (the `request_params` callback) and in the region, so
+everything else lives here and each script keeps only its command line.
+system-prompt-tool-use.py plugs in a handler subclass that takes the tool
+calls from XML tags in the text (`handler_class`).
+"""
+
+import datetime
+import json
+import os
+
+from botocore.exceptions import ClientError
+
+from async_bedrock import AsyncBedrockRuntimeClient
+from clients import get_bedrock_runtime_client
+from delta_timeline import DEFAULT_STALL_THRESHOLD, DeltaTimeline, format_stall_report
+from speculative_write import SpeculativeFileWriter
+from stream_engine import AssistantMessageBuilder, ConverseStreamProcessor, StreamHandler
+
+
+def log(message, timestamp_mode=False, end="\n", flush=False):
+    """
+    Log a message with an optional timestamp.
+
+    Args:
+        message (str): The message to log
+        timestamp_mode (bool): Whether to include a timestamp
+        end (str): String appended after the last character of message
+        flush (bool): Whether to force a flush of the output
+    """
+    if timestamp_mode:
+        current_time = datetime.datetime.now().isoformat(timespec="milliseconds")
+        print(f"[{current_time}] {message}", end=end, flush=flush)
+    else:
+        print(message, end=end, flush=flush)
+
+
+class StreamLogFormat:
+    """
+    How the deltas of a stream are logged.
+    """
+
+    def __init__(
+        self,
+        text="{text}",
+        tool_input="[Tool input: {fragment}] ",
+        reasoning=None,
+        flush_text=False,
+    ):
+        """
+        Args:
+            text (str): Format of a text delta, with a `text` field
+            tool_input (str): Format of a tool input fragment, with a `fragment` field
+            reasoning (str): Format of a reasoning delta, with a `reasoning` field
+                (None: not logged)
+            flush_text (bool): Whether to flush the output after every text delta of the first turn
+        """
+        self.text = text
+        self.tool_input = tool_input
+        self.reasoning = reasoning
+        self.flush_text = flush_text
+
+
+# Deltas printed as they are, the text running on without labels
+PLAIN_LOG_FORMAT = StreamLogFormat()
+
+# Every delta on its own line, labelled with its kind (models that also stream reasoning)
+TAGGED_LOG_FORMAT = StreamLogFormat(
+    text="[text] {text}",
+    tool_input="[tool] {fragment}",
+    reasoning="[reasoning] {reasoning}",
+    flush_text=True,
+)
+
+
+class FsWriteStreamHandler(StreamHandler):
+    """
+    Stream hooks that log converseStream events and execute fs_write tool calls.
+    """
+
+    def __init__(
+        self,
+        bedrock_runtime,
+        api_params,
+        prompt,
+        timestamp_mode=False,
+        speculative_writes=False,
+        defer_continuation=False,
+        log_format=PLAIN_LOG_FORMAT,
+    ):
+        """
+        Args:
+            bedrock_runtime: The Bedrock Runtime client (or an AsyncBedrockRuntimeClient)
+            api_params (dict): The converse_stream parameters of the initial request
+            prompt (str): The user prompt sent to the model
+            timestamp_mode (bool): Whether to print timestamps for each event
+            speculative_writes (bool): Whether to stream `create` file_text to disk while it
+                is generated
+            defer_continuation (bool): Collect tool results in `pending_continuations`
+                instead of sending them back from inside the stream (asyncio path)
+            log_format (StreamLogFormat): How the deltas are logged
+        """
+        self.bedrock_runtime = bedrock_runtime
+        self.api_params = api_params
+        self.prompt = prompt
+        self.timestamp_mode = timestamp_mode
+        self.speculative_writes = speculative_writes
+        self.speculative_writer = None
+        self.defer_continuation = defer_continuation
+        self.pending_continuations = []
+        self.log_format = log_format
+
+        # Track the assistant's response to include in the messages array
+        self.message_builder = AssistantMessageBuilder()
+
+        # Arrival time and size of every delta, across all turns
+        self.timeline = DeltaTimeline()
+
+    @property
+    def full_response(self):
+        """str: The full response text collected so far."""
+        return self.message_builder.full_response
+
+    def on_message_start(self, role):
+        log(f"[Message started with role: {role}]", self.timestamp_mode)
+
+    def on_block_start(self, block):
+        if block.kind == "toolUse":
+            log(f"[Tool Use Started: {block.name} (ID: {block.tool_use_id})]", self.timestamp_mode)
+            if self.speculative_writes and block.name == "fs_write":
+                self.speculative_writer = SpeculativeFileWriter()
+
+    def on_text_delta(self, block, text):
+        log(
+            self.log_format.text.format(text=text),
+            self.timestamp_mode,
+            flush=self.log_format.flush_text,
+        )
+
+    def on_reasoning_delta(self, block, reasoning):
+        # Reasoning content is not included in the assistant message for tool calls
+        if self.log_format.reasoning is not None:
+            log(
+                self.log_format.reasoning.format(reasoning=reasoning),
+                self.timestamp_mode,
+                flush=True,
+            )
+
+    def on_tool_input_delta(self, block, fragment):
+        log(self.log_format.tool_input.format(fragment=fragment), self.timestamp_mode, flush=True)
+
+    def on_tool_input_field(self, block, name, value):
+        log(f"[Tool parameter ready: {name}]", self.timestamp_mode, flush=True)
+        if self.speculative_writer is not None and self.speculative_writer.on_field(name, value):
+            log(
+                f"[Speculative write started: {self.speculative_writer.path}]",
+                self.timestamp_mode,
+                flush=True,
+            )
+
+    def on_tool_input_chunk(self, block, name, text):
+        if self.speculative_writer is not None:
+            self.speculative_writer.on_chunk(name, text)
+
+    def on_block_stop(self, block):
+        if block.kind != "toolUse":
+            return
+        writer, self.speculative_writer = self.speculative_writer, None
+        if not block.input_json:
+            return
+
+        timestamp_mode = self.timestamp_mode
+
+        # Log tool input generation time
+        log(
+            f"[Tool input generation time: {block.elapsed:.2f} seconds]", timestamp_mode, flush=True
+        )
+
+        # The tool input has been parsed incrementally as it streamed
+        try:
+            tool_input = block.parsed_input()
+        except json.JSONDecodeError:
+            log(f"\n[Error: Failed to parse tool input as JSON]")
+            if writer is not None:
+                writer.rollback()
+            return
+        log(f"[Tool parameters: {json.dumps(tool_input)}]", timestamp_mode, flush=True)
+
+        # Add the complete toolUse block to the assistant's message
+        self.message_builder.add_tool_use(block, tool_input)
+
+        # Execute the fs_write tool
+        if block.name == "fs_write":
+            if writer is not None and writer.commit(tool_input):
+                path = tool_input["path"]
+                log(f"[Tool Result: File created at {path} (streamed during generation)]")
+                tool_success = True
+            else:
+                tool_success = execute_fs_write(tool_input, timestamp_mode)
+
+            tool_messages = self.tool_result_messages(block, tool_input, tool_success)
+
+            # Call the API again with the tool result
+            if self.defer_continuation:
+                self.pending_continuations.append(tool_messages)
+            else:
+                self.continue_with_tool_result(tool_messages)
+
+    def on_message_stop(self, stop_reason, event):
+        log(f"[Message stopped. Reason: {stop_reason}]")
+
+    def rollback_speculative_write(self):
+        """
+        Discard the temporary file of a speculative write whose toolUse block never
+        stopped, e.g. because the stream failed mid-block.
+        """
+        writer, self.speculative_writer = self.speculative_writer, None
+        if writer is not None:
+            writer.rollback()
+
+    def tool_result_messages(self, block, tool_input, tool_success):
+        """
+        Build the conversation that sends an fs_write result back to the model.
+
+        Args:
+            block (ToolUseBlock): The completed toolUse block
+            tool_input (dict): The fs_write parameters
+            tool_success (bool): Whether the tool call succeeded
+
+        Returns:
+            list: The conversation up to and including the tool result
+        """
+        # Create tool result message based on success or failure
+        if tool_success:
+            result_text = (
+                f"Tool execution completed successfully for {tool_input['command']} operation on "
+                f"{tool_input['path']}"
+            )
+        else:
+            result_text = (
+                f"Tool execution failed for {tool_input['command']} operation on "
+                f"{tool_input['path']}"
+            )
+
+        # Send tool result back to the model
+        tool_result_message = {
+            "role": "user",
+            "content": [
+                {
+                    "toolResult": {
+                        "toolUseId": block.tool_use_id,
+                        "content": [{"text": result_text}],
+                    }
+                }
+            ],
+        }
+
+        # Create a complete messages array with the assistant's response
+        return [
+            {"role": "user", "content": [{"text": self.prompt}]},
+            self.message_builder.message,
+            tool_result_message,
+        ]
+
+    def continue_with_tool_result(self, tool_messages):
+        """
+        Send the tool result back to the model and stream its response.
+
+        Args:
+            tool_messages (list): The conversation up to and including the tool result
+        """
+        log(f"[Sending tool result back to the model...]", self.timestamp_mode)
+        try:
+            continue_response = self.bedrock_runtime.converse_stream(
+                **{**self.api_params, "messages": tool_messages}
+            )
+
+            # Process the continued response
+            ConverseStreamProcessor(
+                ContinuationStreamHandler(self), timeline=self.timeline
+            ).process(continue_response.get("stream"))
+        except ClientError as e:
+            log(f"\nError invoking Bedrock: {e}")
+            # Continue with the response we have so far
+
+    async def continue_with_tool_result_async(self, tool_messages):
+        """
+        Send the tool result back to the model on an AsyncBedrockRuntimeClient.
+
+        Args:
+            tool_messages (list): The conversation up to and including the tool result
+        """
+        log(f"[Sending tool result back to the model...]", self.timestamp_mode)
+        try:
+            continue_response = await self.bedrock_runtime.converse_stream(
+                **{**self.api_params, "messages": tool_messages}
+            )
+            await ConverseStreamProcessor(
+                ContinuationStreamHandler(self), timeline=self.timeline
+            ).process_async(continue_response.get("stream"))
+        except ClientError as e:
+            log(f"\nError invoking Bedrock: {e}")
+
+
+class ContinuationStreamHandler(StreamHandler):
+    """
+    Stream hooks for the response that follows a tool result.
+    """
+
+    def __init__(self, parent):
+        """
+        Args:
+            parent (StreamHandler): The handler of the turn that called the tool; it provides
+                `timestamp_mode`, `message_builder` and optionally `log_format`
+        """
+        self.parent = parent
+        self.text_format = getattr(parent, "log_format", PLAIN_LOG_FORMAT).text
+
+    def on_text_delta(self, block, text):
+        log(self.text_format.format(text=text), self.parent.timestamp_mode, flush=True)
+        self.parent.message_builder.append_response(text)
+
+
+def create_api_params(prompt, model_id):
+    """
+    Build the converse_stream parameters of the initial request, with the fs_write tool.
+
+    Args:
+        prompt (str): The user prompt to send to the model
+        model_id (str): The model ID to use
+
+    Returns:
+        dict: The converse_stream parameters
+    """
+    # Define the input schema for the fs_write tool
+    inputSchema = {
+        "type": "object",
+        "properties": {
+            "command": {
+                "type": "string",
+                "enum": ["create", "str_replace", "insert", "append"],
+                "description": (
+                    "The commands to run. Allowed options are: `create`, `str_replace`, `insert`, "
+                    "`append`."
+                ),
+            },
+            "path": {
+                "type": "string",
+                "description": (
+                    "Absolute path to file or directory, e.g. `/repo/file.py` or `/repo`."
+                ),
+            },
+            "file_text": {
+                "type": "string",
+                "description": (
+                    "Required parameter of `create` command, with the content of the file to be "
+                    "created."
+                ),
+            },
+            "old_str": {
+                "type": "string",
+                "description": (
+                    "Required parameter of `str_replace` command containing the string in `path` "
+                    "to replace."
+                ),
+            },
+            "new_str": {
+                "type": "string",
+                "description": (
+                    "Required parameter of `str_replace` command containing the new string. "
+                    "Required parameter of `insert` command containing the string to insert. "
+                    "Required parameter of `append` command containing the content to append to "
+                    "the file."
+                ),
+            },
+            "insert_line": {
+                "type": "integer",
+                "description": (
+                    "Required parameter of `insert` command. The `new_str` will be inserted AFTER "
+                    "the line `insert_line` of `path`."
+                ),
+            },
+        },
+        "required": ["command", "path"],
+    }
+    # Define the fsWrite tool schema
+    fs_write_tool = {
+        "toolSpec": {
+            "name": "fs_write",
+            "description": (
+                "A tool for creating and editing files\n"
+                " * The `create` command will override the file at `path` if it already exists as "
+                "a file, and otherwise create a new file\n"
+                " * The `append` command will add content to the end of an existing file, "
+                "automatically adding a newline if the file doesn't end with one. The file must "
+                "exist.\n"
+                " Notes for using the `str_replace` command:\n"
+                " * The `old_str` parameter should match EXACTLY one or more consecutive lines "
+                "from the original file. Be mindful of whitespaces!\n"
+                " * If the `old_str` parameter is not unique in the file, the replacement will "
+                "not be performed. Make sure to include enough context in `old_str` to make it "
+                "unique\n"
+                " * The `new_str` parameter should contain the edited lines that should replace "
+                "the `old_str`."
+            ),
+            "inputSchema": {"json": inputSchema},
+        }
+    }
+
+    # Prepare request body
+    messages = [{"role": "user", "content": [{"text": prompt}]}]
+
+    # Prepare API call parameters
+    return {
+        "modelId": model_id,
+        "messages": messages,
+        "toolConfig": {"tools": [fs_write_tool]},
+    }
+
+
+def invoke_bedrock_converse_stream(
+    prompt,
+    model_id,
+    model_name,
+    region_name="us-east-1",
+    request_params=create_api_params,
+    log_format=PLAIN_LOG_FORMAT,
+    timestamp_mode=False,
+    speculative_writes=False,
+    endpoint_url=None,
+    recorder=None,
+    stall_threshold=DEFAULT_STALL_THRESHOLD,
+    handler_class=None,
+):
+    """
+    Invokes the Bedrock converseStream API with fs_write tool use support.
+
+    Args:
+        prompt (str): The user prompt to send to the model
+        model_id (str): The model ID to use
+        model_name (str): Name of the model in the output, e.g. "Claude"
+        region_name (str): AWS region of the Bedrock Runtime client
+        request_params (callable): Builds the converse_stream parameters from the prompt and the
+            model ID, e.g. create_api_params plus model-specific fields
+        log_format (StreamLogFormat): How the deltas are logged
+        timestamp_mode (bool): Whether to print timestamps for each event
+        speculative_writes (bool): Whether to stream `create` file_text to disk while it is
+            generated
+        endpoint_url (str): Optional endpoint override, e.g. a local mock_bedrock_server.py
+        recorder (StreamRecorder): Optional recorder for the raw events of every stream
+        stall_threshold (float): Minimum gap in seconds between deltas that is reported as a stall
+        handler_class (type): FsWriteStreamHandler subclass that handles the stream, e.g. to
+            take tool calls from the text instead (default: FsWriteStreamHandler)
+
+    Returns:
+        str: The full response text
+    """
+    handler_class = handler_class or FsWriteStreamHandler
+    # Get the shared, pooled Bedrock Runtime client
+    bedrock_runtime = get_bedrock_runtime_client(region_name=region_name, endpoint_url=endpoint_url)
+    if recorder is not None:
+        bedrock_runtime = recorder.wrap_client(bedrock_runtime)
+    api_params = request_params(prompt, model_id)
+
+    try:
+        # Call the converseStream API
+        response = bedrock_runtime.converse_stream(**api_params)
+
+        # Process the streaming response
+        print(f"Streaming response from {model_name} ({model_id}):")
+        print("-" * 50)
+
+        handler = handler_class(
+            bedrock_runtime,
+            api_params,
+            prompt,
+            timestamp_mode,
+            speculative_writes,
+            log_format=log_format,
+        )
+        processor = ConverseStreamProcessor(
+            handler.message_builder, handler, timeline=handler.timeline
+        )
+        try:
+            processor.process(response.get("stream"))
+        finally:
+            handler.rollback_speculative_write()
+
+        print("\n" + "-" * 50)
+        print(format_stall_report(handler.timeline, stall_threshold))
+        return handler.full_response
+
+    except ClientError as e:
+        print(f"Error invoking Bedrock: {e}")
+        return None
+
+
+async def invoke_bedrock_converse_stream_async(
+    prompt,
+    model_id,
+    model_name,
+    region_name="us-east-1",
+    request_params=create_api_params,
+    log_format=PLAIN_LOG_FORMAT,
+    timestamp_mode=False,
+    speculative_writes=False,
+    endpoint_url=None,
+    recorder=None,
+    stall_threshold=DEFAULT_STALL_THRESHOLD,
+    handler_class=None,
+):
+    """
+    Invokes the Bedrock converseStream API with fs_write tool use support on the asyncio path.
+
+    Behaves like invoke_bedrock_converse_stream, except that tool results are
+    sent back to the model after the first stream has been read to the end.
+    Takes the same arguments.
+
+    Returns:
+        str: The full response text
+    """
+    handler_class = handler_class or FsWriteStreamHandler
+    bedrock_runtime = AsyncBedrockRuntimeClient(region_name=region_name, endpoint_url=endpoint_url)
+    if recorder is not None:
+        bedrock_runtime = recorder.wrap_client(bedrock_runtime)
+    api_params = request_params(prompt, model_id)
+
+    try:
+        # Call the converseStream API
+        response = await bedrock_runtime.converse_stream(**api_params)
+
+        # Process the streaming response
+        print(f"Streaming response from {model_name} ({model_id}):")
+        print("-" * 50)
+
+        handler = handler_class(
+            bedrock_runtime,
+            api_params,
+            prompt,
+            timestamp_mode,
+            speculative_writes,
+            defer_continuation=True,
+            log_format=log_format,
+        )
+        processor = ConverseStreamProcessor(
+            handler.message_builder, handler, timeline=handler.timeline
+        )
+        try:
+            await processor.process_async(response.get("stream"))
+        finally:
+            handler.rollback_speculative_write()
+        for tool_messages in handler.pending_continuations:
+            await handler.continue_with_tool_result_async(tool_messages)
+
+        print("\n" + "-" * 50)
+        print(format_stall_report(handler.timeline, stall_threshold))
+        return handler.full_response
+
+    except ClientError as e:
+        print(f"Error invoking Bedrock: {e}")
+        return None
+    finally:
+        await bedrock_runtime.close()
+
+
+def execute_fs_write(parameters, timestamp_mode=False):
+    """
+    Execute the fs_write tool functionality.
+
+    Args:
+        parameters (dict): The parameters for the fs_write tool
+        timestamp_mode (bool): Whether to print timestamps for each message
+    """
+    command = parameters.get("command")
+    path = parameters.get("path")
+
+    if not command or not path:
+        log(f"[Tool Error: Missing required parameters]")
+        return False
+
+    try:
+        # Create directory if it doesn't exist
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if command == "create":
+            file_text = parameters.get("file_text", "")
+            with open(path, "w") as f:
+                f.write(file_text)
+            log(f"[Tool Result: File created at {path}]")
+            return True
+
+        elif command == "append":
+            new_str = parameters.get("new_str", "")
+            if not os.path.exists(path):
+                log(f"[Tool Error: File {path} does not exist for append operation]")
+                return False
+
+            with open(path, "a") as f:
+                # Add newline if file doesn't end with one
+                if os.path.getsize(path) > 0:
+                    with open(path, "r") as check_file:
+                        check_file.seek(max(0, os.path.getsize(path) - 1))
+                        last_char = check_file.read(1)
+                        if last_char != "\n":
+                            f.write("\n")
+                f.write(new_str)
+            log(f"[Tool Result: Content appended to {path}]")
+            return True
+
+        elif command == "str_replace":
+            old_str = parameters.get("old_str")
+            new_str = parameters.get("new_str")
+
+            if not old_str or new_str is None:
+                log(f"[Tool Error: Missing old_str or new_str for str_replace operation]")
+                return False
+
+            if not os.path.exists(path):
+                log(f"[Tool Error: File {path} does not exist for str_replace operation]")
+                return False
+
+            with open(path, "r") as f:
+                content = f.read()
+
+            if old_str not in content:
+                log(f"[Tool Error: old_str not found in {path}]")
+                return False
+
+            new_content = content.replace(old_str, new_str)
+            with open(path, "w") as f:
+                f.write(new_content)
+            log(f"[Tool Result: String replaced in {path}]")
+            return True
+
+        elif command == "insert":
+            new_str = parameters.get("new_str")
+            insert_line = parameters.get("insert_line")
+
+            if new_str is None or insert_line is None:
+                log(f"[Tool Error: Missing new_str or insert_line for insert operation]")
+                return False
+
+            if not os.path.exists(path):
+                log(f"[Tool Error: File {path} does not exist for insert operation]")
+                return False
+
+            with open(path, "r") as f:
+                lines = f.readlines()
+
+            if insert_line < 0 or insert_line > len(lines):
+                log(f"[Tool Error: insert_line {insert_line} out of range for {path}]")
+                return False
+
+            lines.insert(insert_line, new_str + "\n")
+            with open(path, "w") as f:
+                f.writelines(lines)
+            log(f"[Tool Result: Content inserted at line {insert_line} in {path}]")
+            return True
+
+        else:
+            log(f"[Tool Error: Unknown command {command}]")
+            return False
+
+    except Exception as e:
+        log(f"[Tool Error: {str(e)}]")
+        return False
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the streaming Anthropic Messages API.
+
+`MockAnthropicServer` answers `POST /v1/messages` (with `"stream": true`)
+with a server-sent event stream: message_start, ping, content_block_start,
+text_delta / input_json_delta deltas, content_block_stop, message_delta and
+message_stop. The cadence (characters per delta, delay between deltas, a
+stall before the tool input and the time to response headers) is
+configurable, so SSE parsing overhead and client throughput can be measured
+at thousands of events per second without an API key.
+
+Point the clients at it with a base URL override:
+
+    with MockAnthropicServer(default_script()) as server:
+        invoke_anthropic_messages_stream(prompt, model_id, base_url=server.base_url)
+
+or `export ANTHROPIC_BASE_URL=http://127.0.0.1:8766` for the scripts and
+benchmark. The server does not check the API key.
+
+Script files use the format of mock_bedrock_server.py, with Messages API
+events (each with its `type`) in place of converseStream events; an
+`{"type": "error", ...}` event can be used to inject a mid-stream error.
+"""
+
+import argparse
+import json
+import uuid
+
+from mock_bedrock_server import (
+    DEFAULT_HOST,
+    DEFAULT_OUTPUT_PATH,
+    MockStreamingServer,
+    ScriptedEvent,
+    ScriptedStreamHandler,
+    chunk_text,
+    filler_text,
+    load_script,
+)
+
+DEFAULT_PORT = 8766
+MODEL_ID = "claude-mock"
+
+SSE_CONTENT_TYPE = "text/event-stream"
+
+
+def encode_sse(event):
+    """
+    Encode a Messages API event as a server-sent event.
+
+    Args:
+        event (dict): The event, with its `type`
+
+    Returns:
+        bytes: The `event:` and `data:` lines, terminated by a blank line
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+def synthetic_response(
+    text="", tool_input=None, tool_name="fs_write", chunk_size=20, delay=0.0, tool_stall=0.0
+):
+    """
+    Build a scripted Messages API stream.
+
+    Args:
+        text (str): Text content, streamed as `text_delta` deltas
+        tool_input (dict): Input of a trailing tool_use block, streamed as `input_json_delta`
+            fragments (None for a plain end_turn response)
+        tool_name (str): Name of the tool
+        chunk_size (int): Characters per delta
+        delay (float): Seconds between deltas
+        tool_stall (float): Extra seconds before the first tool input delta
+
+    Returns:
+        list: ScriptedEvent tuples
+    """
+    events = [
+        ScriptedEvent(
+            0.0,
+            {
+                "type": "message_start",
+                "message": {
+                    "id": f"msg_{uuid.uuid4().hex[:24]}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": MODEL_ID,
+                    "content": [],
+                    "stop_reason": None,
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": 0, "output_tokens": 0},
+                },
+            },
+        ),
+        ScriptedEvent(0.0, {"type": "ping"}),
+    ]
+    index = 0
+    if text:
+        events.append(
+            ScriptedEvent(
+                0.0,
+                {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {"type": "text", "text": ""},
+                },
+            )
+        )
+        for chunk in chunk_text(text, chunk_size):
+            events.append(
+                ScriptedEvent(
+                    delay,
+                    {
+                        "type": "content_block_delta",
+                        "index": index,
+                        "delta": {"type": "text_delta", "text": chunk},
+                    },
+                )
+            )
+        events.append(ScriptedEvent(0.0, {"type": "content_block_stop", "index": index}))
+        index += 1
+
+    if tool_input is not None:
+        events.append(
+            ScriptedEvent(
+                delay,
+                {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {
+                        "type": "tool_use",
+                        "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                        "name": tool_name,
+                        "input": {},
+                    },
+                },
+            )
+        )
+        for position, fragment in enumerate(chunk_text(json.dumps(tool_input), chunk_size)):
+            events.append(
+                ScriptedEvent(
+                    delay + (tool_stall if position == 0 else 0.0),
+                    {
+                        "type": "content_block_delta",
+                        "index": index,
+                        "delta": {"type": "input_json_delta", "partial_json": fragment},
+                    },
+                )
+            )
+        events.append(ScriptedEvent(0.0, {"type": "content_block_stop", "index": index}))
+        stop_reason = "tool_use"
+    else:
+        stop_reason = "end_turn"
+
+    events.append(
+        ScriptedEvent(
+            0.0,
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                "usage": {"output_tokens": 0},
+            },
+        )
+    )
+    events.append(ScriptedEvent(0.0, {"type": "message_stop"}))
+    return events
+
+
+def default_script(
+    text_chars=200,
+    file_chars=1000,
+    chunk_size=20,
+    delay=0.01,
+    tool_stall=0.0,
+    path=DEFAULT_OUTPUT_PATH,
+):
+    """
+    Build the default two-turn script: text plus an fs_write `create` call, then a closing text.
+
+    Args:
+        text_chars (int): Characters of text before the tool call
+        file_chars (int): Characters of `file_text` in the tool input
+        chunk_size (int): Characters per delta
+        delay (float): Seconds between deltas
+        tool_stall (float): Extra seconds before the first tool input delta
+        path (str): The `path` of the fs_write call
+
+    Returns:
+        list: One list of ScriptedEvent tuples per turn
+    """
+    tool_input = {"command": "create", "path": path, "file_text": filler_text(file_chars)}
+    return [
+        synthetic_response(
+            filler_text(text_chars),
+            tool_input,
+            chunk_size=chunk_size,
+            delay=delay,
+            tool_stall=tool_stall,
+        ),
+        synthetic_response("The file has been written.", chunk_size=chunk_size, delay=delay),
+    ]
+
+
+class _MessagesHandler(ScriptedStreamHandler):
+
+    def do_HEAD(self):
+        # Connection pre-warming (HTTP/2 sessions send a HEAD to the base URL)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/v1/messages":
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send_error(404, "not_found_error", f"Unsupported path: {self.path}")
+            return
+        request = self.read_json_body()
+        if request is None:
+            return
+        if not request.get("stream"):
+            self._send_error(400, "invalid_request_error", "Only streaming requests are supported")
+            return
+        self.stream_script(
+            request,
+            SSE_CONTENT_TYPE,
+            {
+                "request-id": f"req_{uuid.uuid4().hex[:24]}",
+                "Cache-Control": "no-cache",
+            },
+        )
+
+    def _send_error(self, status, error_type, message):
+        self.send_json(
+            status,
+            {"type": "error", "error": {"type": error_type, "message": message}},
+            {"request-id": f"req_{uuid.uuid4().hex[:24]}"},
+        )
+
+
+class MockAnthropicServer(MockStreamingServer):
+    """
+    A local Messages API server running in a background thread.
+    """
+
+    def __init__(self, script=None, host=DEFAULT_HOST, port=0, latency=0.0):
+        """
+        Args:
+            script (list): One list of ScriptedEvent tuples per turn (default: `default_script()`)
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free port)
+            latency (float): Seconds to wait before sending the response headers
+        """
+        script = script if script is not None else default_script()
+        super().__init__(script, encode_sse, _MessagesHandler, host, port, latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the streaming Anthropic Messages API"
+    )
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--script", help="JSON script of responses to serve instead of the synthetic conversation"
+    )
+    parser.add_argument(
+        "--text-chars", type=int, default=200, help="Characters of text before the tool call"
+    )
+    parser.add_argument(
+        "--file-chars", type=int, default=1000, help="Characters of file_text in the tool call"
+    )
+    parser.add_argument("--chunk-size", type=int, default=20, help="Characters per delta")
+    parser.add_argument("--delay", type=float, default=0.01, help="Seconds between deltas")
+    parser.add_argument(
+        "--tool-stall",
+        type=float,
+        default=0.0,
+        help="Extra seconds before the first tool input delta",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds before the response headers are sent"
+    )
+    args = parser.parse_args()
+
+    if args.script:
+        script = load_script(args.script)
+    else:
+        script = default_script(
+            args.text_chars, args.file_chars, args.chunk_size, args.delay, args.tool_stall
+        )
+
+    server = MockAnthropicServer(script, args.host, args.port, args.latency)
+    print(f"Serving the Messages API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
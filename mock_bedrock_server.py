@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Bedrock Runtime converseStream API.
+
+`MockBedrockServer` answers `POST /model/{modelId}/converse-stream` with the
+same wire format as Bedrock: a chunked HTTP/1.1 response whose body is a
+sequence of AWS event-stream messages (binary prelude and headers, JSON
+payload, CRC32 checksums). The events come from a script, either a synthetic
+text + fs_write tool use conversation or a JSON file, and are sent with
+scripted delays, so client throughput, parser cost and concurrency can be
+measured offline without network or service time.
+
+Point any client at it through `endpoint_url`:
+
+    with MockBedrockServer(default_script()) as server:
+        client = get_bedrock_runtime_client(endpoint_url=server.endpoint_url)
+
+Requests are still signed by botocore, so credentials must be configured;
+any value works (e.g. AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test).
+
+Script files are JSON of the form
+
+    {"responses": [[{"delay": 0.01, "event": {"messageStart": {"role": "assistant"}}}, ...], ...]}
+
+Each response is a list of events, optionally with the delay in seconds
+before the event is sent. An event whose type is one of the converseStream
+exception types (e.g. `{"throttlingException": {"message": "..."}}`) is sent
+as an event-stream exception. The response for a request is chosen by the
+number of assistant messages in its conversation, so a multi-turn
+conversation walks through the responses in order (the last one repeats).
+
+`MockStreamingServer` and `ScriptedStreamHandler` hold the API-independent
+part (script selection, chunked streaming with delays) and are shared with
+mock_anthropic_server.py.
+"""
+
+import argparse
+import binascii
+import json
+import struct
+import threading
+import time
+import uuid
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_OUTPUT_PATH = "/tmp/mock-bedrock-output.txt"
+
+EVENT_STREAM_CONTENT_TYPE = "application/vnd.amazon.eventstream"
+EXCEPTION_EVENT_TYPES = frozenset(
+    [
+        "internalServerException",
+        "modelStreamErrorException",
+        "validationException",
+        "throttlingException",
+        "serviceUnavailableException",
+    ]
+)
+
+_STRING_HEADER_TYPE = 7
+_LOREM_IPSUM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud "
+    "exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. "
+)
+
+# One scripted event: seconds to wait before sending it, and the event itself
+ScriptedEvent = namedtuple("ScriptedEvent", ["delay", "event"])
+
+
+def _encode_header(name, value):
+    name = name.encode("utf-8")
+    value = value.encode("utf-8")
+    return (
+        struct.pack("!B", len(name))
+        + name
+        + struct.pack("!BH", _STRING_HEADER_TYPE, len(value))
+        + value
+    )
+
+
+def encode_message(headers, payload):
+    """
+    Encode one AWS event-stream message.
+
+    Args:
+        headers (dict): String header names and values
+        payload (bytes): The message payload
+
+    Returns:
+        bytes: The framed message, including prelude and message CRCs
+    """
+    encoded_headers = b"".join(_encode_header(name, value) for name, value in headers.items())
+    total_length = 12 + len(encoded_headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(encoded_headers))
+    prelude += struct.pack("!I", binascii.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + encoded_headers + payload
+    return message + struct.pack("!I", binascii.crc32(message) & 0xFFFFFFFF)
+
+
+def encode_event(event):
+    """
+    Encode a converseStream event (or exception) as an event-stream message.
+
+    Args:
+        event (dict): An event with a single top-level key, e.g. `{"messageStop": {...}}`
+
+    Returns:
+        bytes: The framed message
+    """
+    ((event_type, body),) = event.items()
+    payload = json.dumps(body).encode("utf-8")
+    if event_type in EXCEPTION_EVENT_TYPES:
+        headers = {
+            ":exception-type": event_type,
+            ":content-type": "application/json",
+            ":message-type": "exception",
+        }
+    else:
+        headers = {
+            ":event-type": event_type,
+            ":content-type": "application/json",
+            ":message-type": "event",
+        }
+    return encode_message(headers, payload)
+
+
+def chunk_text(text, size):
+    """
+    Split text into deltas of `size` characters.
+
+    Args:
+        text (str): The text to split
+        size (int): Characters per chunk
+
+    Returns:
+        list: The chunks (a single empty chunk for empty text)
+    """
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+def filler_text(chars):
+    """
+    Return `chars` characters of lorem ipsum.
+
+    Args:
+        chars (int): Number of characters
+
+    Returns:
+        str: The filler text
+    """
+    repeats = chars // len(_LOREM_IPSUM) + 1
+    return (_LOREM_IPSUM * repeats)[:chars]
+
+
+def synthetic_response(
+    text="", tool_input=None, tool_name="fs_write", chunk_size=20, delay=0.0, tool_stall=0.0
+):
+    """
+    Build a scripted converseStream response.
+
+    Args:
+        text (str): Text content, streamed as `text` deltas
+        tool_input (dict): Input of a trailing tool use block, streamed as JSON fragments
+            (None for a plain end_turn response)
+        tool_name (str): Name of the tool
+        chunk_size (int): Characters per delta
+        delay (float): Seconds between deltas
+        tool_stall (float): Extra seconds before the first tool input delta
+
+    Returns:
+        list: ScriptedEvent tuples
+    """
+    events = [ScriptedEvent(0.0, {"messageStart": {"role": "assistant"}})]
+    index = 0
+    if text:
+        for chunk in chunk_text(text, chunk_size):
+            events.append(
+                ScriptedEvent(
+                    delay,
+                    {"contentBlockDelta": {"delta": {"text": chunk}, "contentBlockIndex": index}},
+                )
+            )
+        events.append(ScriptedEvent(0.0, {"contentBlockStop": {"contentBlockIndex": index}}))
+        index += 1
+
+    if tool_input is not None:
+        events.append(
+            ScriptedEvent(
+                delay,
+                {
+                    "contentBlockStart": {
+                        "start": {
+                            "toolUse": {
+                                "toolUseId": f"tooluse_{uuid.uuid4().hex[:22]}",
+                                "name": tool_name,
+                            }
+                        },
+                        "contentBlockIndex": index,
+                    }
+                },
+            )
+        )
+        for position, fragment in enumerate(chunk_text(json.dumps(tool_input), chunk_size)):
+            events.append(
+                ScriptedEvent(
+                    delay + (tool_stall if position == 0 else 0.0),
+                    {
+                        "contentBlockDelta": {
+                            "delta": {"toolUse": {"input": fragment}},
+                            "contentBlockIndex": index,
+                        }
+                    },
+                )
+            )
+        events.append(ScriptedEvent(0.0, {"contentBlockStop": {"contentBlockIndex": index}}))
+        stop_reason = "tool_use"
+    else:
+        stop_reason = "end_turn"
+
+    events.append(ScriptedEvent(0.0, {"messageStop": {"stopReason": stop_reason}}))
+    events.append(
+        ScriptedEvent(
+            0.0,
+            {
+                "metadata": {
+                    "usage": {"inputTokens": 0, "outputTokens": 0, "totalTokens": 0},
+                    "metrics": {"latencyMs": 0},
+                }
+            },
+        )
+    )
+    return events
+
+
+def default_script(
+    text_chars=200,
+    file_chars=1000,
+    chunk_size=20,
+    delay=0.01,
+    tool_stall=0.0,
+    path=DEFAULT_OUTPUT_PATH,
+):
+    """
+    Build the default two-turn script: text plus an fs_write `create` call, then a closing text.
+
+    Args:
+        text_chars (int): Characters of text before the tool call
+        file_chars (int): Characters of `file_text` in the tool input
+        chunk_size (int): Characters per delta
+        delay (float): Seconds between deltas
+        tool_stall (float): Extra seconds before the first tool input delta
+        path (str): The `path` of the fs_write call
+
+    Returns:
+        list: One list of ScriptedEvent tuples per turn
+    """
+    tool_input = {"command": "create", "path": path, "file_text": filler_text(file_chars)}
+    return [
+        synthetic_response(
+            filler_text(text_chars),
+            tool_input,
+            chunk_size=chunk_size,
+            delay=delay,
+            tool_stall=tool_stall,
+        ),
+        synthetic_response("The file has been written.", chunk_size=chunk_size, delay=delay),
+    ]
+
+
+def load_script(path):
+    """
+    Load a script file (see the module docstring for the format).
+
+    The same format is used by mock_anthropic_server.py, with Messages API
+    events in place of converseStream events.
+
+    Args:
+        path (str): Path of the JSON script file
+
+    Returns:
+        list: One list of ScriptedEvent tuples per turn
+    """
+    with open(path) as f:
+        data = json.load(f)
+    responses = data["responses"] if isinstance(data, dict) else data
+    script = []
+    for response in responses:
+        events = []
+        for item in response:
+            if "event" in item:
+                events.append(ScriptedEvent(float(item.get("delay", 0.0)), item["event"]))
+            else:
+                events.append(ScriptedEvent(0.0, item))
+        script.append(events)
+    return script
+
+
+class ScriptedStreamHandler(BaseHTTPRequestHandler):
+    """
+    Base request handler that streams pre-encoded scripted responses.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json_body(self):
+        """
+        Read the JSON request body, answering 400 if it is invalid.
+
+        Returns:
+            dict: The request, or None if an error response was sent
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            self.send_json(400, {"message": "Request body is not valid JSON"})
+            return None
+
+    def stream_script(self, request, content_type, headers):
+        """
+        Stream the scripted response for a request as a chunked response.
+
+        Args:
+            request (dict): The parsed request; its assistant turns select the response
+            content_type (str): The response content type
+            headers (dict): Additional response headers
+        """
+        server = self.server
+        turn = sum(
+            1 for message in request.get("messages", []) if message.get("role") == "assistant"
+        )
+        response = server.encoded_script[min(turn, len(server.encoded_script) - 1)]
+        with server.counter_lock:
+            server.request_count += 1
+
+        if server.latency:
+            time.sleep(server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            for delay, message in response:
+                if delay:
+                    time.sleep(delay)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(message), message))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early
+            self.close_connection = True
+
+    def send_json(self, status, payload, headers=None):
+        """
+        Send a complete JSON response.
+
+        Args:
+            status (int): The HTTP status code
+            payload (dict): The response body
+            headers (dict): Additional response headers
+        """
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ConverseStreamHandler(ScriptedStreamHandler):
+
+    def do_POST(self):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "model" or parts[2] != "converse-stream":
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send_error(404, "UnknownOperationException", f"Unsupported path: {self.path}")
+            return
+        request = self.read_json_body()
+        if request is None:
+            return
+        self.stream_script(
+            request, EVENT_STREAM_CONTENT_TYPE, {"x-amzn-RequestId": str(uuid.uuid4())}
+        )
+
+    def _send_error(self, status, error_type, message):
+        self.send_json(
+            status,
+            {"message": message},
+            {
+                "x-amzn-RequestId": str(uuid.uuid4()),
+                "x-amzn-ErrorType": error_type,
+            },
+        )
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockStreamingServer:
+    """
+    A local server streaming scripted responses, running in a background thread.
+    """
+
+    def __init__(self, script, encode, handler_class, host=DEFAULT_HOST, port=0, latency=0.0):
+        """
+        Args:
+            script (list): One list of ScriptedEvent tuples per turn
+            encode (callable): Encodes one event into its wire format
+            handler_class (type): The ScriptedStreamHandler subclass serving the API
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free port)
+            latency (float): Seconds to wait before sending the response headers
+        """
+        if not script:
+            raise ValueError("The script needs at least one response")
+        self._server = _Server((host, port), handler_class)
+        # Events are encoded once, up front, so the server adds no per-event encoding cost
+        self._server.encoded_script = [
+            [(delay, encode(event)) for delay, event in response] for response in script
+        ]
+        self._server.latency = latency
+        self._server.request_count = 0
+        self._server.counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """str: The URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        """int: Number of streaming requests served."""
+        return self._server.request_count
+
+    def start(self):
+        """
+        Start serving in a daemon thread.
+
+        Returns:
+            MockStreamingServer: self, for chaining
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class MockBedrockServer(MockStreamingServer):
+    """
+    A local converseStream server running in a background thread.
+    """
+
+    def __init__(self, script=None, host=DEFAULT_HOST, port=0, latency=0.0):
+        """
+        Args:
+            script (list): One list of ScriptedEvent tuples per turn (default: `default_script()`)
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free port)
+            latency (float): Seconds to wait before sending the response headers
+        """
+        script = script if script is not None else default_script()
+        super().__init__(script, encode_event, _ConverseStreamHandler, host, port, latency)
+
+    @property
+    def endpoint_url(self):
+        """str: The URL to pass as `endpoint_url` to the clients."""
+        return self.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Bedrock converseStream API"
+    )
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--script", help="JSON script of responses to serve instead of the synthetic conversation"
+    )
+    parser.add_argument(
+        "--text-chars", type=int, default=200, help="Characters of text before the tool call"
+    )
+    parser.add_argument(
+        "--file-chars", type=int, default=1000, help="Characters of file_text in the tool call"
+    )
+    parser.add_argument("--chunk-size", type=int, default=20, help="Characters per delta")
+    parser.add_argument("--delay", type=float, default=0.01, help="Seconds between deltas")
+    parser.add_argument(
+        "--tool-stall",
+        type=float,
+        default=0.0,
+        help="Extra seconds before the first tool input delta",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds before the response headers are sent"
+    )
+    args = parser.parse_args()
+
+    if args.script:
+        script = load_script(args.script)
+    else:
+        script = default_script(
+            args.text_chars, args.file_chars, args.chunk_size, args.delay, args.tool_stall
+        )
+
+    server = MockBedrockServer(script, args.host, args.port, args.latency)
+    print(f"Serving converseStream on {server.endpoint_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for tool input JSON that arrives as string fragments.
+
+Both converseStream `toolUse` deltas and Messages API `input_json_delta`
+events carry the tool input as arbitrary fragments of one JSON object.
+`StreamingJsonObjectParser` consumes those fragments as they arrive and
+exposes every top-level field as soon as its value closes, so that for
+example `path` is known long before a large `file_text` has finished
+streaming. Top-level string values are also reported chunk by chunk.
+
+String contents are scanned with a compiled regex that jumps straight to the
+next quote or backslash, and nested values are captured raw and decoded once
+when they close, so the work per fragment is linear in its length.
+"""
+
+import json
+import re
+from collections import namedtuple
+
+# Event emitted by StreamingJsonObjectParser.feed
+#   kind:  "string_chunk", "field" or "complete"
+#   key:   the top-level field name (None for "complete")
+#   value: the decoded string chunk, the field value, or the dict of all fields
+JsonFieldEvent = namedtuple("JsonFieldEvent", ["kind", "key", "value"])
+
+_WHITESPACE = " \t\n\r"
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NESTED_SPECIAL = re.compile(r'["\\{}\[\]]')
+_SCALAR_END = re.compile(r"[,}\s]")
+
+_START = 0
+_KEY_OR_END = 1
+_KEY = 2
+_COLON = 3
+_VALUE = 4
+_STRING = 5
+_NESTED = 6
+_SCALAR = 7
+_AFTER_VALUE = 8
+_DONE = 9
+
+
+def _decode_escape(escape):
+    return json.loads(f'"{escape}"')
+
+
+class StreamingJsonObjectParser:
+    """
+    Streaming parser for a single JSON object delivered in fragments.
+
+    `fields` always holds the top-level fields whose values have closed.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self._state = _START
+        self._pending = ""
+        self._parts = []
+        self._key = None
+        self._after_comma = False
+        self._high_surrogate = None
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+        self._consumed = 0
+
+    @property
+    def complete(self):
+        """bool: Whether the closing brace of the object has been parsed."""
+        return self._state == _DONE
+
+    def _error(self, message, data, pos):
+        return json.JSONDecodeError(message, data, pos)
+
+    def feed(self, fragment):
+        """
+        Consume the next fragment of the JSON text.
+
+        Args:
+            fragment (str): The next fragment
+
+        Returns:
+            list: JsonFieldEvent tuples, in order
+
+        Raises:
+            json.JSONDecodeError: If the text can no longer be a valid JSON object
+        """
+        events = []
+        data = self._pending + fragment if self._pending else fragment
+        self._pending = ""
+        pos = 0
+        end = len(data)
+
+        while pos < end:
+            state = self._state
+
+            if state == _STRING or state == _KEY:
+                match = _STRING_SPECIAL.search(data, pos)
+                stop = match.start() if match else end
+                if stop > pos:
+                    self._append_string(data[pos:stop], events)
+                if match is None:
+                    pos = end
+                    break
+                if data[stop] == '"':
+                    pos = stop + 1
+                    self._close_string(events)
+                    continue
+                # Escape sequence; carry it over if it is split across fragments
+                if stop + 1 >= end or (data[stop + 1] == "u" and stop + 6 > end):
+                    self._pending = data[stop:]
+                    break
+                length = 6 if data[stop + 1] == "u" else 2
+                try:
+                    decoded = _decode_escape(data[stop : stop + length])
+                except json.JSONDecodeError:
+                    raise self._error("Invalid escape sequence", data, stop)
+                pos = stop + length
+                self._append_string(decoded, events)
+
+            elif state == _NESTED:
+                pos = self._scan_nested(data, pos, end)
+                if self._depth == 0:
+                    self._finish_value(json.loads("".join(self._parts)), events)
+
+            elif state == _SCALAR:
+                match = _SCALAR_END.search(data, pos)
+                if match is None:
+                    self._parts.append(data[pos:])
+                    pos = end
+                    break
+                self._parts.append(data[pos : match.start()])
+                pos = match.start()
+                try:
+                    value = json.loads("".join(self._parts))
+                except json.JSONDecodeError:
+                    raise self._error("Invalid value", data, pos)
+                self._finish_value(value, events)
+
+            else:
+                char = data[pos]
+                if char in _WHITESPACE:
+                    pos += 1
+                    continue
+
+                if state == _START:
+                    if char != "{":
+                        raise self._error("Expecting '{'", data, pos)
+                    self._state = _KEY_OR_END
+                elif state == _KEY_OR_END:
+                    if char == '"':
+                        self._state = _KEY
+                        self._parts = []
+                    elif char == "}" and not self._after_comma:
+                        self._state = _DONE
+                        events.append(JsonFieldEvent("complete", None, self.fields))
+                    else:
+                        raise self._error("Expecting property name", data, pos)
+                elif state == _COLON:
+                    if char != ":":
+                        raise self._error("Expecting ':' delimiter", data, pos)
+                    self._state = _VALUE
+                elif state == _VALUE:
+                    self._parts = []
+                    if char == '"':
+                        self._state = _STRING
+                    elif char == "{" or char == "[":
+                        self._state = _NESTED
+                        self._depth = 0
+                        self._nested_in_string = False
+                        self._nested_escape = False
+                        continue
+                    else:
+                        self._state = _SCALAR
+                        continue
+                elif state == _AFTER_VALUE:
+                    if char == ",":
+                        self._state = _KEY_OR_END
+                        self._after_comma = True
+                    elif char == "}":
+                        self._state = _DONE
+                        events.append(JsonFieldEvent("complete", None, self.fields))
+                    else:
+                        raise self._error("Expecting ',' delimiter", data, pos)
+                else:
+                    raise self._error("Extra data", data, pos)
+                pos += 1
+
+        self._consumed += len(fragment)
+        return events
+
+    def close(self):
+        """
+        Finish parsing and return the complete object.
+
+        An empty input is treated as an empty object, which is how
+        converseStream reports tools called without parameters.
+
+        Returns:
+            dict: The parsed object
+
+        Raises:
+            json.JSONDecodeError: If the object is incomplete
+        """
+        if self._state == _DONE:
+            return self.fields
+        if self._state == _START and not self._pending:
+            return {}
+        raise json.JSONDecodeError("Incomplete JSON object", self._pending, self._consumed)
+
+    def _append_string(self, text, events):
+        if self._high_surrogate is not None:
+            text = self._high_surrogate + text
+            self._high_surrogate = None
+            if len(text) >= 2 and "\udc00" <= text[1] <= "\udfff":
+                text = text[:2].encode("utf-16", "surrogatepass").decode("utf-16") + text[2:]
+        if len(text) == 1 and "\ud800" <= text <= "\udbff":
+            # Hold a high surrogate until its low surrogate arrives
+            self._high_surrogate = text
+            return
+        self._parts.append(text)
+        if self._state == _STRING:
+            events.append(JsonFieldEvent("string_chunk", self._key, text))
+
+    def _close_string(self, events):
+        if self._high_surrogate is not None:
+            high, self._high_surrogate = self._high_surrogate, None
+            self._parts.append(high)
+            if self._state == _STRING:
+                events.append(JsonFieldEvent("string_chunk", self._key, high))
+        value = "".join(self._parts)
+        self._parts = []
+        if self._state == _KEY:
+            self._key = value
+            self._state = _COLON
+        else:
+            self._finish_value(value, events)
+
+    def _finish_value(self, value, events):
+        self.fields[self._key] = value
+        events.append(JsonFieldEvent("field", self._key, value))
+        self._parts = []
+        self._after_comma = False
+        self._state = _AFTER_VALUE
+
+    def _scan_nested(self, data, pos, end):
+        start = pos
+        if self._nested_escape:
+            self._nested_escape = False
+            pos += 1
+        while pos < end:
+            match = _NESTED_SPECIAL.search(data, pos)
+            if match is None:
+                pos = end
+                break
+            index = match.start()
+            char = data[index]
+            pos = index + 1
+            if self._nested_in_string:
+                if char == "\\":
+                    if pos >= end:
+                        self._nested_escape = True
+                    else:
+                        pos += 1
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char == "{" or char == "[":
+                self._depth += 1
+            elif char == "}" or char == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    break
+        self._parts.append(data[start:pos])
+        return pos
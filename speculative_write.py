@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Speculative execution of fs_write `create` calls while the tool input streams.
+
+Normally the file is only written after contentBlockStop, once the whole tool
+input has been parsed, which adds a serialized write step to the end-to-end
+latency of large `create` calls. `SpeculativeFileWriter` opens a temporary
+file next to the target as soon as `command` and `path` are known and writes
+`file_text` as its chunks arrive. When the block completes the temporary file
+is atomically renamed over the target, or removed if the final input turns
+out to be invalid or different.
+"""
+
+import os
+
+PARTIAL_SUFFIX = ".partial"
+
+
+class SpeculativeFileWriter:
+    """
+    Streams the `file_text` of one fs_write `create` call to disk.
+
+    Feed it the field and string-chunk events of the incremental tool input
+    parser, then call `commit` with the final parsed input, or `rollback`.
+    """
+
+    def __init__(self):
+        self.command = None
+        self.path = None
+        self.temp_path = None
+        self.chars_written = 0
+        self._file = None
+        self._pending = []
+        self._disabled = False
+
+    @property
+    def active(self):
+        """bool: Whether a temporary file is open and receiving file_text."""
+        return self._file is not None
+
+    def on_field(self, name, value):
+        """
+        Record a completed top-level input field.
+
+        Args:
+            name (str): The field name
+            value: The field value
+
+        Returns:
+            bool: True if this field caused the temporary file to be opened
+        """
+        if name == "command":
+            self.command = value
+        elif name == "path":
+            self.path = value
+        else:
+            return False
+        return self._open()
+
+    def on_chunk(self, name, text):
+        """
+        Write (or buffer, until the file can be opened) a chunk of a string field.
+
+        Args:
+            name (str): The field the chunk belongs to
+            text (str): The decoded chunk
+        """
+        if name != "file_text" or self._disabled:
+            return
+        if self._file is None:
+            self._pending.append(text)
+            return
+        try:
+            self._file.write(text)
+            self.chars_written += len(text)
+        except OSError:
+            self.rollback()
+
+    def commit(self, parameters):
+        """
+        Atomically move the streamed file into place.
+
+        Args:
+            parameters (dict): The final, fully parsed tool input
+
+        Returns:
+            bool: True if the file was committed, False if it was rolled back
+                and the tool still has to be executed normally
+        """
+        if (
+            self._file is None
+            or parameters.get("command") != "create"
+            or parameters.get("path") != self.path
+            or len(parameters.get("file_text", "")) != self.chars_written
+        ):
+            self.rollback()
+            return False
+
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self.temp_path, self.path)
+        except OSError:
+            self.rollback()
+            return False
+        self.temp_path = None
+        return True
+
+    def rollback(self):
+        """
+        Discard the temporary file, if any, and stop writing.
+        """
+        self._disabled = True
+        self._pending = []
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        if self.temp_path is not None:
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+            self.temp_path = None
+
+    def _open(self):
+        if self._disabled or self._file is not None:
+            return False
+        if self.command is not None and self.command != "create":
+            # Only `create` is streamed; every other command runs normally
+            self._disabled = True
+            self._pending = []
+            return False
+        if self.command is None or not self.path:
+            return False
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.temp_path = self.path + PARTIAL_SUFFIX
+            self._file = open(self.temp_path, "w")
+            for text in self._pending:
+                self._file.write(text)
+                self.chars_written += len(text)
+        except OSError:
+            self.rollback()
+            return False
+        self._pending = []
+        return True
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Shared incremental processing engine for Bedrock converseStream event streams.
+
+The converseStream scripts used to carry their own copy of the
+`for event in response.get("stream")` dispatch loop. This module turns the
+event stream into typed content-block objects and calls pluggable handler
+hooks for every event, doing O(1) work per delta. The arrival time, gap and
+size of every delta are kept in a DeltaTimeline for stall detection.
+"""
+
+import json
+import time
+
+from delta_timeline import DeltaTimeline
+from partial_json import StreamingJsonObjectParser
+
+
+class ContentBlock:
+    """
+    A single content block of an assistant message, built incrementally.
+
+    Deltas are appended to a chunk list and joined once, when the block stops
+    (or when the content is first read), so long outputs are never copied
+    repeatedly.
+    """
+
+    kind = None
+
+    def __init__(self, index):
+        self.index = index
+        self.start_time = time.time()
+        self.end_time = None
+        self._parts = []
+        self._content = None
+
+    def append(self, chunk):
+        """
+        Append a delta chunk to the block.
+
+        Args:
+            chunk (str): The chunk to append
+        """
+        self._parts.append(chunk)
+        self._content = None
+
+    def close(self):
+        """
+        Mark the block as complete and join its chunks.
+        """
+        self.end_time = time.time()
+        self._join()
+
+    def _join(self):
+        if self._content is None:
+            self._content = "".join(self._parts)
+            self._parts = [self._content] if self._content else []
+        return self._content
+
+    @property
+    def content(self):
+        """str: The accumulated content of the block."""
+        return self._join()
+
+    @property
+    def closed(self):
+        """bool: Whether contentBlockStop has been received for the block."""
+        return self.end_time is not None
+
+    @property
+    def elapsed(self):
+        """float: Seconds between the block start and its stop (or now)."""
+        end_time = self.end_time if self.end_time is not None else time.time()
+        return end_time - self.start_time
+
+
+class TextBlock(ContentBlock):
+    """A text content block."""
+
+    kind = "text"
+
+    @property
+    def text(self):
+        """str: The accumulated text."""
+        return self.content
+
+
+class ToolUseBlock(ContentBlock):
+    """
+    A toolUse content block whose input arrives as JSON fragments.
+
+    The fragments are also fed to a StreamingJsonObjectParser, so each
+    top-level input field is available in `input_fields` as soon as its value
+    closes.
+    """
+
+    kind = "toolUse"
+
+    def __init__(self, index, tool_use_id, name):
+        super().__init__(index)
+        self.tool_use_id = tool_use_id
+        self.name = name
+        self.input_parser = StreamingJsonObjectParser()
+        self.input_error = None
+
+    def feed_input(self, fragment):
+        """
+        Append a tool input fragment and parse it incrementally.
+
+        Args:
+            fragment (str): The tool input fragment
+
+        Returns:
+            list: The JsonFieldEvent tuples produced by the fragment
+        """
+        self.append(fragment)
+        if self.input_error is not None:
+            return []
+        try:
+            return self.input_parser.feed(fragment)
+        except json.JSONDecodeError as e:
+            self.input_error = e
+            return []
+
+    @property
+    def input_json(self):
+        """str: The accumulated tool input JSON string."""
+        return self.content
+
+    @property
+    def input_fields(self):
+        """dict: The top-level input fields whose values have closed so far."""
+        return self.input_parser.fields
+
+    def parsed_input(self):
+        """
+        Return the complete tool input.
+
+        Returns:
+            dict: The parsed tool input
+
+        Raises:
+            json.JSONDecodeError: If the accumulated input is not a complete JSON object
+        """
+        if self.input_error is not None:
+            raise self.input_error
+        return self.input_parser.close()
+
+
+class ReasoningBlock(ContentBlock):
+    """A reasoningContent block (reasoning text plus an optional signature)."""
+
+    kind = "reasoning"
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.signature = None
+
+    @property
+    def text(self):
+        """str: The accumulated reasoning text."""
+        return self.content
+
+
+class StreamHandler:
+    """
+    Base class for converseStream event hooks.
+
+    Subclasses override only the hooks they need; every hook is a no-op by
+    default.
+    """
+
+    def on_message_start(self, role):
+        pass
+
+    def on_block_start(self, block):
+        pass
+
+    def on_text_delta(self, block, text):
+        pass
+
+    def on_tool_input_delta(self, block, fragment):
+        pass
+
+    def on_tool_input_field(self, block, name, value):
+        pass
+
+    def on_tool_input_chunk(self, block, name, text):
+        pass
+
+    def on_reasoning_delta(self, block, reasoning):
+        pass
+
+    def on_block_stop(self, block):
+        pass
+
+    def on_message_stop(self, stop_reason, event):
+        pass
+
+    def on_metadata(self, metadata):
+        pass
+
+
+class ConverseStreamProcessor:
+    """
+    Dispatches converseStream events to typed content blocks and handler hooks.
+    """
+
+    def __init__(self, *handlers, timeline=None):
+        """
+        Args:
+            *handlers (StreamHandler): Handlers whose hooks are called, in order, for every event
+            timeline (DeltaTimeline): Timeline to record the deltas in, e.g. one shared by
+                all turns of a conversation (default: a new timeline)
+        """
+        self.handlers = list(handlers)
+        self.timeline = timeline if timeline is not None else DeltaTimeline()
+        self.role = None
+        self.stop_reason = None
+        self.metadata = None
+        self.blocks = []
+        self._open_blocks = {}
+        self._dispatch = {
+            "messageStart": self._message_start,
+            "contentBlockStart": self._block_start,
+            "contentBlockDelta": self._block_delta,
+            "contentBlockStop": self._block_stop,
+            "messageStop": self._message_stop,
+            "metadata": self._metadata,
+        }
+
+    def add_handler(self, handler):
+        """
+        Register an additional handler.
+
+        Args:
+            handler (StreamHandler): The handler to add
+        """
+        self.handlers.append(handler)
+
+    def process(self, stream):
+        """
+        Consume an entire event stream.
+
+        Args:
+            stream (iterable): The `stream` member of a converse_stream response
+
+        Returns:
+            ConverseStreamProcessor: self, for chaining
+        """
+        self.timeline.new_stream()
+        process_event = self.process_event
+        for event in stream:
+            process_event(event)
+        return self
+
+    async def process_async(self, stream):
+        """
+        Consume an entire asynchronous event stream.
+
+        Args:
+            stream (async iterable): The `stream` member of an AsyncBedrockRuntimeClient response
+
+        Returns:
+            ConverseStreamProcessor: self, for chaining
+        """
+        self.timeline.new_stream()
+        process_event = self.process_event
+        async for event in stream:
+            process_event(event)
+        return self
+
+    def process_event(self, event):
+        """
+        Dispatch a single converseStream event.
+
+        Args:
+            event (dict): A converseStream event with a single top-level key
+        """
+        for event_type, body in event.items():
+            handler = self._dispatch.get(event_type)
+            if handler is not None:
+                handler(body)
+
+    def _open_block(self, index, block):
+        self._open_blocks[index] = block
+        self.blocks.append(block)
+        for handler in self.handlers:
+            handler.on_block_start(block)
+        return block
+
+    def _message_start(self, body):
+        self.role = body.get("role")
+        for handler in self.handlers:
+            handler.on_message_start(self.role)
+
+    def _block_start(self, body):
+        index = body.get("contentBlockIndex", 0)
+        start = body.get("start", {})
+        tool = start.get("toolUse")
+        if tool is not None:
+            self._open_block(index, ToolUseBlock(index, tool.get("toolUseId"), tool.get("name")))
+
+    def _block_delta(self, body):
+        index = body.get("contentBlockIndex", 0)
+        delta = body["delta"]
+        block = self._open_blocks.get(index)
+
+        text = delta.get("text")
+        if text is not None:
+            self.timeline.record("text", text)
+            if block is None:
+                block = self._open_block(index, TextBlock(index))
+            block.append(text)
+            for handler in self.handlers:
+                handler.on_text_delta(block, text)
+            return
+
+        tool_delta = delta.get("toolUse")
+        if tool_delta is not None:
+            fragment = tool_delta.get("input")
+            if block is None or fragment is None:
+                return
+            self.timeline.record("toolUse", fragment)
+            events = block.feed_input(fragment)
+            for handler in self.handlers:
+                handler.on_tool_input_delta(block, fragment)
+            for event in events:
+                if event.kind == "string_chunk":
+                    for handler in self.handlers:
+                        handler.on_tool_input_chunk(block, event.key, event.value)
+                elif event.kind == "field":
+                    for handler in self.handlers:
+                        handler.on_tool_input_field(block, event.key, event.value)
+            return
+
+        reasoning = delta.get("reasoningContent")
+        if reasoning is not None:
+            if block is None:
+                block = self._open_block(index, ReasoningBlock(index))
+            if "text" in reasoning:
+                # Signature-only deltas are not content, so they are not on the timeline
+                self.timeline.record("reasoning", reasoning["text"])
+                block.append(reasoning["text"])
+            if "signature" in reasoning:
+                block.signature = reasoning["signature"]
+            for handler in self.handlers:
+                handler.on_reasoning_delta(block, reasoning)
+
+    def _block_stop(self, body):
+        index = body.get("contentBlockIndex", 0)
+        block = self._open_blocks.pop(index, None)
+        if block is None:
+            return
+        block.close()
+        for handler in self.handlers:
+            handler.on_block_stop(block)
+
+    def _message_stop(self, body):
+        self.stop_reason = body.get("stopReason", "")
+        for handler in self.handlers:
+            handler.on_message_stop(self.stop_reason, body)
+
+    def _metadata(self, body):
+        self.metadata = body
+        for handler in self.handlers:
+            handler.on_metadata(body)
+
+
+class AssistantMessageBuilder(StreamHandler):
+    """
+    Builds the assistant message and the full response text from completed blocks.
+
+    Text blocks are added to the message once, when they stop, from their
+    joined chunk list. Response text from later turns is collected as a chunk
+    list as well and only joined when `full_response` is read.
+    """
+
+    def __init__(self):
+        self.message = {"role": "assistant", "content": []}
+        self._response_parts = []
+
+    def on_block_stop(self, block):
+        if block.kind == "text":
+            text = block.text
+            self.message["content"].append({"text": text})
+            self._response_parts.append(text)
+
+    def add_tool_use(self, block, tool_input):
+        """
+        Add a completed toolUse block to the assistant message.
+
+        Args:
+            block (ToolUseBlock): The completed toolUse block
+            tool_input (dict): The parsed tool input
+        """
+        self.message["content"].append(
+            {"toolUse": {"toolUseId": block.tool_use_id, "name": block.name, "input": tool_input}}
+        )
+
+    def append_response(self, text):
+        """
+        Append text that belongs to the full response but not to this message.
+
+        Args:
+            text (str): The text to append
+        """
+        self._response_parts.append(text)
+
+    @property
+    def full_response(self):
+        """str: All response text collected so far."""
+        if len(self._response_parts) > 1:
+            self._response_parts = ["".join(self._response_parts)]
+        return self._response_parts[0] if self._response_parts else ""
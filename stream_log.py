@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Record raw stream events with their receive times, and replay them.
+
+`StreamRecorder` appends every event of every stream a script receives to a
+compact, append-only JSON Lines log: one line per stream, holding the time
+the response headers arrived and each event with its receive time, both in
+seconds (monotonic clock) since the request was sent. converseStream events
+are recorded as parsed by botocore; Messages API events as their SSE `data`
+strings.
+
+    recorder = StreamRecorder("stall.jsonl", "bedrock")
+    client = recorder.wrap_client(get_bedrock_runtime_client())
+
+The log can be replayed with the original inter-event timing (or as fast as
+possible), either through the benchmark executors' `_process_event` to
+profile the client side in isolation, or through the local stand-in servers
+so that unmodified clients receive the recorded stream:
+
+    python stream_log.py stall.jsonl --profile            # replay into _process_event
+    python stream_log.py stall.jsonl --fast --repeat 100  # parser cost only
+    python stream_log.py stall.jsonl --serve              # serve it on a stand-in
+
+A log with several streams replays them in order; served by a stand-in, the
+n-th stream answers the n-th turn of a conversation.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from datetime import datetime
+
+from mock_bedrock_server import ScriptedEvent
+
+LOG_FORMAT = "stream-log"
+LOG_VERSION = 1
+APIS = ("bedrock", "anthropic")
+
+
+class StreamCapture:
+    """
+    The events of one stream being recorded.
+
+    Created by `StreamRecorder.start_stream` just before the request is sent.
+    Events are kept in memory and written to the log as one line when the
+    stream ends, so recording adds no I/O between events.
+    """
+
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._start = time.monotonic()
+        self.started = datetime.now().isoformat()
+        self.request_id = None
+        self.response_time = None
+        self.events = []
+
+    def response_received(self, request_id=None):
+        """
+        Mark the arrival of the response headers.
+
+        Args:
+            request_id (str): The request ID of the response
+        """
+        self.response_time = time.monotonic() - self._start
+        self.request_id = request_id
+
+    def record(self, event):
+        """
+        Record one event with its receive time.
+
+        Args:
+            event: The event (a converseStream event dict or an SSE data string)
+        """
+        self.events.append((time.monotonic() - self._start, event))
+
+    def wrap(self, events, request_id=None, convert=None):
+        """
+        Record the events of a stream while passing them through.
+
+        Args:
+            events (iterable): The stream
+            request_id (str): The request ID of the response
+            convert (callable): Maps each event to what is recorded; None results are skipped
+
+        Returns:
+            generator: The events of `events`
+        """
+        self.response_received(request_id)
+        return self._wrap(events, convert)
+
+    def _wrap(self, events, convert):
+        try:
+            for event in events:
+                item = convert(event) if convert is not None else event
+                if item is not None:
+                    self.record(item)
+                yield event
+        finally:
+            self.finish()
+
+    def wrap_async(self, events, request_id=None, convert=None):
+        """
+        Record the events of an asynchronous stream while passing them through.
+
+        Args:
+            events (async iterable): The stream
+            request_id (str): The request ID of the response
+            convert (callable): Maps each event to what is recorded; None results are skipped
+
+        Returns:
+            async generator: The events of `events`
+        """
+        self.response_received(request_id)
+        return self._wrap_async(events, convert)
+
+    async def _wrap_async(self, events, convert):
+        try:
+            async for event in events:
+                item = convert(event) if convert is not None else event
+                if item is not None:
+                    self.record(item)
+                yield event
+        finally:
+            self.finish()
+
+    def finish(self):
+        """Write the stream to the log (only the first call has an effect)."""
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.write_stream(self)
+
+
+class StreamRecorder:
+    """
+    Append-only log of recorded streams.
+
+    Thread-safe; streams are written in the order they finish.
+    """
+
+    def __init__(self, path, api):
+        """
+        Args:
+            path (str): The log file; new streams are appended if it exists
+            api (str): "bedrock" (converseStream events) or "anthropic" (SSE data strings)
+        """
+        if api not in APIS:
+            raise ValueError(f"Unknown API {api!r}, expected one of {APIS}")
+        self.path = path
+        self.api = api
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+        if self._file.tell() == 0:
+            self._write_line({"format": LOG_FORMAT, "version": LOG_VERSION, "api": api})
+
+    def _write_line(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def start_stream(self):
+        """
+        Start recording a stream; call this just before sending the request.
+
+        Returns:
+            StreamCapture: The capture to record the stream's events into
+        """
+        return StreamCapture(self)
+
+    def write_stream(self, capture):
+        """
+        Append a finished stream to the log.
+
+        Args:
+            capture (StreamCapture): The recorded stream
+        """
+        record = {
+            "started": capture.started,
+            "request_id": capture.request_id,
+            "response": (
+                round(capture.response_time, 6) if capture.response_time is not None else None
+            ),
+            "events": [[round(offset, 6), event] for offset, event in capture.events],
+        }
+        with self._lock:
+            if not self._file.closed:
+                self._write_line(record)
+
+    def wrap_client(self, client):
+        """
+        Wrap a Bedrock Runtime client so that every converseStream response is recorded.
+
+        Args:
+            client: A boto3 bedrock-runtime client or an AsyncBedrockRuntimeClient
+
+        Returns:
+            A client with the same interface
+        """
+        if asyncio.iscoroutinefunction(client.converse_stream):
+            return _RecordingAsyncClient(client, self)
+        return _RecordingClient(client, self)
+
+    def close(self):
+        """Close the log file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _RecordingClient:
+
+    def __init__(self, client, recorder):
+        self._client = client
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def converse_stream(self, **params):
+        capture = self._recorder.start_stream()
+        response = self._client.converse_stream(**params)
+        request_id = response.get("ResponseMetadata", {}).get("RequestId")
+        return {**response, "stream": capture.wrap(response["stream"], request_id)}
+
+
+class _RecordingAsyncClient(_RecordingClient):
+
+    async def converse_stream(self, **params):
+        capture = self._recorder.start_stream()
+        response = await self._client.converse_stream(**params)
+        request_id = response.get("ResponseMetadata", {}).get("RequestId")
+        return {**response, "stream": capture.wrap_async(response["stream"], request_id)}
+
+
+def load_stream_log(path):
+    """
+    Load a recorded log.
+
+    Args:
+        path (str): The log file
+
+    Returns:
+        tuple: The API ("bedrock" or "anthropic") and the list of streams in
+            the order they were started, each a dict with `started`,
+            `request_id`, `response` and `events` (a list of (offset, event) tuples)
+    """
+    with open(path) as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != LOG_FORMAT:
+            raise ValueError(f"{path} is not a stream log")
+        streams = []
+        for line in f:
+            if not line.strip():
+                continue
+            stream = json.loads(line)
+            stream["events"] = [(offset, event) for offset, event in stream["events"]]
+            streams.append(stream)
+    # Streams are written when they finish; a continuation can finish inside
+    # the stream that triggered it, so restore the order they were started in
+    streams.sort(key=lambda stream: stream["started"])
+    return header["api"], streams
+
+
+def _scripted(api, event):
+    # Messages API events are recorded as SSE data strings
+    return json.loads(event) if api == "anthropic" else event
+
+
+def to_script(api, streams, speed=1.0):
+    """
+    Convert recorded streams into a stand-in server script.
+
+    The first event of each stream keeps its full delay from the request, so
+    the recorded time to first event is reproduced.
+
+    Args:
+        api (str): The API of the log
+        streams (list): The recorded streams
+        speed (float): Replay speed factor; 0 sends every event without delay
+
+    Returns:
+        list: One list of ScriptedEvent tuples per stream
+    """
+    script = []
+    for stream in streams:
+        response = []
+        previous = 0.0
+        for offset, event in stream["events"]:
+            if api == "anthropic" and not event:
+                continue
+            delay = (offset - previous) / speed if speed else 0.0
+            response.append(ScriptedEvent(max(0.0, delay), _scripted(api, event)))
+            previous = offset
+        script.append(response)
+    return script
+
+
+def replay_stream(stream, process_event, speed=1.0):
+    """
+    Feed a recorded stream to `process_event` with its original timing.
+
+    Args:
+        stream (dict): A recorded stream
+        process_event (callable): Called with each event
+        speed (float): Replay speed factor; 0 replays as fast as possible
+
+    Returns:
+        dict: `events`, `elapsed` (seconds), `processing` (seconds spent in
+            process_event) and `max_gap` (largest recorded gap between events)
+    """
+    processing = 0.0
+    max_gap = 0.0
+    previous = None
+    start = time.monotonic()
+    for offset, event in stream["events"]:
+        if previous is not None:
+            max_gap = max(max_gap, offset - previous)
+        previous = offset
+        if speed:
+            wait = offset / speed - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
+        before = time.perf_counter()
+        process_event(event)
+        processing += time.perf_counter() - before
+    return {
+        "events": len(stream["events"]),
+        "elapsed": time.monotonic() - start,
+        "processing": processing,
+        "max_gap": max_gap,
+    }
+
+
+def _event_processor(api, stream_engine=False):
+    """Return a fresh process_event callable for one replayed stream."""
+    if stream_engine:
+        if api != "bedrock":
+            raise ValueError("--stream-engine only applies to converseStream (bedrock) logs")
+        from stream_engine import AssistantMessageBuilder, ConverseStreamProcessor
+
+        return ConverseStreamProcessor(AssistantMessageBuilder()).process_event
+
+    from benchmark.mock_tools import MockToolExecutor
+
+    if api == "bedrock":
+        from benchmark.benchmark_bedrock import BedrockTaskExecutor as executor_class
+    else:
+        from benchmark.benchmark_anthropic import AnthropicTaskExecutor as executor_class
+    # Only the stream processing state is used, so no API client or runner is needed
+    executor = executor_class(None, MockToolExecutor(), None)
+    executor._reset_timing()
+    return executor._process_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded stream log")
+    parser.add_argument("log", help="Stream log written with --record")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed factor (default: 1.0, the original cadence)",
+    )
+    parser.add_argument("--fast", action="store_true", help="Replay as fast as possible")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times to replay the log")
+    parser.add_argument(
+        "--stream-engine",
+        action="store_true",
+        help="Replay converseStream logs through stream_engine instead of the benchmark executor",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Profile the replay and print the top functions"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve the log on the matching local stand-in server instead of replaying it",
+    )
+    parser.add_argument("--port", type=int, default=None, help="Port for --serve")
+    args = parser.parse_args()
+
+    speed = 0.0 if args.fast else args.speed
+    api, streams = load_stream_log(args.log)
+    if not streams:
+        sys.exit(f"{args.log} contains no streams")
+
+    if args.serve:
+        if api == "bedrock":
+            from mock_bedrock_server import DEFAULT_PORT, MockBedrockServer as server_class
+        else:
+            from mock_anthropic_server import DEFAULT_PORT, MockAnthropicServer as server_class
+        server = server_class(to_script(api, streams, speed), port=args.port or DEFAULT_PORT)
+        print(
+            f"Serving {len(streams)} recorded {api} stream(s) on {server.base_url} (Ctrl+C to stop)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+        return
+
+    profiler = cProfile.Profile() if args.profile else None
+    total_events = 0
+    total_processing = 0.0
+    for iteration in range(args.repeat):
+        for index, stream in enumerate(streams):
+            process_event = _event_processor(api, args.stream_engine)
+            if profiler is not None:
+                profiler.enable()
+            stats = replay_stream(stream, process_event, speed)
+            if profiler is not None:
+                profiler.disable()
+            total_events += stats["events"]
+            total_processing += stats["processing"]
+            if iteration == 0:
+                recorded = stream["events"][-1][0] if stream["events"] else 0.0
+                print(
+                    f"Stream {index} ({stream.get('request_id') or 'no request ID'}): "
+                    f"{stats['events']} events, recorded {recorded:.3f}s, "
+                    f"replayed {stats['elapsed']:.3f}s, max gap {stats['max_gap']:.3f}s, "
+                    f"processing {stats['processing'] * 1000:.2f}ms"
+                )
+
+    if total_events:
+        print(
+            f"\n{total_events} events replayed, {total_processing * 1e6 / total_events:.2f}us "
+            f"processing per event"
+        )
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    main()
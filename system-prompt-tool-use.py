@@ -1,50 +1,28 @@
 #!/usr/bin/env python3
 import argparse
-import datetime
+import asyncio
 import json
-import os
+import re
 import sys
 import time
 
-import boto3
-from botocore.exceptions import ClientError
-from botocore.config import Config
+from delta_timeline import DEFAULT_STALL_THRESHOLD
+from fs_write_stream import (
+    FsWriteStreamHandler,
+    execute_fs_write,
+    invoke_bedrock_converse_stream,
+    invoke_bedrock_converse_stream_async,
+    log,
+)
+from stream_log import StreamRecorder
+from xml_tool_parser import XmlToolCallParser
 
-def log(message, timestamp_mode=False, end="\n", flush=False):
-    """
-    Log a message with an optional timestamp.
-    
-    Args:
-        message (str): The message to log
-        timestamp_mode (bool): Whether to include a timestamp
-        end (str): String appended after the last character of message
-        flush (bool): Whether to force a flush of the output
-    """
-    if timestamp_mode:
-        current_time = datetime.datetime.now().isoformat(timespec='milliseconds')
-        print(f"[{current_time}] {message}", end=end, flush=flush)
-    else:
-        print(message, end=end, flush=flush)        
+MODEL_NAME = "Claude v3.7 (System Prompt)"
+REGION_NAME = "us-west-2"
 
-
-def invoke_bedrock_converse_stream(prompt, model_id, timestamp_mode=False):
-    """
-    Invokes the Bedrock converseStream API with Claude v3.7 model using system prompt for tool use.
-
-    Args:
-        prompt (str): The user prompt to send to the model
-        model_id (str): The model ID to use
-        timestamp_mode (bool): Whether to print timestamps for each event
-
-    Returns:
-        str: The full response text
-    """
-    # Initialize Bedrock Runtime client
-    config = Config(read_timeout=300)
-    bedrock_runtime = boto3.client("bedrock-runtime", region_name="us-west-2", config=config)
-
-    # Define the system prompt for fs_write tool
-    system_prompt = """You have access to a set of tools that are executed upon the user's approval. You can use one tool per message.
+# Defines the fs_write tool for the model, instead of the API's toolConfig
+SYSTEM_PROMPT = """You have access to a set of tools that are executed upon the user's approval. \
+You can use one tool per message.
 
 # Tool Use Formatting
 
@@ -82,409 +60,153 @@ Usage:
 3. Wait for confirmation after each tool use before proceeding.
 """
 
-    # Prepare request body
-    messages = [{"role": "user", "content": [{"text": prompt}]}]
 
-    try:
-        # Prepare API call parameters
-        api_params = {
-            "modelId": model_id,
-            "messages": messages,
-            "system": [{"text": system_prompt}],
-        }
-
-        # Call the converseStream API
-        response = bedrock_runtime.converse_stream(**api_params)
-
-        # Process the streaming response
-        print("Streaming response from Claude v3.7 (System Prompt):")
-        print("-" * 50)
-
-        full_response = ""
-        current_text = ""
-        tool_use = {}
-        
-        # For XML-style tool parsing
-        xml_tool_active = False
-        xml_tool_content = ""
-        xml_tool_start_time = None
-        
-        # Track the assistant's response to include in the messages array
-        assistant_message = {"role": "assistant", "content": []}
-        current_content_block = None
-
-        for event in response.get("stream"):
-            # Print timestamp if timestamp mode is enabled
-
-            if "messageStart" in event:
-                log(f"[Message started with role: {event['messageStart']['role']}]", timestamp_mode)
-
-            elif "contentBlockStart" in event:
-                block_start = event["contentBlockStart"]["start"]
-                if "toolUse" in block_start:
-                    tool = block_start["toolUse"]
-                    tool_use = {"toolUseId": tool["toolUseId"], "name": tool["name"], "input": ""}
-                    log(f"[Tool Use Started: {tool['name']} (ID: {tool['toolUseId']})]", timestamp_mode)
-                    # Start timing tool input generation
-                    tool_start_time = time.time()
-                    
-                    # Add the toolUse to the assistant's message
-                    current_content_block = {"toolUse": {
-                        "toolUseId": tool["toolUseId"],
-                        "name": tool["name"],
-                        "input": ""
-                    }}
-
-            elif "contentBlockDelta" in event:
-                delta = event["contentBlockDelta"]["delta"]
-                if "text" in delta:
-                    text_chunk = delta["text"]
-                    log(text_chunk, timestamp_mode, flush=False)
-                    current_text += text_chunk
-                    
-                    # Character-by-character parsing for XML tags
-                    # Process each character in the text chunk
-                    for char in text_chunk:
-                        # Add character to accumulator
-                        if not hasattr(invoke_bedrock_converse_stream, 'xml_accumulator'):
-                            invoke_bedrock_converse_stream.xml_accumulator = ""
-                        invoke_bedrock_converse_stream.xml_accumulator += char
-                        
-                        # Check for tool state and parameters
-                        if xml_tool_active:
-                            # If we're parsing a parameter
-                            if hasattr(invoke_bedrock_converse_stream, 'current_param_name') and invoke_bedrock_converse_stream.current_param_name:
-                                current_param_value = invoke_bedrock_converse_stream.xml_accumulator[invoke_bedrock_converse_stream.current_param_value_start_index:]
-                                param_closing_tag = f"</{invoke_bedrock_converse_stream.current_param_name}>"
-                                
-                                if current_param_value.endswith(param_closing_tag):
-                                    # End of parameter value
-                                    param_value = current_param_value[:-len(param_closing_tag)].strip()
-                                    if not hasattr(invoke_bedrock_converse_stream, 'tool_parameters'):
-                                        invoke_bedrock_converse_stream.tool_parameters = {}
-                                    invoke_bedrock_converse_stream.tool_parameters[invoke_bedrock_converse_stream.current_param_name] = param_value
-                                    invoke_bedrock_converse_stream.current_param_name = None
-                                    continue
-                            
-                            # Check for tool closing tag
-                            tool_closing_tag = "</fs_write>"
-                            if invoke_bedrock_converse_stream.xml_accumulator.endswith(tool_closing_tag):
-                                xml_tool_active = False
-                                
-                                # Calculate and log tool input generation time
-                                tool_end_time = time.time()
-                                tool_elapsed_time = tool_end_time - xml_tool_start_time
-                                log(f"[Tool input generation time: {tool_elapsed_time:.2f} seconds]", timestamp_mode, flush=True)
-                                
-                                # Create parameters dictionary from collected parameters
-                                parameters = {}
-                                if hasattr(invoke_bedrock_converse_stream, 'tool_parameters'):
-                                    parameters = invoke_bedrock_converse_stream.tool_parameters
-                                    # Convert insert_line to int if present
-                                    if 'insert_line' in parameters:
-                                        try:
-                                            parameters['insert_line'] = int(parameters['insert_line'].strip())
-                                        except ValueError:
-                                            log(f"[Error: insert_line is not a valid integer]", timestamp_mode)
-                                
-                                log(f"[XML Tool parameters: {json.dumps(parameters)}]", timestamp_mode, flush=True)
-                                
-                                # Execute the fs_write tool
-                                execute_fs_write(parameters, timestamp_mode)
-                                
-                                # Reset state
-                                if hasattr(invoke_bedrock_converse_stream, 'tool_parameters'):
-                                    delattr(invoke_bedrock_converse_stream, 'tool_parameters')
-                                continue
-                            
-                            # Check for parameter opening tags
-                            param_names = ['command', 'path', 'file_text', 'old_str', 'new_str', 'insert_line']
-                            for param_name in param_names:
-                                param_opening_tag = f"<{param_name}>"
-                                if invoke_bedrock_converse_stream.xml_accumulator.endswith(param_opening_tag):
-                                    invoke_bedrock_converse_stream.current_param_name = param_name
-                                    invoke_bedrock_converse_stream.current_param_value_start_index = len(invoke_bedrock_converse_stream.xml_accumulator)
-                                    break
-                        else:
-                            # Check for tool opening tag
-                            tool_opening_tag = "<fs_write>"
-                            if invoke_bedrock_converse_stream.xml_accumulator.endswith(tool_opening_tag):
-                                xml_tool_active = True
-                                xml_tool_content = ""
-                                # Start timing tool input generation
-                                xml_tool_start_time = time.time()
-                                log(f"[XML Tool Use Started: fs_write]", timestamp_mode)
-                                
-                                # Initialize tool parsing state
-                                invoke_bedrock_converse_stream.current_param_name = None
-                                if hasattr(invoke_bedrock_converse_stream, 'tool_parameters'):
-                                    delattr(invoke_bedrock_converse_stream, 'tool_parameters')
-                                invoke_bedrock_converse_stream.tool_parameters = {}
-                    
-                    # If this is the first text chunk, add a text block to the assistant's message
-                    if not any(block.get("text", "") for block in assistant_message["content"]):
-                        assistant_message["content"].append({"text": text_chunk})
-                    else:
-                        # Otherwise, append to the existing text block
-                        for block in assistant_message["content"]:
-                            if "text" in block:
-                                block["text"] += text_chunk
-                                break
-                                
-                elif "toolUse" in delta and "input" in delta["toolUse"]:
-                    tool_use["input"] += delta["toolUse"]["input"]
-                    log(f"[Tool input: {delta['toolUse']['input']}] ", timestamp_mode, flush=True)
-                    
-                    # Update the toolUse in the assistant's message
-                    if current_content_block and "toolUse" in current_content_block:
-                        current_content_block["toolUse"]["input"] += delta["toolUse"]["input"]
-
-            elif "contentBlockStop" in event:
-                if tool_use and "input" in tool_use and tool_use["input"]:
-                    # Calculate and log tool input generation time
-                    tool_end_time = time.time()
-                    tool_elapsed_time = tool_end_time - tool_start_time
-                    log(f"[Tool input generation time: {tool_elapsed_time:.2f} seconds]", timestamp_mode, flush=True)
-                    
-                    # Parse the tool input as XML
-                    try:
-                        # Extract command and parameters from XML-style input
-                        import re
-                        
-                        # Extract command
-                        command_match = re.search(r'<command>(.*?)</command>', tool_use["input"])
-                        command = command_match.group(1) if command_match else None
-                        
-                        # Extract path
-                        path_match = re.search(r'<path>(.*?)</path>', tool_use["input"])
-                        path = path_match.group(1) if path_match else None
-                        
-                        # Extract file_text (for create command)
-                        file_text_match = re.search(r'<file_text>(.*?)</file_text>', tool_use["input"], re.DOTALL)
-                        file_text = file_text_match.group(1) if file_text_match else None
-                        
-                        # Extract old_str (for str_replace command)
-                        old_str_match = re.search(r'<old_str>(.*?)</old_str>', tool_use["input"], re.DOTALL)
-                        old_str = old_str_match.group(1) if old_str_match else None
-                        
-                        # Extract new_str (for str_replace, insert, append commands)
-                        new_str_match = re.search(r'<new_str>(.*?)</new_str>', tool_use["input"], re.DOTALL)
-                        new_str = new_str_match.group(1) if new_str_match else None
-                        
-                        # Extract insert_line (for insert command)
-                        insert_line_match = re.search(r'<insert_line>(.*?)</insert_line>', tool_use["input"])
-                        insert_line = int(insert_line_match.group(1)) if insert_line_match else None
-                        
-                        # Create parameters dictionary based on command
-                        parameters = {"command": command, "path": path}
-                        
-                        if command == "create" and file_text is not None:
-                            parameters["file_text"] = file_text
-                        elif command == "str_replace" and old_str is not None and new_str is not None:
-                            parameters["old_str"] = old_str
-                            parameters["new_str"] = new_str
-                        elif command == "insert" and new_str is not None and insert_line is not None:
-                            parameters["new_str"] = new_str
-                            parameters["insert_line"] = insert_line
-                        elif command == "append" and new_str is not None:
-                            parameters["new_str"] = new_str
-                        
-                        log(f"[Tool parameters: {json.dumps(parameters)}]", timestamp_mode, flush=True)
-                        
-                        # Update the toolUse input in the assistant's message
-                        if current_content_block and "toolUse" in current_content_block:
-                            current_content_block["toolUse"]["input"] = parameters
-                            # Add the complete toolUse block to the assistant's message
-                            assistant_message["content"].append(current_content_block)
-                            current_content_block = None
-
-                        # Execute the fs_write tool
-                        if tool_use["name"] == "fs_write":
-                            tool_success = execute_fs_write(parameters, timestamp_mode)
-                            
-                            # Create tool result message based on success or failure
-                            result_text = ""
-                            if tool_success:
-                                result_text = f"Tool execution completed successfully for {parameters['command']} operation on {parameters['path']}"
-                            else:
-                                result_text = f"Tool execution failed for {parameters['command']} operation on {parameters['path']}"
-                                
-                            # Send tool result back to the model
-                            tool_result_message = {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "toolResult": {
-                                            "toolUseId": tool_use["toolUseId"],
-                                            "content": [
-                                                {
-                                                    "text": result_text
-                                                }
-                                            ],
-                                        }
-                                    }
-                                ],
-                            }
-
-                            # Create a complete messages array with the assistant's response
-                            tool_messages = [
-                                {"role": "user", "content": [{"text": prompt}]},
-                                assistant_message,
-                                tool_result_message
-                            ]
-
-                            # Call the API again with the tool result
-                            log(f"[Sending tool result back to the model...]", timestamp_mode)
-                            try:
-                                continue_response = bedrock_runtime.converse_stream(
-                                    modelId=model_id,
-                                    messages=tool_messages,
-                                    system=system_prompt,
-                                )
-
-                                # Process the continued response
-                                for continue_event in continue_response.get("stream"):
-                                    # Print timestamp if timestamp mode is enabled
-                                    continue_timestamp = ""
-                                    if timestamp_mode:
-                                        current_time = datetime.datetime.now().isoformat(timespec='milliseconds')
-                                        continue_timestamp = f"[{current_time}] "
-                                        
-                                    if "contentBlockDelta" in continue_event:
-                                        continue_delta = continue_event["contentBlockDelta"]["delta"]
-                                        if "text" in continue_delta:
-                                            continue_text = continue_delta["text"]
-                                            log(continue_text, timestamp_mode, flush=True)
-                                            full_response += continue_text
-                            except ClientError as e:
-                                log(f"\nError invoking Bedrock: {e}")
-                                # Continue with the response we have so far
-
-                    except Exception as e:
-                        log(f"\n[Error: Failed to parse tool input: {e}]")
-
-                    # Reset tool use
-                    tool_use = {}
-                else:
-                    full_response += current_text
-                    current_text = ""
-
-            elif "messageStop" in event:
-                stop_reason = event["messageStop"].get("stopReason", "")
-                log(f"[Message stopped. Reason: {stop_reason}]")
-
-        print("\n" + "-" * 50)
-        return full_response
-
-    except ClientError as e:
-        print(f"Error invoking Bedrock: {e}")
-        return None
-
-
-def execute_fs_write(parameters, timestamp_mode=False):
+class XmlToolStreamHandler(FsWriteStreamHandler):
     """
-    Execute the fs_write tool functionality.
+    Stream hooks that log converseStream events and execute fs_write tool calls
+    written as XML-style tags in the text output.
 
-    Args:
-        parameters (dict): The parameters for the fs_write tool
-        timestamp_mode (bool): Whether to print timestamps for each message
+    A toolUse block, should the model send one anyway, is also parsed as XML.
+    The tool result is sent back like FsWriteStreamHandler does (after the
+    stream on the asyncio path).
     """
-    command = parameters.get("command")
-    path = parameters.get("path")
-
 
-    if not command or not path:
-        log(f"[Tool Error: Missing required parameters]")
-        return False
+    def __init__(self, *args, **kwargs):
+        """
+        Takes the arguments of FsWriteStreamHandler.
+        """
+        super().__init__(*args, **kwargs)
 
-    try:
-        # Create directory if it doesn't exist
-        directory = os.path.dirname(path)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory)
-
-        if command == "create":
-            file_text = parameters.get("file_text", "")
-            with open(path, "w") as f:
-                f.write(file_text)
-            log(f"[Tool Result: File created at {path}]")
-            return True
-
-        elif command == "append":
-            new_str = parameters.get("new_str", "")
-            if not os.path.exists(path):
-                log(f"[Tool Error: File {path} does not exist for append operation]")
-                return False
-
-            with open(path, "a") as f:
-                # Add newline if file doesn't end with one
-                if os.path.getsize(path) > 0:
-                    with open(path, "r") as check_file:
-                        check_file.seek(max(0, os.path.getsize(path) - 1))
-                        last_char = check_file.read(1)
-                        if last_char != "\n":
-                            f.write("\n")
-                f.write(new_str)
-            log(f"[Tool Result: Content appended to {path}]")
-            return True
-
-        elif command == "str_replace":
-            old_str = parameters.get("old_str")
-            new_str = parameters.get("new_str")
-
-            if not old_str or new_str is None:
-                log(f"[Tool Error: Missing old_str or new_str for str_replace operation]")
-                return False
-
-            if not os.path.exists(path):
-                log(f"[Tool Error: File {path} does not exist for str_replace operation]")
-                return False
-
-            with open(path, "r") as f:
-                content = f.read()
-
-            if old_str not in content:
-                log(f"[Tool Error: old_str not found in {path}]")
-                return False
-
-            new_content = content.replace(old_str, new_str)
-            with open(path, "w") as f:
-                f.write(new_content)
-            log(f"[Tool Result: String replaced in {path}]")
-            return True
-
-        elif command == "insert":
-            new_str = parameters.get("new_str")
-            insert_line = parameters.get("insert_line")
-
-            if new_str is None or insert_line is None:
-                log(f"[Tool Error: Missing new_str or insert_line for insert operation]")
-                return False
-
-            if not os.path.exists(path):
-                log(f"[Tool Error: File {path} does not exist for insert operation]")
-                return False
-
-            with open(path, "r") as f:
-                lines = f.readlines()
-
-            if insert_line < 0 or insert_line > len(lines):
-                log(f"[Tool Error: insert_line {insert_line} out of range for {path}]")
-                return False
-
-            lines.insert(insert_line, new_str + "\n")
-            with open(path, "w") as f:
-                f.writelines(lines)
-            log(f"[Tool Result: Content inserted at line {insert_line} in {path}]")
-            return True
+        # For XML-style tool parsing
+        self.xml_parser = XmlToolCallParser()
+        self.xml_tool_start_time = None
+
+    def on_text_delta(self, block, text):
+        timestamp_mode = self.timestamp_mode
+        log(text, timestamp_mode, flush=False)
+
+        # Incremental parsing for XML tags
+        for event in self.xml_parser.feed(text):
+            if event.kind == "tool_start":
+                # Start timing tool input generation
+                self.xml_tool_start_time = time.time()
+                log(f"[XML Tool Use Started: {event.name}]", timestamp_mode)
+
+            elif event.kind == "param":
+                log(f"[XML Tool parameter completed: {event.name}]", timestamp_mode, flush=True)
+
+            elif event.kind == "tool_end":
+                # Calculate and log tool input generation time
+                tool_end_time = time.time()
+                tool_elapsed_time = tool_end_time - self.xml_tool_start_time
+                log(
+                    f"[Tool input generation time: {tool_elapsed_time:.2f} seconds]",
+                    timestamp_mode,
+                    flush=True,
+                )
+
+                parameters = event.value
+                # Convert insert_line to int if present
+                if "insert_line" in parameters:
+                    try:
+                        parameters["insert_line"] = int(parameters["insert_line"].strip())
+                    except ValueError:
+                        log(f"[Error: insert_line is not a valid integer]", timestamp_mode)
+
+                log(f"[XML Tool parameters: {json.dumps(parameters)}]", timestamp_mode, flush=True)
+
+                # Execute the fs_write tool
+                execute_fs_write(parameters, timestamp_mode)
+
+    def on_block_stop(self, block):
+        if block.kind != "toolUse" or not block.input_json:
+            return
+
+        timestamp_mode = self.timestamp_mode
+        tool_input = block.input_json
+
+        # Log tool input generation time
+        log(
+            f"[Tool input generation time: {block.elapsed:.2f} seconds]", timestamp_mode, flush=True
+        )
+
+        # Parse the tool input as XML
+        try:
+            # Extract command
+            command_match = re.search(r"<command>(.*?)</command>", tool_input)
+            command = command_match.group(1) if command_match else None
+
+            # Extract path
+            path_match = re.search(r"<path>(.*?)</path>", tool_input)
+            path = path_match.group(1) if path_match else None
+
+            # Extract file_text (for create command)
+            file_text_match = re.search(r"<file_text>(.*?)</file_text>", tool_input, re.DOTALL)
+            file_text = file_text_match.group(1) if file_text_match else None
+
+            # Extract old_str (for str_replace command)
+            old_str_match = re.search(r"<old_str>(.*?)</old_str>", tool_input, re.DOTALL)
+            old_str = old_str_match.group(1) if old_str_match else None
+
+            # Extract new_str (for str_replace, insert, append commands)
+            new_str_match = re.search(r"<new_str>(.*?)</new_str>", tool_input, re.DOTALL)
+            new_str = new_str_match.group(1) if new_str_match else None
+
+            # Extract insert_line (for insert command)
+            insert_line_match = re.search(r"<insert_line>(.*?)</insert_line>", tool_input)
+            insert_line = int(insert_line_match.group(1)) if insert_line_match else None
+
+            # Create parameters dictionary based on command
+            parameters = {"command": command, "path": path}
+
+            if command == "create" and file_text is not None:
+                parameters["file_text"] = file_text
+            elif command == "str_replace" and old_str is not None and new_str is not None:
+                parameters["old_str"] = old_str
+                parameters["new_str"] = new_str
+            elif command == "insert" and new_str is not None and insert_line is not None:
+                parameters["new_str"] = new_str
+                parameters["insert_line"] = insert_line
+            elif command == "append" and new_str is not None:
+                parameters["new_str"] = new_str
+        except Exception as e:
+            log(f"\n[Error: Failed to parse tool input: {e}]")
+            return
+
+        log(f"[Tool parameters: {json.dumps(parameters)}]", timestamp_mode, flush=True)
+
+        # Add the complete toolUse block to the assistant's message
+        self.message_builder.add_tool_use(block, parameters)
+
+        # Execute the fs_write tool
+        if block.name == "fs_write":
+            tool_success = execute_fs_write(parameters, timestamp_mode)
+            tool_messages = self.tool_result_messages(block, parameters, tool_success)
+
+            # Call the API again with the tool result
+            if self.defer_continuation:
+                self.pending_continuations.append(tool_messages)
+            else:
+                self.continue_with_tool_result(tool_messages)
+
+
+def create_api_params(prompt, model_id):
+    """
+    Build the converse_stream parameters of the initial request, with the tool defined in the
+    system prompt.
 
-        else:
-            log(f"[Tool Error: Unknown command {command}]")
-            return False
+    Args:
+        prompt (str): The user prompt to send to the model
+        model_id (str): The model ID to use
 
-    except Exception as e:
-        log(f"[Tool Error: {str(e)}]")
-        return False
+    Returns:
+        dict: The converse_stream parameters
+    """
+    return {
+        "modelId": model_id,
+        "messages": [{"role": "user", "content": [{"text": prompt}]}],
+        "system": [{"text": SYSTEM_PROMPT}],
+    }
 
 
 def main():
@@ -497,9 +219,29 @@ def main():
     parser.add_argument("--timestamp", "-t", action="store_true", help="Enable timestamp mode")
     parser.add_argument("--model", "-m", default="us.anthropic.claude-3-7-sonnet-20250219-v1:0", 
                         help="Model ID to use")
-    
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Use the asyncio converseStream client instead of boto3",
+    )
+    parser.add_argument(
+        "--endpoint-url",
+        help="Bedrock Runtime endpoint override, e.g. a local mock_bedrock_server.py",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Append every raw stream event with its receive time to a log (see stream_log.py)",
+    )
+    parser.add_argument(
+        "--stall-threshold",
+        type=float,
+        default=DEFAULT_STALL_THRESHOLD,
+        help="Report gaps between deltas longer than this many seconds as stalls",
+    )
+
     args = parser.parse_args()
-    
+
     # Get the prompt
     if args.prompt:
         # If prompt is provided as command line argument
@@ -508,8 +250,29 @@ def main():
         # Otherwise, ask for input
         prompt = input("Enter your prompt for Claude v3.7: ")
 
+    recorder = StreamRecorder(args.record, "bedrock") if args.record else None
+
     # Invoke the API with the specified options
-    response = invoke_bedrock_converse_stream(prompt, model_id=args.model, timestamp_mode=args.timestamp)
+    options = dict(
+        model_name=MODEL_NAME,
+        region_name=REGION_NAME,
+        request_params=create_api_params,
+        handler_class=XmlToolStreamHandler,
+        timestamp_mode=args.timestamp,
+        endpoint_url=args.endpoint_url,
+        recorder=recorder,
+        stall_threshold=args.stall_threshold,
+    )
+    try:
+        if args.asyncio:
+            response = asyncio.run(
+                invoke_bedrock_converse_stream_async(prompt, args.model, **options)
+            )
+        else:
+            response = invoke_bedrock_converse_stream(prompt, args.model, **options)
+    finally:
+        if recorder is not None:
+            recorder.close()
     print(f"Response size: {len(response)}")
 
 
@@ -1,109 +1,198 @@
 #!/usr/bin/env python3
 """Simple latency test for Bedrock vs Anthropic APIs."""
-import time
-import boto3
-import requests
-import os
+import argparse
 import sys
+import time
+
+import transport_timing
+from clients import (
+    ANTHROPIC_BASE_URL,
+    create_anthropic_session,
+    create_bedrock_runtime_client,
+    get_anthropic_api_key,
+    get_anthropic_session,
+    get_bedrock_runtime_client,
+)
+
+
+def test_bedrock_latency(client=None, endpoint_url=None):
+    """Test Bedrock API first token latency.
 
-def test_bedrock_latency():
-    """Test Bedrock API first token latency."""
-    print("Testing Bedrock API...")
-    client = boto3.client('bedrock-runtime', region_name='us-east-1')
-    
+    With a client, the request reuses its (pre-warmed) connection pool. Without
+    one, a new client (for `endpoint_url`, if given) is created inside the
+    measured time, so the result includes the cold-start cost of credential
+    resolution and the TLS handshake. The connection phases of the request
+    are printed after the first-token time.
+    """
+    print("Testing Bedrock API..." if client else "Testing Bedrock API (cold start)...")
     start = time.time()
+    if client is None:
+        client = create_bedrock_runtime_client(region_name="us-east-1", endpoint_url=endpoint_url)
+
     first_token = None
-    
+    timing = transport_timing.begin()
+
     response = client.converse_stream(
         modelId="us.anthropic.claude-sonnet-4-5-20250929-v1:0",
         messages=[{"role": "user", "content": [{"text": "Say hello"}]}],
         inferenceConfig={"maxTokens": 100}
     )
-    
+
+    # Read the stream to the end so the connection goes back to the pool
     for event in response.get('stream'):
+        timing.mark("first_event")
         if first_token is None:
             if 'contentBlockDelta' in event:
                 first_token = time.time()
-                break
-    
+                timing.mark("first_delta")
+    transport_timing.end()
+
     if first_token:
         latency = (first_token - start) * 1000
         print(f"  First token: {latency:.2f}ms")
+        print(f"  Phases: {transport_timing.format_breakdown(timing)}")
         return latency
     return None
 
-def test_anthropic_latency():
-    """Test Anthropic API first token latency."""
-    print("Testing Anthropic API...")
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
+
+def test_anthropic_latency(session=None, base_url=ANTHROPIC_BASE_URL):
+    """Test Anthropic API first token latency.
+
+    With a session, the request reuses its (pre-warmed) connection pool. Without
+    one, a new session is created inside the measured time, so the result
+    includes the TLS handshake.
+    """
+    print("Testing Anthropic API..." if session else "Testing Anthropic API (cold start)...")
+    api_key = get_anthropic_api_key(base_url)
     if not api_key:
         print("  ANTHROPIC_API_KEY not set, skipping")
         return None
-    
+
     start = time.time()
+    if session is None:
+        session = create_anthropic_session()
     first_token = None
-    
-    response = requests.post(
-        "https://api.anthropic.com/v1/messages",
+    timing = transport_timing.begin()
+
+    response = session.post(
+        f"{base_url}/v1/messages",
         headers={
             "anthropic-version": "2023-06-01",
             "content-type": "application/json",
             "x-api-key": api_key,
-            "accept": "text/event-stream"
+            "accept": "text/event-stream",
         },
         json={
             "model": "claude-sonnet-4-5-20250929",
             "messages": [{"role": "user", "content": "Say hello"}],
             "max_tokens": 100,
-            "stream": True
+            "stream": True,
         },
-        stream=True
+        stream=True,
     )
-    
+
+    # Read the stream to the end so the connection goes back to the pool
     for line in response.iter_lines():
         if first_token is None and line:
             line_str = line.decode('utf-8')
-            if line_str.startswith('data: ') and 'content_block_delta' in line_str:
-                first_token = time.time()
-                break
-    
+            if line_str.startswith("data: "):
+                timing.mark("first_event")
+                if "content_block_delta" in line_str:
+                    first_token = time.time()
+                    timing.mark("first_delta")
+    transport_timing.end()
+
     if first_token:
         latency = (first_token - start) * 1000
         print(f"  First token: {latency:.2f}ms")
+        print(f"  Phases: {transport_timing.format_breakdown(timing)}")
         return latency
     return None
 
+
 if __name__ == '__main__':
-    print("Running simple latency tests (15 runs each)...\n")
-    
+    parser = argparse.ArgumentParser(
+        description="Simple latency test for Bedrock vs Anthropic APIs"
+    )
+    parser.add_argument("--runs", type=int, default=15, help="Number of runs per API")
+    parser.add_argument(
+        "--cold-start",
+        action="store_true",
+        help="Also measure cold-start latency (new client/session per run), reported separately",
+    )
+    parser.add_argument(
+        "--bedrock-endpoint-url",
+        default=None,
+        help="Bedrock Runtime endpoint override, e.g. a local mock_bedrock_server.py",
+    )
+    parser.add_argument(
+        "--anthropic-base-url",
+        default=ANTHROPIC_BASE_URL,
+        help="Anthropic API base URL, e.g. a local mock_anthropic_server.py",
+    )
+    args = parser.parse_args()
+
+    print(f"Running simple latency tests ({args.runs} runs each)...\n")
+    transport_timing.install()
+
+    # Warm pools: client creation and the TLS handshakes happen before any measurement
+    bedrock_client = get_bedrock_runtime_client(
+        region_name="us-east-1", endpoint_url=args.bedrock_endpoint_url, prewarm=1
+    )
+    anthropic_base_url = args.anthropic_base_url.rstrip("/")
+    # Only open a connection if the Anthropic test will run
+    anthropic_session = get_anthropic_session(
+        prewarm=1 if get_anthropic_api_key(anthropic_base_url) else 0, base_url=anthropic_base_url
+    )
+
     bedrock_latencies = []
+    bedrock_cold_latencies = []
     anthropic_latencies = []
-    
-    for i in range(15):
-        print(f"Run {i+1}/15:")
-        
-        bl = test_bedrock_latency()
+    anthropic_cold_latencies = []
+
+    for i in range(args.runs):
+        print(f"Run {i+1}/{args.runs}:")
+
+        bl = test_bedrock_latency(bedrock_client)
         if bl:
             bedrock_latencies.append(bl)
-        
-        al = test_anthropic_latency()
+
+        if args.cold_start:
+            cl = test_bedrock_latency(endpoint_url=args.bedrock_endpoint_url)
+            if cl:
+                bedrock_cold_latencies.append(cl)
+
+        al = test_anthropic_latency(anthropic_session, anthropic_base_url)
         if al:
             anthropic_latencies.append(al)
-        
+
+        if args.cold_start:
+            cl = test_anthropic_latency(base_url=anthropic_base_url)
+            if cl:
+                anthropic_cold_latencies.append(cl)
+
         print()
-    
+
     print("=" * 60)
     print("RESULTS:")
     print("=" * 60)
-    
+
     if bedrock_latencies:
         avg_bedrock = sum(bedrock_latencies) / len(bedrock_latencies)
-        print(f"Bedrock avg:   {avg_bedrock:.2f}ms")
-    
+        print(f"Bedrock avg:   {avg_bedrock:.2f}ms (warm pool)")
+
+    if bedrock_cold_latencies:
+        avg_cold = sum(bedrock_cold_latencies) / len(bedrock_cold_latencies)
+        print(f"Bedrock cold:  {avg_cold:.2f}ms (new client per request)")
+
     if anthropic_latencies:
         avg_anthropic = sum(anthropic_latencies) / len(anthropic_latencies)
-        print(f"Anthropic avg: {avg_anthropic:.2f}ms")
-    
+        print(f"Anthropic avg: {avg_anthropic:.2f}ms (warm pool)")
+
+    if anthropic_cold_latencies:
+        avg_anthropic_cold = sum(anthropic_cold_latencies) / len(anthropic_cold_latencies)
+        print(f"Anthropic cold: {avg_anthropic_cold:.2f}ms (new session per request)")
+
     if bedrock_latencies and anthropic_latencies:
         diff = avg_bedrock - avg_anthropic
         pct = (diff / avg_anthropic) * 100
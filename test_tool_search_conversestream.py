@@ -19,9 +19,10 @@ import json
 import sys
 from datetime import datetime
 
-import boto3
 from botocore.exceptions import ClientError, ParamValidationError
 
+from clients import get_bedrock_runtime_client
+
 MODEL_ID = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
 REGION = "us-east-1"
 
@@ -34,7 +35,7 @@ def test_defer_loading_in_tool_spec():
     """Test 1: Can we pass defer_loading in toolSpec via converseStream?"""
     print(f"\n[{timestamp()}] === Test 1: defer_loading in toolSpec ===")
 
-    client = boto3.client("bedrock-runtime", region_name=REGION)
+    client = get_bedrock_runtime_client(region_name=REGION)
 
     tools = [
         {
@@ -80,7 +81,7 @@ def test_system_tool_search():
     """Test 2: Can we pass tool_search as a systemTool?"""
     print(f"\n[{timestamp()}] === Test 2: tool_search as systemTool ===")
 
-    client = boto3.client("bedrock-runtime", region_name=REGION)
+    client = get_bedrock_runtime_client(region_name=REGION)
 
     tools = [
         {"systemTool": {"name": "tool_search_tool_regex"}},
@@ -134,7 +135,7 @@ def test_additional_model_request_fields():
     """Test 3: Can we pass tool search config via additionalModelRequestFields?"""
     print(f"\n[{timestamp()}] === Test 3: tool search via additionalModelRequestFields ===")
 
-    client = boto3.client("bedrock-runtime", region_name=REGION)
+    client = get_bedrock_runtime_client(region_name=REGION)
 
     tools = [
         {
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    """Dummy credentials, so clients can sign requests to a local stand-in server."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_SESSION_TOKEN", raising=False)
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
@@ -0,0 +1,50 @@
+import asyncio
+import csv
+
+import pytest
+
+from benchmark.benchmark_bedrock import _run_tasks_asyncio
+from benchmark.benchmark_runner import BenchmarkRunner
+from mock_bedrock_server import MockBedrockServer, default_script
+
+TASKS = [
+    {"task_id": "write_1", "task_type": "write", "prompt": "Write a file.", "context": {}},
+    {"task_id": "write_2", "task_type": "write", "prompt": "Write another file.", "context": {}},
+]
+
+
+@pytest.mark.parametrize("cold_connections", [False, True])
+def test_asyncio_benchmark_against_mock_server(tmp_path, aws_credentials, cold_connections):
+    runner = BenchmarkRunner("bedrock", str(tmp_path / "bedrock_raw.csv"))
+    script = default_script(text_chars=50, file_chars=300, delay=0.0)
+
+    with MockBedrockServer(script) as server:
+        try:
+            asyncio.run(
+                _run_tasks_asyncio(
+                    runner,
+                    TASKS,
+                    num_runs=2,
+                    concurrency=3,
+                    max_connections=3,
+                    cold_connections=cold_connections,
+                    endpoint_url=server.endpoint_url,
+                )
+            )
+        finally:
+            runner.close()
+        # Two turns (tool use, then the closing text) per execution
+        assert server.request_count == 2 * len(TASKS) * 2
+
+    with open(runner.output_file, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(TASKS) * 2
+    assert sorted(row["task_id"] for row in rows) == ["write_1", "write_1", "write_2", "write_2"]
+    for row in rows:
+        assert row["status"] == "success"
+        assert int(row["tool_calls_count"]) == 1
+        assert int(row["turns_count"]) == 2
+        assert 0 < float(row["first_token_ms"]) <= float(row["total_task_ms"])
+
+    request_ids = runner.request_ids_file.read_text().splitlines()
+    assert len(request_ids) == len(rows)
@@ -0,0 +1,97 @@
+import csv
+import json
+
+from benchmark.benchmark_runner import CSV_COLUMNS, BenchmarkRunner, load_request_ids
+from benchmark.columnar_store import load_columns, store_row_count
+from delta_timeline import DeltaTimeline
+
+
+def read_rows(csv_file):
+    with open(csv_file, "r", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def record(runner, task_id, status="success", delta_timeline=None):
+    runner.record_result(
+        task_id=task_id,
+        task_type="simple",
+        first_token_ms=100.0,
+        stream_complete_ms=200.0,
+        total_task_ms=300.0,
+        max_turn_ms=250.0,
+        tool_calls_count=1,
+        execution_id=f"exec-{task_id}",
+        status=status,
+        delta_timeline=delta_timeline,
+    )
+
+
+def test_buffered_writes_reach_the_files_per_batch_and_on_close(tmp_path):
+    csv_file = tmp_path / "bedrock_raw.csv"
+    runner = BenchmarkRunner("bedrock", str(csv_file), flush_batch=2, flush_interval=3600)
+    try:
+        record(runner, "a")
+        runner.store_request_ids("a", ["req-1", "req-2"], execution_id="exec-a")
+        assert read_rows(csv_file) == []
+
+        record(runner, "b")
+        assert [row["task_id"] for row in read_rows(csv_file)] == ["a", "b"]
+
+        record(runner, "c", status="error: first line\nsecond line")
+    finally:
+        runner.close()
+    runner.close()
+
+    rows = read_rows(csv_file)
+    assert [row["task_id"] for row in rows] == ["a", "b", "c"]
+    assert list(rows[0]) == CSV_COLUMNS
+    assert rows[0]["first_token_ms"] == "100.00"
+    assert rows[2]["status"] == "error: first line\nsecond line"
+    entries = load_request_ids(runner.request_ids_file)
+    assert [(entry["task_id"], entry["request_ids"]) for entry in entries] == [
+        ("a", ["req-1", "req-2"])
+    ]
+    assert json.loads(runner.request_ids_file.read_text().splitlines()[0])["execution_id"] == (
+        "exec-a"
+    )
+    assert runner.histograms_file.exists()
+
+
+def test_columnar_store_continues_row_numbers_of_earlier_runs(tmp_path):
+    csv_file = tmp_path / "bedrock_raw.csv"
+    timeline = DeltaTimeline()
+    timeline.record("text", "Hello")
+    timeline.record("toolUse", '{"path": "/tmp/x"}')
+
+    first = BenchmarkRunner("bedrock", str(csv_file), flush_interval=0)
+    record(first, "a", status="error: first line\nsecond line")
+    record(first, "b", delta_timeline=timeline)
+    first.close()
+    second = BenchmarkRunner("bedrock", str(csv_file), flush_interval=0)
+    record(second, "c", delta_timeline=timeline)
+    second.close()
+
+    assert store_row_count(csv_file) == 3
+    columns, deltas = load_columns(csv_file, with_deltas=True)
+    assert columns["task_id"].tolist() == ["a", "b", "c"]
+    assert columns["csv_row"].tolist() == [0, 1, 2]
+    assert columns["status"][0] == "error: first line\nsecond line"
+    assert columns["total_task_ms"].tolist() == [300.0, 300.0, 300.0]
+    assert deltas["row"].tolist() == [1, 1, 2, 2]
+    assert deltas["size"].tolist() == [5, 18, 5, 18]
+
+
+def test_rows_written_before_the_store_are_imported(tmp_path):
+    csv_file = tmp_path / "bedrock_raw.csv"
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, restval="")
+        writer.writeheader()
+        writer.writerow({"task_id": "old", "task_type": "simple", "status": "success"})
+
+    runner = BenchmarkRunner("bedrock", str(csv_file), flush_interval=0)
+    record(runner, "new")
+    runner.close()
+
+    columns = load_columns(csv_file)
+    assert columns["task_id"].tolist() == ["old", "new"]
+    assert columns["csv_row"].tolist() == [0, 1]
@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import pytest
+
+from benchmark.cloudtrail_logs import find_log_files, iter_records, read_converse_stream_rows
+
+RECORDS = [
+    {
+        "eventName": "ConverseStream",
+        "requestID": "req-1",
+        "eventTime": "2025-01-01T00:00:00Z",
+        "awsRegion": "us-east-1",
+        "additionalEventData": {"inferenceRegion": "us-west-2"},
+        "resources": [{"ARN": "arn:aws:bedrock:us-west-2::foundation-model/m"}],
+        "note": 'brackets ] [ } { and "quotes" in strings, commas , too',
+    },
+    {"eventName": "ListFoundationModels", "requestID": "req-2", "unicode": "é 中"},
+    {"eventName": "ConverseStream", "requestID": "req-3", "nested": {"a": [1, [2, {"b": []}]]}},
+]
+
+
+def write_log(path, records, indent=None):
+    text = json.dumps({"Records": records}, indent=indent, ensure_ascii=False)
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("name", ["log.json", "log.json.gz"])
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_iter_records_at_any_chunk_size(tmp_path, name, indent, chunk_size):
+    path = write_log(tmp_path / name, RECORDS, indent)
+
+    assert list(iter_records(path, chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5])
+def test_iter_records_empty_and_missing_arrays(tmp_path, chunk_size):
+    assert list(iter_records(write_log(tmp_path / "empty.json", []), chunk_size)) == []
+
+    path = tmp_path / "other.json"
+    path.write_text('{"digest": true}')
+    assert list(iter_records(path, chunk_size)) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_iter_records_truncated_file(tmp_path, chunk_size):
+    text = json.dumps({"Records": RECORDS})
+    path = tmp_path / "truncated.json"
+
+    path.write_text(text[: len(text) - 20])
+    with pytest.raises(ValueError, match="truncated record"):
+        list(iter_records(path, chunk_size))
+
+    path.write_text(text[: text.rindex("]")])
+    with pytest.raises(ValueError, match="truncated Records array"):
+        list(iter_records(path, chunk_size))
+
+
+def test_read_converse_stream_rows(tmp_path):
+    path = write_log(tmp_path / "log.json.gz", RECORDS)
+
+    rows, records = read_converse_stream_rows(path)
+
+    assert records == 3
+    assert [row[0] for row in rows] == ["req-1", "req-3"]
+    assert rows[0][3] == "us-west-2"
+
+
+def test_find_log_files(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    write_log(tmp_path / "a" / "b" / "2.json.gz", [])
+    write_log(tmp_path / "a" / "1.json", [])
+    (tmp_path / "a" / "notes.txt").write_text("")
+
+    assert find_log_files(tmp_path) == [
+        tmp_path / "a" / "1.json",
+        tmp_path / "a" / "b" / "2.json.gz",
+    ]
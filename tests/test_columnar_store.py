@@ -0,0 +1,169 @@
+import csv
+
+import numpy as np
+
+from benchmark.benchmark_runner import CSV_COLUMNS
+from benchmark.columnar_store import (
+    DELTA_COLUMNS,
+    RESULT_COLUMNS,
+    count_csv_rows,
+    import_csv,
+    load_columns,
+    store_dir,
+    store_row_count,
+    write_run,
+)
+
+
+def csv_row(task_id, total_task_ms, status="success"):
+    row = {column: "" for column in CSV_COLUMNS}
+    row.update(
+        timestamp="2025-01-01T00:00:00",
+        api_type="bedrock",
+        model_id="model",
+        task_id=task_id,
+        execution_id=f"exec-{task_id}",
+        task_type="simple",
+        first_token_ms="100.00",
+        total_task_ms=total_task_ms,
+        tool_calls_count="1",
+        status=status,
+    )
+    return row
+
+
+def write_csv(csv_file, rows):
+    with open(csv_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_columns(task_ids, first_csv_row):
+    results = {column: [] for column in RESULT_COLUMNS}
+    for offset, task_id in enumerate(task_ids):
+        for column, kind in RESULT_COLUMNS.items():
+            results[column].append("" if kind == "str" else 0)
+        results["task_id"][-1] = task_id
+        results["csv_row"][-1] = first_csv_row + offset
+    return results
+
+
+def no_deltas():
+    return {column: [] for column in DELTA_COLUMNS}
+
+
+def test_count_csv_rows_counts_records_not_lines(tmp_path):
+    csv_file = tmp_path / "results.csv"
+    assert count_csv_rows(csv_file) == 0
+
+    write_csv(
+        csv_file, [csv_row("a", "1.00"), csv_row("b", "2.00", status="error: line one\nline two")]
+    )
+
+    assert csv_file.read_bytes().count(b"\n") == 4
+    assert count_csv_rows(csv_file) == 2
+
+
+def test_import_csv_and_load_columns(tmp_path):
+    csv_file = tmp_path / "results.csv"
+    # A quoted field with a newline, and a blank numeric field (stored as NaN)
+    write_csv(
+        csv_file,
+        [
+            csv_row("a", "1500.00"),
+            csv_row("b", "2500.00", status="error: multi\nline"),
+            csv_row("c", ""),
+        ],
+    )
+
+    assert load_columns(csv_file) is None
+    run_dir = import_csv(csv_file)
+    assert run_dir is not None and run_dir.parent == store_dir(csv_file)
+    assert import_csv(csv_file) is None
+    assert store_row_count(csv_file) == 3
+
+    columns = load_columns(csv_file)
+    assert columns["task_id"].tolist() == ["a", "b", "c"]
+    assert columns["csv_row"].tolist() == [0, 1, 2]
+    assert columns["status"][1] == "error: multi\nline"
+    assert columns["total_task_ms"][:2].tolist() == [1500.0, 2500.0]
+    assert np.isnan(columns["total_task_ms"][2])
+    assert columns["tool_calls_count"].dtype == np.int64
+
+
+def test_import_csv_only_imports_new_rows(tmp_path):
+    csv_file = tmp_path / "results.csv"
+    write_csv(csv_file, [csv_row("a", "1.00")])
+    import_csv(csv_file)
+    write_csv(csv_file, [csv_row("a", "1.00"), csv_row("b", "2.00")])
+
+    import_csv(csv_file)
+
+    assert store_row_count(csv_file) == 2
+    assert len(list(store_dir(csv_file).iterdir())) == 2
+    assert load_columns(csv_file)["task_id"].tolist() == ["a", "b"]
+
+    import_csv(csv_file, rebuild=True)
+    assert len(list(store_dir(csv_file).iterdir())) == 1
+    assert store_row_count(csv_file) == 2
+
+
+def test_load_columns_falls_back_when_rows_are_missing(tmp_path, capsys):
+    csv_file = tmp_path / "results.csv"
+    write_csv(csv_file, [csv_row("a", "1.00"), csv_row("b", "2.00")])
+    write_run(csv_file, run_columns(["a"], 0), no_deltas(), name="run-1")
+
+    assert load_columns(csv_file) is None
+    assert "has 1 rows but" in capsys.readouterr().out
+
+
+def test_load_columns_falls_back_on_clashing_row_numbers(tmp_path, capsys):
+    csv_file = tmp_path / "results.csv"
+    write_csv(csv_file, [csv_row("a", "1.00"), csv_row("b", "2.00")])
+    write_run(csv_file, run_columns(["a"], 0), no_deltas(), name="run-1")
+    write_run(csv_file, run_columns(["b"], 0), no_deltas(), name="run-2")
+
+    assert load_columns(csv_file) is None
+    assert "numbers some rows twice" in capsys.readouterr().out
+
+
+def test_load_columns_orders_rows_and_deltas_by_csv_row(tmp_path):
+    csv_file = tmp_path / "results.csv"
+    write_csv(csv_file, [csv_row(task_id, "1.00") for task_id in "abc"])
+    # A run that recorded row 2, then an import of the rows before it
+    deltas = {
+        "row": [0, 0],
+        "offset_s": [0.0, 0.5],
+        "gap_s": [0.0, 0.5],
+        "size": [3, 4],
+        "kind": [0, 0],
+    }
+    write_run(csv_file, run_columns(["c"], 2), deltas, name="run-1")
+    write_run(csv_file, run_columns(["a", "b"], 0), no_deltas(), name="run-2")
+
+    columns, deltas = load_columns(csv_file, with_deltas=True)
+
+    assert columns["task_id"].tolist() == ["a", "b", "c"]
+    assert deltas["row"].tolist() == [2, 2]
+    assert deltas["size"].tolist() == [3, 4]
+
+
+def test_unfinished_runs_are_ignored(tmp_path):
+    csv_file = tmp_path / "results.csv"
+    write_csv(csv_file, [csv_row("a", "1.00")])
+    write_run(csv_file, run_columns(["a"], 0), no_deltas(), name="run-1")
+    (store_dir(csv_file) / "run-2.tmp").mkdir()
+
+    assert load_columns(csv_file)["task_id"].tolist() == ["a"]
+
+
+def test_numpy_backend_writes_one_file_per_column(tmp_path):
+    csv_file = tmp_path / "results.csv"
+
+    run_dir = write_run(csv_file, run_columns(["a"], 0), no_deltas(), backend="numpy")
+
+    assert sorted(path.name for path in (run_dir / "results").iterdir()) == sorted(
+        f"{column}.npy" for column in RESULT_COLUMNS
+    )
+    assert not list(store_dir(csv_file).glob("*.tmp"))
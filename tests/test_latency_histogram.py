@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pytest
+
+from benchmark.latency_histogram import (
+    MIN_TRACKABLE_MS,
+    HistogramSet,
+    LatencyHistogram,
+    merge_files,
+)
+
+
+def test_quantiles_within_relative_error():
+    values = np.random.default_rng(0).lognormal(mean=6, sigma=1, size=5000)
+    histogram = LatencyHistogram(relative_error=0.01)
+    histogram.record_all(values)
+
+    for q in [0.1, 0.5, 0.9, 0.95, 0.99]:
+        exact = np.quantile(values, q, method="lower")
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert histogram.quantile(0) == values.min()
+    assert histogram.quantile(1) == values.max()
+    assert histogram.count == len(values)
+    assert histogram.mean() == pytest.approx(values.mean())
+
+
+def test_empty_and_zero_values():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    assert histogram.mean() is None
+    assert histogram.stats() == {}
+
+    histogram.record(0.0, count=3)
+    histogram.record(MIN_TRACKABLE_MS)
+    histogram.record(10.0)
+    assert histogram.zero_count == 4
+    assert histogram.quantile(0.5) == 0.0
+    assert histogram.quantile(1) == 10.0
+
+
+def test_rejects_invalid_input():
+    with pytest.raises(ValueError):
+        LatencyHistogram(relative_error=0)
+    with pytest.raises(ValueError):
+        LatencyHistogram().record(-1.0)
+    with pytest.raises(ValueError):
+        LatencyHistogram().quantile(1.5)
+    with pytest.raises(ValueError):
+        LatencyHistogram(0.01).merge(LatencyHistogram(0.02))
+
+
+def test_merge_equals_recording_everything():
+    a_values = [12.0, 250.0, 3.5, 980.0]
+    b_values = [0.0, 41.0, 7000.0]
+    a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    a.record_all(a_values)
+    b.record_all(b_values)
+    both.record_all(a_values + b_values)
+
+    a.merge(b)
+    assert a.to_dict() == both.to_dict()
+
+
+def test_dict_round_trip():
+    histogram = LatencyHistogram()
+    histogram.record_all([1.5, 20.0, 20.1, 300.0])
+
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.stats() == histogram.stats()
+    assert math.isinf(LatencyHistogram.from_dict(LatencyHistogram().to_dict()).min)
+
+
+def test_histogram_set_save_load_and_merge(tmp_path):
+    host_a, host_b = HistogramSet(), HistogramSet()
+    host_a.get("simple", "first_token_ms").record_all([100.0, 120.0])
+    host_a.get("tool", "first_token_ms").record(400.0)
+    host_b.get("simple", "first_token_ms").record(110.0)
+    host_b.get("simple", "total_task_ms").record(900.0)
+    host_a.save(tmp_path / "a.histograms.json")
+    host_b.save(tmp_path / "b.histograms.json")
+
+    merged = merge_files([tmp_path / "a.histograms.json", tmp_path / "b.histograms.json"])
+
+    assert merged.get("simple", "first_token_ms").count == 3
+    assert merged.get("simple", "total_task_ms").count == 1
+    assert merged.combined("first_token_ms").count == 4
+    assert merged.combined("first_token_ms").max == 400.0
+    assert not list(tmp_path.glob("*.tmp"))
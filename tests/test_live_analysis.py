@@ -0,0 +1,100 @@
+import os
+
+from benchmark.live_analysis import CsvFollower, LiveComparison, RunningStats
+
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def test_missing_file_has_no_rows(tmp_path):
+    assert CsvFollower(tmp_path / "results.csv").poll() == ([], False)
+
+
+def test_returns_only_complete_records(tmp_path):
+    path = tmp_path / "results.csv"
+    follower = CsvFollower(path)
+    append(path, b"task_id,status\r\na,success\r\nb,succ")
+
+    assert follower.poll() == ([{"task_id": "a", "status": "success"}], False)
+    assert follower.fieldnames == ["task_id", "status"]
+    assert follower.poll() == ([], False)
+
+    append(path, b'ess\r\nc,"error: first line\nsecond')
+    assert follower.poll() == ([{"task_id": "b", "status": "success"}], False)
+
+    append(path, b' line"\r\n')
+    rows, reset = follower.poll()
+    assert rows == [{"task_id": "c", "status": "error: first line\nsecond line"}]
+    assert not reset
+
+
+def test_multibyte_character_split_across_polls(tmp_path):
+    path = tmp_path / "results.csv"
+    follower = CsvFollower(path)
+    encoded = "task_id,status\r\na,échec — ⌛\r\n".encode("utf-8")
+    split = encoded.index("—".encode("utf-8")) + 1
+
+    append(path, encoded[:split])
+    assert follower.poll() == ([], False)
+    append(path, encoded[split:])
+    assert follower.poll() == ([{"task_id": "a", "status": "échec — ⌛"}], False)
+
+
+def test_reset_when_file_is_rewritten(tmp_path):
+    path = tmp_path / "results.csv"
+    follower = CsvFollower(path)
+    append(path, b"task_id,status\r\na,success\r\nb,success\r\n")
+    assert len(follower.poll()[0]) == 2
+
+    # Rewritten in place with fewer bytes (e.g. an upgrade to new columns)
+    with open(path, "wb") as f:
+        f.write(b"task_id,model_id,status\r\na,m,ok\r\n")
+    assert follower.poll() == ([{"task_id": "a", "model_id": "m", "status": "ok"}], True)
+
+    # Replaced by a new file
+    replacement = tmp_path / "results.csv.new"
+    replacement.write_bytes(b"task_id,model_id,status\r\na,m,ok\r\nb,m,ok\r\nc,m,ok\r\n")
+    os.replace(replacement, path)
+    rows, reset = follower.poll()
+    assert reset
+    assert [row["task_id"] for row in rows] == ["a", "b", "c"]
+
+
+def test_running_stats_match_batch_statistics():
+    values = [120.0, 95.5, 143.25, 110.0, 101.0]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    mean = sum(values) / len(values)
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    assert abs(stats.mean - mean) < 1e-9
+    assert abs(stats.variance - variance) < 1e-9
+    assert not stats.converged()
+
+
+def test_live_comparison_counts_errors_and_converges():
+    comparison = LiveComparison(["bedrock", "anthropic"])
+    comparison.add_row("bedrock", {"task_type": "simple", "status": "error: throttled"})
+    assert comparison.errors == {"bedrock": 1, "anthropic": 0}
+    assert not comparison.all_converged()
+
+    for api in comparison.apis:
+        for _ in range(10):
+            comparison.add_row(
+                api,
+                {
+                    "task_type": "simple",
+                    "status": "success",
+                    "first_token_ms": "100.0",
+                    "max_turn_ms": "200.0",
+                    "total_task_ms": "300.0",
+                },
+            )
+    assert comparison.all_converged()
+
+    comparison.reset("bedrock")
+    assert comparison.errors["bedrock"] == 0
+    assert not comparison.all_converged()
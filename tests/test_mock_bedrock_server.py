@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from botocore.eventstream import EventStreamBuffer
+
+from clients import create_bedrock_runtime_client
+from mock_bedrock_server import (
+    MockBedrockServer,
+    encode_event,
+    encode_message,
+    synthetic_response,
+)
+
+EVENTS = [
+    {"messageStart": {"role": "assistant"}},
+    {"contentBlockDelta": {"delta": {"text": 'héllo "world"\n'}, "contentBlockIndex": 0}},
+    {
+        "contentBlockDelta": {
+            "delta": {"toolUse": {"input": '{"path": "/tmp/x'}},
+            "contentBlockIndex": 1,
+        }
+    },
+    {"messageStop": {"stopReason": "tool_use"}},
+    {"throttlingException": {"message": "Too many requests"}},
+]
+
+
+def decode(data, size):
+    """Decode event-stream messages fed in chunks of `size` bytes (CRCs are checked on decode)."""
+    buffer = EventStreamBuffer()
+    messages = []
+    for start in range(0, len(data), size):
+        buffer.add_data(data[start : start + size])
+        messages.extend(buffer)
+    return messages
+
+
+@pytest.mark.parametrize("size", [1, 7, 100000])
+def test_encoded_events_decode_with_botocore(size):
+    data = b"".join(encode_event(event) for event in EVENTS)
+    messages = decode(data, size)
+
+    assert len(messages) == len(EVENTS)
+    for message, event in zip(messages, EVENTS):
+        ((event_type, body),) = event.items()
+        assert json.loads(message.payload) == body
+        if event_type == "throttlingException":
+            assert message.headers[":message-type"] == "exception"
+            assert message.headers[":exception-type"] == event_type
+        else:
+            assert message.headers[":message-type"] == "event"
+            assert message.headers[":event-type"] == event_type
+
+
+def test_encode_message_round_trip():
+    headers = {":event-type": "chunk", "x-custom": "ü"}
+    messages = decode(encode_message(headers, b"\x00\x01payload"), 3)
+
+    assert len(messages) == 1
+    assert messages[0].headers == headers
+    assert messages[0].payload == b"\x00\x01payload"
+
+
+def test_boto3_client_streams_scripted_response(aws_credentials):
+    tool_input = {"command": "create", "path": "/tmp/x.txt", "file_text": "abc " * 50}
+    script = [synthetic_response("Some text.", tool_input, chunk_size=7)]
+
+    with MockBedrockServer(script) as server:
+        client = create_bedrock_runtime_client(
+            region_name="us-east-1", endpoint_url=server.endpoint_url
+        )
+        try:
+            response = client.converse_stream(
+                modelId="test-model", messages=[{"role": "user", "content": [{"text": "hi"}]}]
+            )
+            events = list(response["stream"])
+        finally:
+            client.close()
+        assert server.request_count == 1
+
+    text = "".join(
+        event["contentBlockDelta"]["delta"].get("text", "")
+        for event in events
+        if "contentBlockDelta" in event
+    )
+    fragments = "".join(
+        event["contentBlockDelta"]["delta"]["toolUse"]["input"]
+        for event in events
+        if "contentBlockDelta" in event and "toolUse" in event["contentBlockDelta"]["delta"]
+    )
+    assert text == "Some text."
+    assert json.loads(fragments) == tool_input
+    assert events[-2] == {"messageStop": {"stopReason": "tool_use"}}
+    assert "metadata" in events[-1]
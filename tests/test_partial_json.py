@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from partial_json import StreamingJsonObjectParser
+
+DOCUMENTS = [
+    {},
+    {"command": "create", "path": "/tmp/example.txt", "file_text": "line one\nline two\n"},
+    {"text": 'quotes " and \\ backslashes, \t tabs and é 中 \U0001f600 emoji'},
+    {"int": -12, "float": 3.5e-3, "true": True, "false": False, "null": None},
+    {"nested": {"list": [1, "two", {"three": [3]}], "brace": "} ] { ["}, "empty": [], "after": 1},
+    {"unicode key é": "value", "last": "x"},
+]
+
+
+def feed_in_chunks(text, size):
+    parser = StreamingJsonObjectParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start : start + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 11, 100000])
+def test_matches_json_loads(document, ensure_ascii, size):
+    text = json.dumps(document, ensure_ascii=ensure_ascii, indent=1 if size == 3 else None)
+    parser, events = feed_in_chunks(text, size)
+
+    assert parser.complete
+    assert parser.close() == json.loads(text)
+    assert events[-1] == ("complete", None, json.loads(text))
+
+    fields = {event.key: event.value for event in events if event.kind == "field"}
+    assert fields == json.loads(text)
+    for key, value in fields.items():
+        if isinstance(value, str):
+            chunks = [
+                event.value for event in events if event.kind == "string_chunk" and event.key == key
+            ]
+            assert "".join(chunks) == value
+
+
+def test_reports_fields_before_the_object_closes():
+    parser = StreamingJsonObjectParser()
+    events = parser.feed('{"path": "/tmp/x", "file_text": "abc')
+
+    assert ("field", "path", "/tmp/x") in events
+    assert events[-1] == ("string_chunk", "file_text", "abc")
+    assert parser.fields == {"path": "/tmp/x"}
+    assert not parser.complete
+
+
+def test_empty_input_is_an_empty_object():
+    assert StreamingJsonObjectParser().close() == {}
+
+
+@pytest.mark.parametrize("text", ['{"a": 1', '{"a": "b', '{"a":'])
+def test_incomplete_object_raises(text):
+    parser = StreamingJsonObjectParser()
+    parser.feed(text)
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": 1,}', '{"a": 1} x', '{"a": "\\q"}'])
+def test_invalid_json_raises_like_json_loads(text):
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+    with pytest.raises(json.JSONDecodeError):
+        feed_in_chunks(text, 1)
+
+
+@pytest.mark.parametrize("text", ["[1]", '"a"', "1"])
+def test_non_object_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        feed_in_chunks(text, 1)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from benchmark.significance import (
+    bootstrap_percentile_diffs,
+    compare_samples,
+    mann_whitney,
+    runs_needed,
+)
+
+
+def test_mann_whitney_matches_scipy_asymptotic():
+    # scipy.stats.mannwhitneyu(males, females, method="asymptotic") documentation example
+    result = mann_whitney([19, 22, 16, 29, 24], [20, 11, 17, 12])
+
+    assert result["u"] == 17
+    assert result["p_value"] == pytest.approx(0.11134688653314041)
+    assert result["prob_greater"] == pytest.approx(17 / 20)
+
+
+def test_mann_whitney_separated_samples():
+    result = mann_whitney([1, 2, 3], [4, 5, 6])
+
+    assert result["u"] == 0
+    assert result["prob_greater"] == 0
+    # z = (4.5 - 0.5) / sqrt(5.25)
+    assert result["p_value"] == pytest.approx(0.0808555983700523)
+
+
+def test_mann_whitney_ties():
+    # Tie groups {2, 2, 2} and {3, 3, 3}: variance 16 / 12 * (9 - 48 / 56)
+    result = mann_whitney([1, 2, 2, 3], [2, 3, 3, 4])
+
+    assert result["u"] == 3
+    assert result["prob_greater"] == pytest.approx(3 / 16)
+    assert result["p_value"] == pytest.approx(0.17203370892182296)
+
+
+def test_mann_whitney_is_symmetric():
+    a, b = [0.8, 1.2, 1.9, 2.4, 3.1], [1.0, 1.1, 2.0, 2.2]
+    forward, backward = mann_whitney(a, b), mann_whitney(b, a)
+
+    assert forward["u"] + backward["u"] == len(a) * len(b)
+    assert forward["p_value"] == pytest.approx(backward["p_value"])
+
+
+def test_mann_whitney_identical_values_and_empty_samples():
+    assert mann_whitney([5, 5], [5, 5]) == {"u": 2.0, "p_value": 1.0, "prob_greater": 0.5}
+    assert mann_whitney([], [1, 2]) == {}
+
+
+def test_runs_needed():
+    # Noether: (1.96 + 0.8416)^2 / (3 * 0.2^2) = 65.4 in total, 33 per API
+    assert runs_needed(0.7) == 33
+    assert runs_needed(0.3) == 33
+    assert runs_needed(0.5) is None
+
+
+def test_bootstrap_interval_covers_the_shift():
+    rng = np.random.default_rng(0)
+    b = rng.lognormal(0, 0.3, 200)
+    a = b + 1.0
+
+    intervals = bootstrap_percentile_diffs(a, b, resamples=2000, seed=1)
+
+    assert intervals[50]["diff"] == pytest.approx(1.0)
+    assert intervals[95]["diff"] == pytest.approx(1.0)
+    for interval in intervals.values():
+        assert interval["ci_low"] <= interval["diff"] <= interval["ci_high"]
+    assert bootstrap_percentile_diffs(a, b, resamples=2000, seed=1) == intervals
+
+
+def test_compare_samples():
+    result = compare_samples(list(range(100, 200)), list(range(100)), resamples=2000, seed=1)
+
+    assert result["median_diff"] == pytest.approx(100)
+    assert result["significant"]
+    assert result["more_runs_needed"] == 0
+    assert result["prob_greater"] == 1.0
+
+    result = compare_samples([1, 2, 3], [1, 2, 3], resamples=200, seed=1)
+    assert not result["significant"]
+    assert result["more_runs_needed"] is None
@@ -0,0 +1,53 @@
+import json
+
+from clients import create_bedrock_runtime_client
+from mock_anthropic_server import synthetic_response as anthropic_response
+from mock_bedrock_server import MockBedrockServer, synthetic_response
+from stream_log import StreamRecorder, _event_processor, load_stream_log, replay_stream
+
+TOOL_INPUT = {"command": "create", "path": "/tmp/x.txt", "file_text": "abc " * 20}
+
+
+def test_replay_recorded_bedrock_stream(tmp_path, aws_credentials):
+    path = tmp_path / "bedrock.jsonl"
+    script = [synthetic_response("Some text.", TOOL_INPUT, chunk_size=9)]
+
+    with MockBedrockServer(script) as server, StreamRecorder(str(path), "bedrock") as recorder:
+        client = create_bedrock_runtime_client(
+            region_name="us-east-1", endpoint_url=server.endpoint_url
+        )
+        try:
+            response = recorder.wrap_client(client).converse_stream(
+                modelId="test-model", messages=[{"role": "user", "content": [{"text": "hi"}]}]
+            )
+            for _ in response["stream"]:
+                pass
+        finally:
+            client.close()
+
+    api, streams = load_stream_log(str(path))
+    assert api == "bedrock"
+    assert len(streams) == 1
+
+    # The replay executor has no request in flight, so no transport timing
+    process_event = _event_processor(api)
+    stats = replay_stream(streams[0], process_event, speed=0)
+
+    executor = process_event.__self__
+    assert stats["events"] == len(script[0])
+    deltas = [event for _, event in streams[0]["events"] if "contentBlockDelta" in event]
+    assert len(executor.delta_timeline) == len(deltas)
+    assert executor.pending_tool_uses[0]["input"] == TOOL_INPUT
+
+
+def test_replay_anthropic_stream():
+    events = [json.dumps(event) for _, event in anthropic_response("Some text.", TOOL_INPUT)]
+    stream = {"events": [(0.001 * i, event) for i, event in enumerate(events)]}
+
+    process_event = _event_processor("anthropic")
+    stats = replay_stream(stream, process_event, speed=0)
+
+    executor = process_event.__self__
+    assert stats["events"] == len(events)
+    assert len(executor.delta_timeline) > 0
+    assert executor.pending_tool_uses[0]["input"] == TOOL_INPUT
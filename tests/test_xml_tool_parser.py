@@ -0,0 +1,108 @@
+import re
+
+import pytest
+
+from xml_tool_parser import FS_WRITE_PARAMS, XmlToolCallParser
+
+CREATE_CALL = """I'll write the file now.
+
+<fs_write>
+<command>create</command>
+<path>/tmp/example.txt</path>
+<file_text>
+line one < two
+<b>not a tag of ours</b>
+</file_tex no closing yet
+last line
+</file_text>
+</fs_write>
+
+Done."""
+
+STR_REPLACE_CALL = """<fs_write>
+<command>str_replace</command>
+<path>/tmp/example.txt</path>
+<old_str>alpha</old_str>
+<new_str>beta
+gamma</new_str>
+</fs_write>"""
+
+INSERT_CALL = """Text with <fs_wr partial tags <fs_write>
+<command>insert</command><path>/tmp/a.txt</path><insert_line>3</insert_line>
+<new_str>inserted</new_str></fs_write>"""
+
+LITERAL_LT_CALL = """<fs_write>
+if a < b then
+<command>str_replace</command>
+<path>/tmp/compare.py</path>
+<old_str>if a <b:</old_str>
+<new_str>if a < b and b<=c:</new_str>
+</fs_write>"""
+
+
+def regex_parameters(text):
+    """The parameters the regex parser (one re.search per tag) finds in a tool call."""
+    parameters = {}
+    for name in FS_WRITE_PARAMS:
+        match = re.search(f"<{name}>(.*?)</{name}>", text, re.DOTALL)
+        if match:
+            parameters[name] = match.group(1).strip()
+    return parameters
+
+
+def feed_in_chunks(text, size):
+    parser = XmlToolCallParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start : start + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("text", [CREATE_CALL, STR_REPLACE_CALL, INSERT_CALL])
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_matches_regex_parser(text, size):
+    parser, events = feed_in_chunks(text, size)
+
+    assert [event.kind for event in events if event.kind != "param"] == ["tool_start", "tool_end"]
+    assert events[-1].value == regex_parameters(text)
+    params = {event.name: event.value for event in events if event.kind == "param"}
+    assert params == regex_parameters(text)
+    assert not parser.in_tool
+
+
+def test_reports_parameters_as_they_complete():
+    parser = XmlToolCallParser()
+    events = parser.feed("<fs_write>\n<command>create</command>\n<path>/tmp/x</pa")
+    assert events == [("tool_start", "fs_write", None), ("param", "command", "create")]
+    assert parser.in_tool
+
+    events = parser.feed("th>\n<file_text>abc")
+    assert events == [("param", "path", "/tmp/x")]
+
+
+def test_ignores_text_without_tool_call():
+    _, events = feed_in_chunks("No tools here, only <b>markup</b> and <fs_wri", 3)
+    assert events == []
+
+
+def test_parses_consecutive_tool_calls():
+    _, events = feed_in_chunks(STR_REPLACE_CALL + "\n" + CREATE_CALL, 5)
+
+    ends = [event.value for event in events if event.kind == "tool_end"]
+    assert ends == [regex_parameters(STR_REPLACE_CALL), regex_parameters(CREATE_CALL)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 100000])
+def test_literal_less_than_is_not_a_tag(size):
+    _, events = feed_in_chunks(LITERAL_LT_CALL, size)
+
+    assert events[-1] == (
+        "tool_end",
+        "fs_write",
+        {
+            "command": "str_replace",
+            "path": "/tmp/compare.py",
+            "old_str": "if a <b:",
+            "new_str": "if a < b and b<=c:",
+        },
+    )
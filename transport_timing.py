@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Connection-phase timing of streamed API requests.
+
+Time to first token alone cannot tell a slow network path from a slow
+server. A `RequestTiming` timestamps each phase of one request:
+
+- dns: host name resolved
+- connect: TCP connection established
+- tls: TLS handshake done (https only)
+- request_sent: request (headers and body) written, waiting for the response
+- headers: response status line and headers received
+- first_event: first stream event decoded
+- first_delta: first content delta decoded
+
+The first three only happen on a new connection; a request on a pooled
+connection has none of them (`reused_connection`). The first four and
+headers come from hooks in urllib3, which both botocore and requests send
+through (`install`); async_bedrock.py marks them itself, and the stream
+consumer marks first_event and first_delta. Hooks find the request being
+timed through a context variable, so concurrent requests on other threads or
+asyncio tasks are timed separately, and requests with no timing active pay
+one context variable lookup.
+
+If a request is retried, each phase keeps its first timestamp.
+
+    timing = transport_timing.begin()
+    response = client.converse_stream(...)
+    for event in response["stream"]:
+        timing.mark("first_event")
+        ...
+    transport_timing.end()
+    print(transport_timing.format_breakdown(timing))
+"""
+
+import contextvars
+import socket
+import threading
+import time
+
+PHASES = ("dns", "connect", "tls", "request_sent", "headers", "first_event", "first_delta")
+
+_current = contextvars.ContextVar("transport_timing", default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+
+class RequestTiming:
+    """
+    Timestamps (time.perf_counter) of the phases of one request.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+        self.request_id = ""
+
+    def mark(self, phase):
+        """
+        Record that a phase completed now; later marks of the same phase are ignored.
+
+        Args:
+            phase (str): One of PHASES
+        """
+        if phase not in self.marks:
+            self.marks[phase] = time.perf_counter()
+
+    @property
+    def reused_connection(self):
+        """Whether the request was sent on an already open connection."""
+        return "request_sent" in self.marks and "connect" not in self.marks
+
+    def offsets_ms(self):
+        """
+        Milliseconds from the start of the request to the end of each phase.
+
+        Returns:
+            dict: Phase -> offset in milliseconds, or None if the phase did not happen
+        """
+        return {
+            phase: (self.marks[phase] - self.start) * 1000 if phase in self.marks else None
+            for phase in PHASES
+        }
+
+    def durations_ms(self):
+        """
+        Milliseconds spent in each phase that happened: from the end of the previous one.
+
+        Returns:
+            dict: Phase -> duration in milliseconds, in PHASES order
+        """
+        durations = {}
+        previous = self.start
+        for phase in PHASES:
+            if phase in self.marks:
+                durations[phase] = (self.marks[phase] - previous) * 1000
+                previous = self.marks[phase]
+        return durations
+
+
+def begin():
+    """
+    Start timing a request in the current thread or asyncio task.
+
+    Returns:
+        RequestTiming: The timing the transport hooks mark
+    """
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def end():
+    """Stop timing in the current thread or asyncio task."""
+    _current.set(None)
+
+
+def current():
+    """
+    The request being timed in the current thread or asyncio task.
+
+    Returns:
+        RequestTiming: The timing, or None
+    """
+    return _current.get()
+
+
+def mark(phase):
+    """
+    Mark a phase of the request being timed, if any.
+
+    Args:
+        phase (str): One of PHASES
+    """
+    timing = _current.get()
+    if timing is not None:
+        timing.mark(phase)
+
+
+def format_breakdown(timing):
+    """
+    Describe where the time of a request went, one phase after the other.
+
+    Args:
+        timing (RequestTiming): The timing to describe
+
+    Returns:
+        str: e.g. "dns 1.2ms, connect 10.3ms, tls 25.0ms, request_sent 0.4ms, headers 310.2ms, ..."
+    """
+    parts = [f"{phase} {duration:.1f}ms" for phase, duration in timing.durations_ms().items()]
+    connection = "reused connection" if timing.reused_connection else "new connection"
+    return f"{', '.join(parts)} ({connection})"
+
+
+def install():
+    """
+    Install the timing hooks in urllib3 (used by botocore and requests); later calls do nothing.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        import urllib3.connection
+        import urllib3.util.connection
+
+        create_connection = urllib3.util.connection.create_connection
+
+        def timed_create_connection(address, *args, **kwargs):
+            if _current.get() is None:
+                return create_connection(address, *args, **kwargs)
+            # Resolve here, so resolution and connection are timed apart
+            host, port = address
+            addresses = socket.getaddrinfo(
+                host, port, urllib3.util.connection.allowed_gai_family(), socket.SOCK_STREAM
+            )
+            mark("dns")
+            error = None
+            for _, _, _, _, sockaddr in addresses:
+                try:
+                    sock = create_connection((sockaddr[0], port), *args, **kwargs)
+                except OSError as e:
+                    error = e
+                    continue
+                mark("connect")
+                return sock
+            raise (
+                error
+                if error is not None
+                else OSError(f"getaddrinfo returned no addresses for {host}")
+            )
+
+        https_connect = urllib3.connection.HTTPSConnection.connect
+
+        def timed_https_connect(self):
+            https_connect(self)
+            mark("tls")
+
+        getresponse = urllib3.connection.HTTPConnection.getresponse
+
+        def timed_getresponse(self, *args, **kwargs):
+            mark("request_sent")
+            response = getresponse(self, *args, **kwargs)
+            mark("headers")
+            return response
+
+        urllib3.util.connection.create_connection = timed_create_connection
+        urllib3.connection.HTTPSConnection.connect = timed_https_connect
+        urllib3.connection.HTTPConnection.getresponse = timed_getresponse
+        _installed = True
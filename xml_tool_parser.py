@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for XML-style tool calls written in streamed model text.
+
+The system-prompt tool-use path asks the model to write tool calls as
+
+    <fs_write>
+    <command>create</command>
+    <path>/tmp/example.txt</path>
+    <file_text>...</file_text>
+    </fs_write>
+
+`XmlToolCallParser` consumes the text chunk by chunk with a small state
+machine. Each chunk is scanned once with `str.find`; only a possible partial
+tag at the end of a chunk (a few characters) is carried over to the next one,
+so the total work is linear in the size of the output.
+"""
+
+from collections import namedtuple
+
+# Event emitted by XmlToolCallParser.feed
+#   kind:  "tool_start", "param" or "tool_end"
+#   name:  the tool name ("tool_start"/"tool_end") or the parameter name ("param")
+#   value: None, the parameter value, or the dict of all parameters ("tool_end")
+XmlToolEvent = namedtuple("XmlToolEvent", ["kind", "name", "value"])
+
+FS_WRITE_PARAMS = ("command", "path", "file_text", "old_str", "new_str", "insert_line")
+
+_OUTSIDE = 0
+_IN_TOOL = 1
+_IN_PARAM = 2
+
+
+def _partial_suffix_length(data, start, tag):
+    """
+    Return the length of the longest suffix of data[start:] that is a proper prefix of tag.
+    """
+    longest = min(len(tag) - 1, len(data) - start)
+    for length in range(longest, 0, -1):
+        if data.endswith(tag[:length]):
+            return length
+    return 0
+
+
+def _starts_tag(char):
+    """
+    Return whether a character after "<" can start a tag: "/" or a name character.
+    """
+    return char == "/" or char == "_" or char.isalpha()
+
+
+class XmlToolCallParser:
+    """
+    Streaming tokenizer for one XML-style tool and its parameter tags.
+
+    The parser keeps all of its state on the instance, so separate streams can
+    be parsed concurrently with separate parsers.
+    """
+
+    def __init__(self, tool_name="fs_write", param_names=FS_WRITE_PARAMS):
+        """
+        Args:
+            tool_name (str): The name of the tool tag to look for
+            param_names (iterable): The parameter tags recognized inside the tool tag
+        """
+        self.tool_name = tool_name
+        self.param_names = frozenset(param_names)
+        self._open_tag = f"<{tool_name}>"
+        self._max_tag_length = max(len(name) for name in self.param_names | {tool_name}) + 3
+
+        self._state = _OUTSIDE
+        self._pending = ""
+        self._param_name = None
+        self._param_closing_tag = None
+        self._value_parts = []
+        self.parameters = {}
+
+    @property
+    def in_tool(self):
+        """bool: Whether the parser is inside an open tool tag."""
+        return self._state != _OUTSIDE
+
+    def feed(self, chunk):
+        """
+        Consume the next chunk of streamed text.
+
+        Args:
+            chunk (str): The next chunk of model output
+
+        Returns:
+            list: XmlToolEvent tuples for every tool start, completed parameter
+                and tool end found in the chunk, in order
+        """
+        events = []
+        data = self._pending + chunk if self._pending else chunk
+        self._pending = ""
+        pos = 0
+        end = len(data)
+
+        while pos < end:
+            if self._state == _OUTSIDE:
+                index = data.find(self._open_tag, pos)
+                if index < 0:
+                    keep = _partial_suffix_length(data, pos, self._open_tag)
+                    self._pending = data[end - keep :] if keep else ""
+                    break
+                pos = index + len(self._open_tag)
+                self._state = _IN_TOOL
+                self.parameters = {}
+                events.append(XmlToolEvent("tool_start", self.tool_name, None))
+
+            elif self._state == _IN_TOOL:
+                tag_start = data.find("<", pos)
+                if tag_start < 0:
+                    break
+                if tag_start + 1 == end:
+                    # Whether this starts a tag depends on the next chunk
+                    self._pending = "<"
+                    break
+                if not _starts_tag(data[tag_start + 1]):
+                    # A literal "<" in the text between tags (e.g. "a < b"), not a tag
+                    pos = tag_start + 1
+                    continue
+                tag_end = data.find(">", tag_start)
+                if tag_end < 0:
+                    # Carry a possible partial tag over to the next chunk
+                    if end - tag_start <= self._max_tag_length:
+                        self._pending = data[tag_start:]
+                    break
+                tag = data[tag_start + 1 : tag_end]
+                pos = tag_end + 1
+                if tag == "/" + self.tool_name:
+                    self._state = _OUTSIDE
+                    events.append(XmlToolEvent("tool_end", self.tool_name, self.parameters))
+                elif tag in self.param_names:
+                    self._state = _IN_PARAM
+                    self._param_name = tag
+                    self._param_closing_tag = f"</{tag}>"
+                    self._value_parts = []
+
+            else:
+                closing_tag = self._param_closing_tag
+                index = data.find(closing_tag, pos)
+                if index < 0:
+                    keep = _partial_suffix_length(data, pos, closing_tag)
+                    self._value_parts.append(data[pos : end - keep])
+                    self._pending = data[end - keep :] if keep else ""
+                    break
+                self._value_parts.append(data[pos:index])
+                pos = index + len(closing_tag)
+
+                value = "".join(self._value_parts).strip()
+                self._value_parts = []
+                self.parameters[self._param_name] = value
+                events.append(XmlToolEvent("param", self._param_name, value))
+                self._param_name = None
+                self._state = _IN_TOOL
+
+        return events